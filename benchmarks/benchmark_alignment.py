@@ -0,0 +1,110 @@
+"""
+Compare the previous per-clip sliding-window search with the single-pass clip aligner.
+
+    python benchmarks/benchmark_alignment.py --clips 15 60 240 --words 10
+
+Before timing, short-word substitutions and unmatched clips are checked on hand-written transcripts.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_transcript
+from transcript_alignment import align_clip_ranges, align_clips
+
+
+def timed_words(text, word_seconds=0.5):
+    return [{"word": word, "start": i * word_seconds, "end": i * word_seconds + word_seconds * 0.8}
+            for i, word in enumerate(text.split())]
+
+
+def find_string_timestamps(word_timestamps, target_string):
+    """The lambda's previous implementation, kept here as the baseline"""
+    target_words = target_string.split()
+    n = len(target_words)
+    for i in range(len(word_timestamps) - n + 1):
+        candidate_words = [w['word'] for w in word_timestamps[i:i + n]]
+        if candidate_words == target_words:
+            clip_word_timestamps = word_timestamps[i:i + n]
+            return word_timestamps[i]['start'], word_timestamps[i + n - 1]['end'], clip_word_timestamps
+
+    return None, None, None
+
+
+def punctuate(clip_texts):
+    """Deepseek style clip texts: capitalized and punctuated unlike the ElevenLabs words"""
+    return [text.capitalize().replace(" and ", ", and ") + "." for text in clip_texts]
+
+
+def check_edge_cases():
+    # "It" was never spoken, before short tokens were exact-only it matched "in" two words ahead and the
+    # first clip lost "was late"
+    words = timed_words("was late in the house")
+    ranges = align_clip_ranges(["It was late.", "In the house."], words)
+    assert ranges == [(0, 1), (2, 4)], f"short-word substitution moved the cursor: {ranges}"
+    ranges = align_clip_ranges(["A door opened", "and it slammed"], timed_words("i door opened an it slammed"))
+    assert ranges == [(1, 2), (4, 5)], f"'a' and 'and' must not match 'i' and 'an': {ranges}"
+
+    # A clip none of whose words were spoken takes the words between its neighbours
+    words = timed_words("the door creaked something strange she ran away")
+    ranges = align_clip_ranges(["The door creaked.", "Zzzz qqqq.", "She ran away."], words)
+    assert ranges == [(0, 2), (3, 4), (5, 7)], f"unmatched clip was not anchored between its neighbours: {ranges}"
+
+    # Without words in between, it sits between the previous clip's last word and the next clip's first
+    words = timed_words("the door creaked she ran away")
+    spans = align_clips(["The door creaked.", "Zzzz qqqq.", "She ran away."], words)
+    start, end, clip_words = spans[1]
+    assert start == words[2]["end"] and end == words[3]["start"] and clip_words == [], f"bad empty span: {spans[1]}"
+
+    # Trailing unmatched clips share the words left after the last found clip
+    words = timed_words("the door creaked one two three four")
+    ranges = align_clip_ranges(["The door creaked.", "Xx yy.", "Zz ww."], words)
+    assert ranges == [(0, 2), (3, 4), (5, 6)], f"trailing unmatched clips: {ranges}"
+    assert all(span[0] is not None and span[1] is not None for span in align_clips(["Qqqq"], words))
+    print("Edge cases: short-word substitutions and unmatched clips align as expected")
+
+
+def run(clip_counts, words_per_clip):
+    rows = []
+    for clip_count in clip_counts:
+        transcript = make_transcript(clip_count, words_per_clip, seed=clip_count)
+        word_timestamps = transcript["word_timestamps"]
+        clip_texts = [clip["text"] for clip in transcript["image_clips_data"]]
+
+        started = time.perf_counter()
+        baseline = [find_string_timestamps(word_timestamps, text) for text in clip_texts]
+        baseline_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        aligned = align_clips(clip_texts, word_timestamps)
+        aligned_seconds = time.perf_counter() - started
+
+        # Same spans whenever the previous implementation found one, repeated phrases aside
+        agreeing = sum(1 for old, new in zip(baseline, aligned) if old[0] is None or old[:2] == new[:2])
+
+        noisy_texts = punctuate(clip_texts)
+        baseline_found = sum(1 for text in noisy_texts if find_string_timestamps(word_timestamps, text)[0] is not None)
+        aligned_found = sum(1 for noisy, clean in zip(align_clips(noisy_texts, word_timestamps), aligned)
+                            if noisy[:2] == clean[:2])
+
+        rows.append((clip_count, len(word_timestamps), baseline_seconds, aligned_seconds, agreeing,
+                     baseline_found, aligned_found))
+
+    print(f"{'clips':>6} {'words':>7} {'baseline s':>11} {'aligner s':>10} {'speedup':>8} "
+          f"{'agree':>6} {'punct. old':>10} {'punct. new':>10}")
+    for clip_count, word_count, baseline_seconds, aligned_seconds, agreeing, baseline_found, aligned_found in rows:
+        print(f"{clip_count:>6} {word_count:>7} {baseline_seconds:>11.4f} {aligned_seconds:>10.4f} "
+              f"{baseline_seconds / aligned_seconds:>7.1f}x {agreeing:>6} {baseline_found:>10} {aligned_found:>10}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", type=int, nargs="+", default=[15, 60, 240, 960])
+    parser.add_argument("--words", type=int, default=10)
+    args = parser.parse_args()
+    check_edge_cases()
+    run(args.clips, args.words)
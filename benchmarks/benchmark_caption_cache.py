@@ -0,0 +1,65 @@
+"""
+Count caption rasterizations per video with and without the shared sprite cache.
+
+    python benchmarks/benchmark_caption_cache.py --videos 5 --clips 15
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_transcript
+from caption_cache import CaptionSpriteCache, rasterize_caption
+
+
+def run(video_count, clip_count, words_per_clip, max_bytes):
+    transcripts = [make_transcript(clip_count, words_per_clip, seed=seed) for seed in range(video_count)]
+    words = [
+        [word["word"] for clip in transcript["image_clips_data"] for word in clip["word_timestamps"]]
+        for transcript in transcripts
+    ]
+
+    # Before: create_captions built one TextClip, so one rasterization, per word
+    started = time.perf_counter()
+    for video_words in words:
+        for word in video_words:
+            rasterize_caption(word)
+    uncached_seconds = time.perf_counter() - started
+    uncached_rasterizations = sum(len(video_words) for video_words in words)
+
+    cache = CaptionSpriteCache(max_bytes)
+    per_video = []
+    started = time.perf_counter()
+    for video_words in words:
+        before = cache.stats()["rasterizations"]
+        for word in video_words:
+            cache.get(word)
+        per_video.append(cache.stats()["rasterizations"] - before)
+    cached_seconds = time.perf_counter() - started
+    stats = cache.stats()
+
+    print(f"=== Caption rasterizations: {video_count} videos x {clip_count} clips x {words_per_clip} words ===")
+    print(f"Without cache: {uncached_rasterizations} rasterizations in {uncached_seconds:.3f}s "
+          f"({uncached_rasterizations // video_count} per video)")
+    print(f"With cache:    {stats['rasterizations']} rasterizations in {cached_seconds:.3f}s "
+          f"(per video: {per_video})")
+    print(f"Cache: {stats['entries']} sprites, {stats['bytes'] / 1024:.1f} KiB, {stats['evictions']} evictions")
+    return {
+        "uncached_rasterizations": uncached_rasterizations,
+        "cached_rasterizations": stats["rasterizations"],
+        "per_video": per_video,
+        "uncached_seconds": uncached_seconds,
+        "cached_seconds": cached_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--videos", type=int, default=5)
+    parser.add_argument("--clips", type=int, default=15)
+    parser.add_argument("--words", type=int, default=10)
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 ** 2)
+    args = parser.parse_args()
+    run(args.videos, args.clips, args.words, args.max_bytes)
@@ -0,0 +1,76 @@
+"""
+Compare serial and concurrent clip prompt requests against a local stub of the Deepseek API.
+
+    python benchmarks/benchmark_clip_prompts.py --clips 15 --latency 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_generation import ClipPromptClient
+
+
+def start_stub_server(latency):
+    class StubDeepseekHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            content = json.dumps({
+                "image_prompt": f"prompt for: {payload['messages'][-1]['content'][:40]}",
+                "image_negative_prompt": "blurry",
+            })
+            body = json.dumps({"choices": [{"message": {"content": f"```json\n{content}\n```"}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDeepseekHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def run(clip_count, latency, max_workers):
+    server = start_stub_server(latency)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    payloads = [
+        {"messages": [{"role": "user", "content": f"Scene {clip_index}"}]}
+        for clip_index in range(clip_count)
+    ]
+
+    timings = {}
+    results = {}
+    for label, workers in (("serial", 1), ("concurrent", max_workers)):
+        client = ClipPromptClient(url, {}, max_workers=workers, timeout=30)
+        started = time.perf_counter()
+        results[label] = client.request_prompts(payloads)
+        timings[label] = time.perf_counter() - started
+    server.shutdown()
+
+    assert results["serial"] == results["concurrent"], "Concurrent results must keep clip order"
+    print(f"=== {clip_count} clip prompts, {latency:.2f}s stub latency ===")
+    print(f"Serial:     {timings['serial']:.2f}s")
+    print(f"Concurrent: {timings['concurrent']:.2f}s ({max_workers} workers)")
+    print(f"Speedup:    {timings['serial'] / timings['concurrent']:.2f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.clips, args.latency, args.workers)
@@ -0,0 +1,87 @@
+"""
+FLUX execution mode picked for common GPUs, from a faked device memory probe, and the pipeline calls each
+mode makes on a recording stand-in. Needs neither a GPU nor diffusers.
+
+    python benchmarks/benchmark_execution_modes.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from execution_modes import EXECUTION_MODES, GB, apply_execution_mode, resolve_execution_mode
+from model_registry import ModelRegistry, load_fake_pipeline
+
+# Memory torch reports for each card, a few hundred MB below the marketing number
+GPUS = {
+    "A100 80GB": (79.2 * GB, "full"),
+    "A40 48GB": (44.4 * GB, "full"),
+    "A100 40GB": (39.4 * GB, "model_offload"),
+    "RTX 5090 32GB": (31.4 * GB, "model_offload"),
+    "RTX 4090 24GB": (23.6 * GB, "quantized_8bit"),
+    "RTX A4000 16GB": (15.7 * GB, "quantized_4bit"),
+    "T4 16GB": (14.6 * GB, "quantized_4bit"),
+    "RTX 3060 12GB": (11.7 * GB, "quantized_4bit"),
+    "RTX 3070 8GB": (7.8 * GB, "sequential_offload"),
+    "no CUDA": (None, "sequential_offload"),
+}
+
+
+class RecordingVae:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def enable_tiling(self):
+        self.calls.append("vae.enable_tiling")
+
+    def enable_slicing(self):
+        self.calls.append("vae.enable_slicing")
+
+
+class RecordingPipeline:
+    """Stands in for FluxPipeline and records how the execution mode set it up"""
+
+    def __init__(self):
+        self.calls = []
+        self.vae = RecordingVae(self.calls)
+
+    def to(self, device):
+        self.calls.append(f"to({device!r})")
+
+    def enable_model_cpu_offload(self):
+        self.calls.append("enable_model_cpu_offload")
+
+    def enable_sequential_cpu_offload(self):
+        self.calls.append("enable_sequential_cpu_offload")
+
+    def enable_attention_slicing(self):
+        self.calls.append("enable_attention_slicing")
+
+
+def run():
+    print(f"{'GPU':<16} {'VRAM GiB':>9}  {'mode':<20} {'batch cap':>9}")
+    for gpu, (vram_bytes, expected) in GPUS.items():
+        mode = resolve_execution_mode("auto", memory_probe=lambda: vram_bytes)
+        assert mode["name"] == expected, f"{gpu}: expected {expected}, got {mode['name']}"
+        vram = f"{vram_bytes / GB:.1f}" if vram_bytes is not None else "-"
+        print(f"{gpu:<16} {vram:>9}  {mode['name']:<20} {str(mode['max_batch_size'] or '-'):>9}")
+
+    forced = resolve_execution_mode("quantized_4bit", memory_probe=lambda: 79.2 * GB)
+    assert forced["name"] == "quantized_4bit", "an explicit mode must win over the detected VRAM"
+
+    print("=== Pipeline setup per mode ===")
+    for name in EXECUTION_MODES:
+        pipe = apply_execution_mode(RecordingPipeline(), EXECUTION_MODES[name])
+        quantization = EXECUTION_MODES[name]["quantization"]
+        transformer = f"{quantization} transformer, " if quantization else ""
+        print(f"{name:<20} {transformer}{', '.join(pipe.calls)}")
+
+    registry = ModelRegistry("fake-flux", loader=load_fake_pipeline, memory_probe=lambda: 23.6 * GB)
+    registry.get_pipeline()
+    status = registry.status()
+    assert status["execution_mode"] == "quantized_8bit" and registry.max_batch_size() == 1
+    print(f"=== /health model_status on a 24 GB card ===\n{status}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,99 @@
+"""
+Encode time and file size of every export profile on the same synthetic slideshow.
+
+    python benchmarks/benchmark_export_profiles.py --clips 3 --clip-seconds 2 --size 720
+
+Frames are composited once per frame rate into a raw file, so only the encoder is timed. Profiles the
+local ffmpeg cannot run (nvenc without an NVIDIA build) are reported as failed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_image, make_transcript, write_silent_wav
+from caption_cache import CaptionSpriteCache
+from export_profiles import EXPORT_PROFILES, ffmpeg_video_args, resolve_export_profile
+from frame_renderer import FfmpegFrameRenderer, prepare_frame_clip
+
+
+def composite_to_file(transcript, frame_size, fps, path):
+    image_clips_data = transcript["image_clips_data"]
+    clip_count = len(image_clips_data)
+    sprite_cache = CaptionSpriteCache(256 * 1024 ** 2)
+    clips = [
+        prepare_frame_clip(clip_data, make_image(i, frame_size), i == clip_count - 1, sprite_cache=sprite_cache)
+        for i, clip_data in enumerate(image_clips_data)
+    ]
+    renderer = FfmpegFrameRenderer(frame_size=frame_size, fps=fps)
+    with open(path, "wb") as f:
+        for frame in renderer.iter_frames(clips, transcript["duration"]):
+            f.write(frame.tobytes())
+    return path
+
+
+def encode(raw_path, profile, frame_size, duration, audio_path, output_path):
+    renderer = FfmpegFrameRenderer(frame_size=frame_size, fps=profile["fps"], video_args=ffmpeg_video_args(profile))
+    command = renderer.build_command(output_path, audio_path, duration)
+    started = time.perf_counter()
+    with open(raw_path, "rb") as raw_frames:
+        completed = subprocess.run(command, stdin=raw_frames, capture_output=True)
+    seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.decode("utf-8", errors="replace").strip().splitlines()[-1])
+    return seconds, os.path.getsize(output_path)
+
+
+def run(profile_names, clip_count, words_per_clip, clip_seconds, size, output):
+    transcript = make_transcript(clip_count, words_per_clip, clip_seconds)
+    duration = transcript["duration"]
+    frame_size = (size, size)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = write_silent_wav(os.path.join(work_dir, "audio.wav"), duration + 2)
+        raw_files = {}
+        for name in profile_names:
+            profile = resolve_export_profile(name)
+            fps = profile["fps"]
+            if fps not in raw_files:
+                raw_files[fps] = composite_to_file(transcript, frame_size, fps, os.path.join(work_dir, f"frames_{fps}.raw"))
+            try:
+                seconds, size_bytes = encode(
+                    raw_files[fps], profile, frame_size, duration, audio_path, os.path.join(work_dir, f"{name}.mp4")
+                )
+                results[name] = {"encode_seconds": round(seconds, 4), "bytes": size_bytes, "fps": fps}
+            except RuntimeError as e:
+                results[name] = {"error": str(e), "fps": fps}
+
+    print(f"=== Export profiles: {clip_count} clips, {duration:.1f}s at {size}x{size} ===")
+    print(f"{'profile':<12} {'fps':>4} {'encode s':>9} {'KiB':>9} {'kbit/s':>8}")
+    for name, entry in results.items():
+        if "error" in entry:
+            print(f"{name:<12} {entry['fps']:>4} failed: {entry['error']}")
+            continue
+        print(f"{name:<12} {entry['fps']:>4} {entry['encode_seconds']:>9.2f} {entry['bytes'] / 1024:>9.1f} "
+              f"{entry['bytes'] * 8 / 1000 / duration:>8.0f}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"duration_seconds": duration, "frame_size": list(frame_size), "profiles": results}, f, indent=2)
+        print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=list(EXPORT_PROFILES), default=list(EXPORT_PROFILES))
+    parser.add_argument("--clips", type=int, default=3)
+    parser.add_argument("--words", type=int, default=8)
+    parser.add_argument("--clip-seconds", type=float, default=2.0)
+    parser.add_argument("--size", type=int, default=720)
+    parser.add_argument("--output", default=None, help="Write the JSON results to this path")
+    args = parser.parse_args()
+    run(args.profiles, args.clips, args.words, args.clip_seconds, args.size, args.output)
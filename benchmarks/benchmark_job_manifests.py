@@ -0,0 +1,201 @@
+"""
+Drain an S3 job manifest backlog with several racing workers against moto, every job must be claimed once.
+
+    pip install "moto[s3]"
+    python benchmarks/benchmark_job_manifests.py --jobs 20 --workers 3
+
+Then several workers race for the same stale claim, each one reading it before any of them writes, and
+exactly one may take it over. A heartbeating worker keeps its claim past the TTL, and a pod restarted
+under the same RUNPOD_POD_ID takes its own claim back without waiting for the TTL. A manifest of a job the
+scheduler already has from /process is released instead of counted as claimed.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto import mock_aws
+
+from job_manifests import JobManifestQueue
+from job_scheduler import JobScheduler
+
+BUCKET = "content-creator-benchmark"
+
+
+class LockstepQueue(JobManifestQueue):
+    """Waits after reading a claim until every racer has read it, so all of them see the same stale ETag"""
+
+    def __init__(self, *args, barrier, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.barrier = barrier
+
+    def _read_claim(self, video_id):
+        claim = super()._read_claim(video_id)
+        self.barrier.wait()
+        return claim
+
+
+def run_stale_claim_race(client, racer_count):
+    video_id = "video_stale"
+    ttl_seconds = 0.5
+    lambda_queue = JobManifestQueue(client, BUCKET)
+    lambda_queue.enqueue({"s3_bucket": BUCKET, "video_id": video_id})
+    dead_worker = JobManifestQueue(client, BUCKET, worker_id="dead-worker", claim_ttl_seconds=ttl_seconds)
+    assert dead_worker.claim(video_id) is not None
+    time.sleep(ttl_seconds * 1.5)
+
+    barrier = threading.Barrier(racer_count)
+    racers = [
+        LockstepQueue(client, BUCKET, worker_id=f"racer-{index}", claim_ttl_seconds=ttl_seconds, barrier=barrier)
+        for index in range(racer_count)
+    ]
+    winners = []
+    winners_lock = threading.Lock()
+
+    def race(queue):
+        manifest = queue.claim(video_id)
+        if manifest is not None:
+            with winners_lock:
+                winners.append(queue)
+
+    threads = [threading.Thread(target=race, args=(queue,)) for queue in racers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(winners) == 1, f"{len(winners)} workers took over the same stale claim"
+    winner = winners[0]
+    claim, _ = lambda_queue._read_claim(video_id)
+    assert claim["worker_id"] == winner.worker_id, "the claim must belong to the worker that took it over"
+
+    # The dead worker comes back, its release must not drop the new owner's claim
+    dead_worker.release(video_id)
+    claim, _ = lambda_queue._read_claim(video_id)
+    assert claim and claim["worker_id"] == winner.worker_id, "a taken-over claim was deleted by its old owner"
+
+    # The winner outlives the TTL while heartbeating, a newcomer must not steal the job
+    time.sleep(ttl_seconds * 1.5)
+    assert winner.heartbeat() == [video_id]
+    newcomer = JobManifestQueue(client, BUCKET, worker_id="newcomer", claim_ttl_seconds=ttl_seconds)
+    assert newcomer.claim(video_id) is None, "a heartbeated claim was taken over"
+
+    winner.complete(video_id, {"video_id": video_id}, {"success": True, "video_id": video_id})
+    assert lambda_queue._read_claim(video_id) == (None, None), "complete() must remove the claim"
+    print(f"{racer_count} workers raced for one stale claim: only {winner.worker_id} took it over, "
+          f"the old owner's release left it alone and heartbeats kept it past the TTL")
+    return winner.worker_id
+
+
+def run_restart_reclaim(client):
+    video_id = "video_restarted"
+    JobManifestQueue(client, BUCKET).enqueue({"s3_bucket": BUCKET, "video_id": video_id})
+    pod_id = os.environ.get("RUNPOD_POD_ID")
+    os.environ["RUNPOD_POD_ID"] = "pod-a"
+    try:
+        first_boot = JobManifestQueue(client, BUCKET)
+        second_boot = JobManifestQueue(client, BUCKET)
+    finally:
+        if pod_id is None:
+            os.environ.pop("RUNPOD_POD_ID")
+        else:
+            os.environ["RUNPOD_POD_ID"] = pod_id
+    assert first_boot.worker_id == second_boot.worker_id == "pod-a", "the worker id must come from RUNPOD_POD_ID"
+    assert first_boot.claim(video_id) is not None
+    assert first_boot.claim(video_id) is None, "a claim this process holds must not be handed out twice"
+
+    # The pod dies mid-job and boots again long before the TTL runs out
+    other_pod = JobManifestQueue(client, BUCKET, worker_id="pod-b")
+    assert other_pod.claim(video_id) is None, "a fresh claim of another pod was taken over"
+    manifest = second_boot.claim(video_id)
+    assert manifest is not None and manifest["claimed_by"] == "pod-a", "the restarted pod did not get its job back"
+    assert second_boot.heartbeat() == [video_id]
+    second_boot.complete(video_id, manifest, {"success": True, "video_id": video_id})
+    print(f"Restarted pod took its claim back at once, the claim TTL is {second_boot.claim_ttl_seconds:.0f}s")
+
+
+def run_duplicate_drain(client):
+    video_id = "video_posted_twice"
+    lambda_queue = JobManifestQueue(client, BUCKET)
+    lambda_queue.enqueue({"s3_bucket": BUCKET, "video_id": video_id})
+    # Scheduler that is not started, so the job /process queued stays queued
+    scheduler = JobScheduler(lambda job_data: {"success": True}, max_queue_size=4)
+    scheduler.submit(video_id, {"s3_bucket": BUCKET, "video_id": video_id})
+
+    worker = JobManifestQueue(client, BUCKET, worker_id="pod-http")
+    claimed = worker.drain(lambda manifest: scheduler.submit(manifest["video_id"], manifest), lambda: 4)
+    assert claimed == [], f"a job already queued over HTTP counted as claimed: {claimed}"
+    assert worker.heartbeat() == [], "the released claim must not be heartbeated"
+    assert lambda_queue._read_claim(video_id) == (None, None), "the duplicate's claim was left behind"
+    assert lambda_queue.pending_video_ids() == [video_id], "the manifest must stay pending"
+    print("Manifest of a job already queued over HTTP was released, not claimed")
+
+
+def run(job_count, worker_count):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+
+        lambda_queue = JobManifestQueue(client, BUCKET)
+        started = time.perf_counter()
+        for index in range(job_count):
+            lambda_queue.enqueue({
+                "s3_bucket": BUCKET,
+                "transcript_key": f"transcripts/video_{index}.json.gz",
+                "audio_key": f"audio/video_{index}.mp3",
+                "video_id": f"video_{index}",
+            })
+        enqueue_seconds = time.perf_counter() - started
+
+        claims = {}
+        claims_lock = threading.Lock()
+
+        def worker(worker_index):
+            queue = JobManifestQueue(client, BUCKET, worker_id=f"worker-{worker_index}")
+            claimed = []
+            queue.drain(claimed.append, lambda: job_count)
+            for manifest in claimed:
+                with claims_lock:
+                    claims.setdefault(manifest["video_id"], []).append(queue.worker_id)
+                queue.complete(manifest["video_id"], manifest, {"success": True, "video_id": manifest["video_id"]})
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(worker_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        drain_seconds = time.perf_counter() - started
+
+        assert len(claims) == job_count, f"{job_count - len(claims)} jobs were never claimed"
+        duplicates = {video_id: owners for video_id, owners in claims.items() if len(owners) > 1}
+        assert not duplicates, f"Jobs claimed more than once: {duplicates}"
+        assert lambda_queue.pending_video_ids() == [], "Finished jobs must leave the pending prefix"
+
+        per_worker = {}
+        for owners in claims.values():
+            per_worker[owners[0]] = per_worker.get(owners[0], 0) + 1
+
+    print(f"Enqueued {job_count} manifests in {enqueue_seconds:.3f}s")
+    print(f"{worker_count} racing workers drained them in {drain_seconds:.3f}s, each job claimed exactly once")
+    for worker_id, count in sorted(per_worker.items()):
+        print(f"  {worker_id}: {count} jobs")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        run_stale_claim_race(client, max(2, worker_count))
+        run_restart_reclaim(client)
+        run_duplicate_drain(client)
+    return claims
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+    run(args.jobs, args.workers)
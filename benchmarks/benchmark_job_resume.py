@@ -0,0 +1,155 @@
+"""
+Kill the worker's process_video_job part way, restart it against moto and count the work the checkpoint saved.
+
+    pip install "moto[s3]" flask moviepy
+    python benchmarks/benchmark_job_resume.py --clips 15 --kill-after-clips 9 --kill-after-segments 4
+
+The real job function runs with FakeFluxPipeline behind the model registry. The kill is injected in the S3
+layer: the first run dies once the checkpoint records --kill-after-clips clip images, the second once it
+records --kill-after-segments encoded segments, the third run finishes. A dead worker makes no further S3
+calls, so every call after the kill fails the way it would in a process that is gone.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto import mock_aws
+
+from benchmarks.synthetic_fixtures import load_stub_worker, make_transcript, upload_job_inputs
+from job_checkpoints import CHECKPOINT_PREFIX
+from s3_io import S3IO
+
+BUCKET = "content-creator-benchmark"
+VIDEO_ID = "video_resume"
+
+
+class WorkerKilled(BaseException):
+    """Raised where the worker process would have died, BaseException so no except Exception catches it"""
+
+
+class KillingS3IO(S3IO):
+    """S3IO that dies once the job checkpoint records enough clips or segments, and counts checkpoint traffic"""
+
+    def __init__(self, client, kill_after_clips=None, kill_after_segments=None):
+        super().__init__(client)
+        self.kill_after_clips = kill_after_clips
+        self.kill_after_segments = kill_after_segments
+        self.killed = None
+        self.counters = {"restored_images": 0, "restored_segments": 0, "encoded_segments": 0}
+
+    def _alive(self):
+        if self.killed:
+            raise WorkerKilled(self.killed)
+
+    def put_json(self, bucket, key, data):
+        self._alive()
+        super().put_json(bucket, key, data)
+        if key == f"{CHECKPOINT_PREFIX}{VIDEO_ID}.json":
+            clips = len(data.get("clips", {}))
+            segments = len((data.get("encode") or {}).get("segments", {}))
+            if self.kill_after_clips is not None and clips >= self.kill_after_clips:
+                self.killed = f"killed after {clips} clips"
+            elif self.kill_after_segments is not None and segments >= self.kill_after_segments:
+                self.killed = f"killed after {segments} segments"
+            self._alive()
+
+    def put_bytes(self, bucket, key, data, content_type):
+        self._alive()
+        super().put_bytes(bucket, key, data, content_type)
+
+    def get_bytes(self, bucket, key):
+        self._alive()
+        if key.startswith("images/"):
+            self.counters["restored_images"] += 1
+        return super().get_bytes(bucket, key)
+
+    def download_file(self, bucket, key, path):
+        self._alive()
+        if key.startswith(CHECKPOINT_PREFIX):
+            self.counters["restored_segments"] += 1
+        return super().download_file(bucket, key, path)
+
+    def upload_file(self, path, bucket, key, content_type):
+        self._alive()
+        super().upload_file(path, bucket, key, content_type)
+        if key.startswith(CHECKPOINT_PREFIX):
+            self.counters["encoded_segments"] += 1
+
+    def delete(self, bucket, key):
+        self._alive()
+        super().delete(bucket, key)
+
+
+def run_attempt(client, job_data, workers, kill_after_clips=None, kill_after_segments=None):
+    """One run of process_video_job in a fresh worker, returns its counters, killed is set when it died"""
+    s3_io = KillingS3IO(client, kill_after_clips, kill_after_segments)
+    worker = load_stub_worker(s3_io, EXPORT_SEGMENT_WORKERS=workers, JOB_CHECKPOINTS="true",
+                              PREVIEW_DELIVERY="false", RENDER_ENGINE="ffmpeg")
+    pipe = worker.model_registry.get_pipeline()
+    started = time.perf_counter()
+    result = None
+    try:
+        result = worker.process_video_job(job_data)
+    except WorkerKilled:
+        pass
+    counters = dict(s3_io.counters)
+    counters["generated_images"] = sum(len(call["prompts"]) for call in pipe.calls)
+    counters["killed"] = s3_io.killed
+    counters["success"] = bool(result and result["success"])
+    counters["seconds"] = time.perf_counter() - started
+    return counters
+
+
+def run(clip_count, words_per_clip, clip_seconds, workers, kill_after_clips, kill_after_segments):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    transcript = make_transcript(clip_count, words_per_clip, clip_seconds)
+
+    with mock_aws(), tempfile.TemporaryDirectory() as work_dir:
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        job_data = upload_job_inputs(S3IO(client), BUCKET, VIDEO_ID, transcript, work_dir, export_profile="preview")
+
+        attempts = [
+            run_attempt(client, job_data, workers, kill_after_clips=kill_after_clips),
+            run_attempt(client, job_data, workers, kill_after_segments=kill_after_segments),
+            run_attempt(client, job_data, workers),
+        ]
+        leftover = client.list_objects_v2(Bucket=BUCKET, Prefix=CHECKPOINT_PREFIX).get("KeyCount", 0)
+        video_uploaded = client.list_objects_v2(Bucket=BUCKET, Prefix=f"videos/{VIDEO_ID}.mp4").get("KeyCount", 0)
+
+    print(f"=== Job resume: {clip_count} clips, {transcript['duration']:.1f}s through process_video_job ===")
+    print(f"{'attempt':<8} {'restored img':>12} {'generated img':>13} {'restored seg':>12} {'encoded seg':>11} "
+          f"{'seconds':>8}  outcome")
+    for index, counters in enumerate(attempts):
+        outcome = counters["killed"] or ("finished" if counters["success"] else "failed")
+        print(f"{index + 1:<8} {counters['restored_images']:>12} {counters['generated_images']:>13} "
+              f"{counters['restored_segments']:>12} {counters['encoded_segments']:>11} {counters['seconds']:>8.2f}  "
+              f"{outcome}")
+
+    assert attempts[0]["killed"] and attempts[1]["killed"], "the first two attempts must be killed"
+    assert attempts[2]["success"] and video_uploaded, "the last attempt did not upload the video"
+    assert attempts[1]["restored_images"] >= kill_after_clips, "the second attempt regenerated checkpointed clips"
+    assert attempts[2]["generated_images"] == 0, "the last attempt regenerated images"
+    assert attempts[2]["restored_images"] == clip_count, "the last attempt did not restore every clip"
+    assert attempts[2]["restored_segments"] >= kill_after_segments, "the last attempt re-encoded finished segments"
+    assert leftover == 0, f"{leftover} checkpoint objects left behind"
+    generated = sum(counters["generated_images"] for counters in attempts)
+    print(f"{generated} images generated for {clip_count} clips across the restarts, "
+          f"{attempts[2]['restored_segments']} segments reused, checkpoint removed after the upload")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=15)
+    parser.add_argument("--words", type=int, default=6)
+    parser.add_argument("--clip-seconds", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--kill-after-clips", type=int, default=9)
+    parser.add_argument("--kill-after-segments", type=int, default=4)
+    args = parser.parse_args()
+    run(args.clips, args.words, args.clip_seconds, args.workers, args.kill_after_clips, args.kill_after_segments)
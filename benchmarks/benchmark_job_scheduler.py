@@ -0,0 +1,110 @@
+"""
+Queue wait of stub jobs per GPU worker slot count, and resubmissions of queued and running jobs through /process.
+
+    pip install flask moviepy
+    python benchmarks/benchmark_job_scheduler.py --jobs 8 --job-seconds 0.2 --slots 1 2 4
+
+The scheduler runs jobs that sleep for --job-seconds. A job posted again while it is still queued or running
+must keep its place, answer with its current status and queue position, and run only once.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_scheduler import JOB_QUEUED, JOB_RUNNING, JobScheduler
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not reached")
+        time.sleep(0.01)
+
+
+def run_slots(job_count, job_seconds, slots):
+    finished = threading.Event()
+    done = []
+
+    def work(job_data):
+        time.sleep(job_seconds)
+        done.append(job_data["video_id"])
+        if len(done) == job_count:
+            finished.set()
+        return {"success": True}
+
+    scheduler = JobScheduler(work, max_queue_size=job_count, worker_count=slots)
+    scheduler.start()
+    started = time.perf_counter()
+    for i in range(job_count):
+        scheduler.submit(f"video_{i}", {"video_id": f"video_{i}"})
+    finished.wait()
+    seconds = time.perf_counter() - started
+    waits = [status["started_at"] - status["submitted_at"]
+             for status in (scheduler.get_status(f"video_{i}") for i in range(job_count))]
+    scheduler.shutdown()
+    return {"seconds": seconds, "median_wait": statistics.median(waits), "max_wait": max(waits)}
+
+
+def check_duplicate_submits():
+    # Imported lazily, the worker module pulls in MoviePy and Flask
+    import runpod_video_generator as worker
+
+    release = threading.Event()
+    runs = []
+
+    def work(job_data):
+        runs.append(job_data["video_id"])
+        release.wait(10)
+        return {"success": True}
+
+    worker.job_scheduler = JobScheduler(work, max_queue_size=4, worker_count=1)
+    worker.job_scheduler.start()
+    client = worker.app.test_client()
+    post = lambda video_id: client.post("/process", json={"video_id": video_id})
+    try:
+        first = post("video_running")
+        wait_for(lambda: worker.job_scheduler.get_status("video_running")["status"] == JOB_RUNNING)
+        queued = post("video_waiting")
+        running_again = post("video_running")
+        queued_again = post("video_waiting")
+    finally:
+        release.set()
+    wait_for(worker.job_scheduler.is_idle)
+    worker.job_scheduler.shutdown()
+
+    for response in (first, queued, running_again, queued_again):
+        print(f"POST /process {response.status_code} {response.get_json()}")
+    assert first.get_json()["duplicate"] is False and queued.get_json()["queue_position"] == 1
+    running_body = running_again.get_json()
+    assert running_again.status_code == 202 and running_body["duplicate"] is True
+    assert running_body["status"] == JOB_RUNNING and running_body["queue_position"] is None
+    assert "already running" in running_body["message"]
+    queued_body = queued_again.get_json()
+    assert queued_body["duplicate"] is True and queued_body["status"] == JOB_QUEUED
+    assert queued_body["queue_position"] == 1, "a resubmitted queued job must keep its place"
+    assert runs == ["video_running", "video_waiting"], f"resubmitted jobs ran again: {runs}"
+    print("Resubmitted jobs kept their status and place and ran once")
+
+
+def run(job_count, job_seconds, slot_counts):
+    print(f"=== Job scheduler: {job_count} jobs of {job_seconds:.2f}s ===")
+    print(f"{'slots':>5} {'seconds':>8} {'median wait':>11} {'max wait':>9}")
+    for slots in slot_counts:
+        result = run_slots(job_count, job_seconds, slots)
+        print(f"{slots:>5} {result['seconds']:>8.2f} {result['median_wait']:>11.2f} {result['max_wait']:>9.2f}")
+    check_duplicate_submits()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--job-seconds", type=float, default=0.2)
+    parser.add_argument("--slots", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    run(args.jobs, args.job_seconds, args.slots)
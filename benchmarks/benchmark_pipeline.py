@@ -0,0 +1,315 @@
+"""
+Time the render pipeline stage by stage on synthetic transcripts, with a stub in place of FLUX, and write
+the results as JSON so runs can be compared.
+
+    python benchmarks/benchmark_pipeline.py --clips 15 --words 10 --clip-seconds 4 --output results.json
+    python benchmarks/benchmark_pipeline.py --clips 15 --baseline results.json --fail-on-regression
+
+Stages: image_generation (stub FLUX through BatchedImageGenerator), caption_building (sprites
+rasterized from a cold cache plus frame clip preparation), caption_building_warm (same with every
+sprite cached), compositing (PIL frames without encoding) and encoding (ffmpeg fed precomposited
+frames, so compositing is not counted twice). The worker stages run the worker's own
+generate_video_from_images with the stub FLUX behind its model registry and image uploads going to moto:
+worker_ffmpeg with RENDER_ENGINE=ffmpeg, worker_moviepy with RENDER_ENGINE=moviepy (create_captions,
+CompositeVideoClip and write_videofile), plus moviepy_captions, the create_captions ImageClips alone.
+They need moviepy, flask and moto and are skipped with a message when one is missing;
+--worker-engines with no value skips them too.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import cycle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import load_stub_worker, make_image, make_transcript, write_silent_wav
+from caption_cache import CaptionSpriteCache
+from frame_renderer import FfmpegFrameRenderer, prepare_frame_clip
+from image_generation import BatchedImageGenerator
+from model_registry import FakeFluxPipeline, FakePipelineOutput, ModelRegistry
+
+RESULTS_FORMAT_VERSION = 1
+WORKER_BUCKET = "content-creator-benchmark"
+WORKER_DEPENDENCIES = ("moviepy", "flask", "moto")
+
+
+class StubFluxPipeline(FakeFluxPipeline):
+    """FakeFluxPipeline with gradient images, solid colors would make the encoder look faster than it is"""
+
+    def __call__(self, prompt, negative_prompt=None, height=1080, width=1080, **kwargs):
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        super().__call__(prompts, negative_prompt, height=height, width=width, **kwargs)
+        return FakePipelineOutput([make_image(len(self.calls) * 31 + i, (width, height)) for i in range(len(prompts))])
+
+
+class PrecompositedRenderer(FfmpegFrameRenderer):
+    """Streams already composited frames, so only ffmpeg's encoding time is measured"""
+
+    def __init__(self, frames, **kwargs):
+        super().__init__(**kwargs)
+        self.frame_bytes = [frame.tobytes() for frame in frames]
+
+    def iter_frames(self, clips, duration):
+        frames = cycle(self.frame_bytes)
+        for _ in range(int(round(duration * self.fps))):
+            yield _RawFrame(next(frames))
+
+
+class _RawFrame:
+    def __init__(self, data):
+        self.data = data
+
+    def tobytes(self):
+        return self.data
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def time_moviepy_captions(image_clips_data, frame_size):
+    # Imported lazily, the worker module pulls in MoviePy and Flask
+    from runpod_video_generator import create_captions
+
+    started = time.perf_counter()
+    for clip_data in image_clips_data:
+        create_captions(clip_data, frame_size)
+    return time.perf_counter() - started
+
+
+def available_worker_engines(engines):
+    """Render engines the worker stages can run here, prints why they are skipped otherwise"""
+    if not engines:
+        return []
+    missing = [name for name in WORKER_DEPENDENCIES if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"Skipping the worker and MoviePy stages, {', '.join(missing)} not installed "
+              f"(pip install \"moto[s3]\" flask moviepy)")
+        return []
+    return engines
+
+
+def time_worker_renders(transcript, stub_delay, work_dir, engines):
+    # Imported lazily, the worker module pulls in MoviePy and Flask and its uploads go to moto
+    import boto3
+    from moto import mock_aws
+    from s3_io import S3IO
+
+    timings = {}
+    render_engine = os.environ.get("RENDER_ENGINE")
+    audio_path = write_silent_wav(os.path.join(work_dir, "worker_audio.wav"), transcript["duration"] + 2)
+    try:
+        with mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket=WORKER_BUCKET)
+            worker = load_stub_worker(S3IO(client), PREVIEW_DELIVERY="false", EXPORT_SEGMENT_WORKERS=0)
+            worker.model_registry = ModelRegistry(
+                "stub-flux", execution_mode="full",
+                loader=lambda model_id, execution_mode=None: StubFluxPipeline(model_id, delay_seconds=stub_delay)
+            )
+            for engine in engines:
+                os.environ["RENDER_ENGINE"] = engine
+                output_path = os.path.join(work_dir, f"worker_{engine}.mp4")
+                started = time.perf_counter()
+                worker.generate_video_from_images(
+                    transcript, audio_path, output_path, WORKER_BUCKET, f"benchmark_{engine}"
+                )
+                timings[f"worker_{engine}"] = time.perf_counter() - started
+                assert os.path.getsize(output_path) > 0, f"the {engine} engine wrote no video"
+    finally:
+        if render_engine is None:
+            os.environ.pop("RENDER_ENGINE", None)
+        else:
+            os.environ["RENDER_ENGINE"] = render_engine
+    return timings
+
+
+def run_once(transcript, frame_size, fps, batch_size, stub_delay, work_dir, worker_engines=()):
+    image_clips_data = transcript["image_clips_data"]
+    clip_count = len(image_clips_data)
+    duration = transcript["duration"]
+    timings = {}
+
+    generator = BatchedImageGenerator(
+        StubFluxPipeline(delay_seconds=stub_delay),
+        batch_size,
+        generation_params={"width": frame_size[0], "height": frame_size[1]}
+    )
+    started = time.perf_counter()
+    images = generator.generate([
+        (i, clip_data["image_prompt"], clip_data["image_negative_prompt"])
+        for i, clip_data in enumerate(image_clips_data)
+    ])
+    timings["image_generation"] = time.perf_counter() - started
+
+    sprite_cache = CaptionSpriteCache(256 * 1024 ** 2)
+    for stage in ("caption_building", "caption_building_warm"):
+        started = time.perf_counter()
+        frame_clips = [
+            prepare_frame_clip(clip_data, images[i], i == clip_count - 1, sprite_cache=sprite_cache)
+            for i, clip_data in enumerate(image_clips_data)
+        ]
+        timings[stage] = time.perf_counter() - started
+    if "moviepy" in worker_engines:
+        timings["moviepy_captions"] = time_moviepy_captions(image_clips_data, frame_size)
+
+    renderer = FfmpegFrameRenderer(frame_size=frame_size, fps=fps)
+    started = time.perf_counter()
+    frame_count = 0
+    sample_frames = []
+    sample_every = max(1, int(round(duration * fps)) // max(1, clip_count))
+    for frame_index, frame in enumerate(renderer.iter_frames(frame_clips, duration)):
+        frame.tobytes()
+        frame_count += 1
+        if frame_index % sample_every == 0:
+            sample_frames.append(frame)
+    timings["compositing"] = time.perf_counter() - started
+
+    audio_path = write_silent_wav(os.path.join(work_dir, "audio.wav"), duration + 2)
+    output_path = os.path.join(work_dir, "output.mp4")
+    encoder = PrecompositedRenderer(sample_frames, frame_size=frame_size, fps=fps)
+    started = time.perf_counter()
+    encoder.render([], duration, output_path, audio_path)
+    timings["encoding"] = time.perf_counter() - started
+    timings.update(time_worker_renders(transcript, stub_delay, work_dir, worker_engines))
+
+    return timings, {
+        "frames": frame_count,
+        "pipeline_calls": generator.pipeline_calls,
+        "sprite_rasterizations": sprite_cache.stats()["rasterizations"],
+        "output_bytes": os.path.getsize(output_path),
+    }
+
+
+def summarize(runs):
+    stages = {}
+    for stage in runs[0]:
+        values = [run[stage] for run in runs]
+        stages[stage] = {
+            "median_seconds": round(statistics.median(values), 4),
+            "min_seconds": round(min(values), 4),
+            "runs": [round(value, 4) for value in values],
+        }
+    return stages
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Stages whose median got slower than the baseline by more than tolerance and min_delta seconds"""
+    regressions = []
+    print(f"{'stage':<22} {'baseline s':>11} {'current s':>10} {'change':>8}")
+    for stage, entry in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous["median_seconds"]:
+            continue
+        ratio = entry["median_seconds"] / previous["median_seconds"]
+        delta = entry["median_seconds"] - previous["median_seconds"]
+        flag = "  REGRESSION" if ratio > 1 + tolerance and delta > min_delta else ""
+        print(f"{stage:<22} {previous['median_seconds']:>11.4f} {entry['median_seconds']:>10.4f} "
+              f"{(ratio - 1) * 100:>+7.1f}%{flag}")
+        if flag:
+            regressions.append(stage)
+    comparable = lambda params: {key: value for key, value in (params or {}).items() if key != "repeats"}
+    if comparable(baseline.get("params")) != comparable(results["params"]):
+        print("Warning: the baseline was recorded with different parameters")
+    return regressions
+
+
+def run(args):
+    clip_seconds = args.duration / args.clips if args.duration else args.clip_seconds
+    transcript = make_transcript(args.clips, args.words, clip_seconds, seed=args.seed)
+    frame_size = (args.size, args.size)
+
+    worker_engines = available_worker_engines(args.worker_engines)
+    runs = []
+    counters = None
+    for repeat in range(args.repeats):
+        with tempfile.TemporaryDirectory() as work_dir:
+            timings, counters = run_once(
+                transcript, frame_size, args.fps, args.batch_size, args.stub_delay, work_dir,
+                worker_engines=worker_engines
+            )
+        timings["total"] = sum(timings.values())
+        runs.append(timings)
+        print(f"Run {repeat + 1}/{args.repeats}: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in timings.items()))
+
+    results = {
+        "benchmark": "render_pipeline",
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": FfmpegFrameRenderer().ffmpeg_binary,
+        },
+        "params": {
+            "clips": args.clips,
+            "words_per_clip": args.words,
+            "clip_seconds": round(clip_seconds, 4),
+            "duration_seconds": transcript["duration"],
+            "fps": args.fps,
+            "frame_size": list(frame_size),
+            "batch_size": args.batch_size,
+            "stub_delay_seconds": args.stub_delay,
+            "worker_engines": list(worker_engines),
+            "repeats": args.repeats,
+        },
+        "counters": counters,
+        "stages": summarize(runs),
+    }
+
+    print(f"=== Render pipeline: {args.clips} clips, {args.words} words per clip, "
+          f"{transcript['duration']:.1f}s at {args.fps} fps, median of {args.repeats} ===")
+    for stage, entry in results["stages"].items():
+        print(f"{stage:>22}: {entry['median_seconds']:8.3f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+    return results, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=15)
+    parser.add_argument("--words", type=int, default=10)
+    parser.add_argument("--clip-seconds", type=float, default=4.0)
+    parser.add_argument("--duration", type=float, default=None, help="Total seconds, overrides --clip-seconds")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--size", type=int, default=1080)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--stub-delay", type=float, default=0.0, help="Seconds the stub FLUX spends per image")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--worker-engines", nargs="*", default=["ffmpeg", "moviepy"], choices=["ffmpeg", "moviepy"],
+                        help="Render engines timed through generate_video_from_images, none skips the worker stages")
+    parser.add_argument("--output", default=None, help="Write the JSON results to this path")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before a stage regresses")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Slowdowns below this many seconds are noise")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    _, regressions = run(args)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
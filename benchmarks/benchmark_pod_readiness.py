@@ -0,0 +1,89 @@
+"""
+Time the /health readiness probe against a local stub of a booting pod, next to the fixed sleeps it replaced.
+
+    python benchmarks/benchmark_pod_readiness.py --boot 2.5 --load 1.5
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pod_readiness import PodReadinessProbe
+
+
+def start_stub_pod(boot_seconds, load_seconds, fail_model=False):
+    """Proxy errors until the container boots, then /health with model_loaded once the model is loaded"""
+    started = time.monotonic()
+
+    class StubPodHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            elapsed = time.monotonic() - started
+            if elapsed < boot_seconds:
+                status, body = 502, b"<html>Bad Gateway</html>"
+            else:
+                loaded = elapsed >= boot_seconds + load_seconds
+                state = "error" if fail_model and loaded else ("loaded" if loaded else "loading")
+                body = json.dumps({
+                    "status": "healthy",
+                    "model_loaded": loaded and not fail_model,
+                    "model_status": {"state": state, "error": "out of memory" if fail_model else None},
+                }).encode("utf-8")
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPodHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def fixed_sleep_seconds(boot_seconds, poll_seconds=10, settle_seconds=10):
+    """When the previous handler posted the job: uptime polled every 10 s, then another 10 s sleep"""
+    return math.ceil(boot_seconds / poll_seconds) * poll_seconds + settle_seconds
+
+
+def run(boot_seconds, load_seconds, timeout_seconds):
+    rows = []
+    for label, fail_model in (("model loads", False), ("model fails", True)):
+        server = start_stub_pod(boot_seconds, load_seconds, fail_model)
+        probe = PodReadinessProbe(
+            f"http://127.0.0.1:{server.server_address[1]}/health",
+            timeout_seconds=timeout_seconds,
+            initial_delay=0.25,
+            max_delay=2.0,
+            request_timeout=1.0
+        )
+        started = time.perf_counter()
+        health = probe.wait()
+        seconds = time.perf_counter() - started
+        server.shutdown()
+        rows.append((label, health is not None, seconds, probe.attempts))
+
+    print(f"Pod boots in {boot_seconds}s, model loads {load_seconds}s later")
+    print(f"Fixed sleeps posted after {fixed_sleep_seconds(boot_seconds):.1f}s, whether or not the model was loaded")
+    print(f"{'case':<12} {'ready':>6} {'waited s':>9} {'checks':>7}")
+    for label, ready, seconds, attempts in rows:
+        print(f"{label:<12} {str(ready):>6} {seconds:>9.2f} {attempts:>7}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boot", type=float, default=2.5)
+    parser.add_argument("--load", type=float, default=1.5)
+    parser.add_argument("--timeout", type=float, default=20.0)
+    args = parser.parse_args()
+    run(args.boot, args.load, args.timeout)
@@ -0,0 +1,118 @@
+"""
+Time to the preview against time to the final video, running the worker's process_video_job against moto.
+
+    pip install "moto[s3]" flask moviepy
+    python benchmarks/benchmark_preview_delivery.py --clips 8 --clip-seconds 3 --preview-size 360
+
+The job runs with FakeFluxPipeline behind the model registry, once with the preview and once with
+"preview": false. The preview must reach S3 before the final video and have its duration, and the
+metadata must move from processing to preview_ready to completed, or straight to completed without one.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto import mock_aws
+
+from benchmarks.benchmark_segmented_export import probe_timestamps
+from benchmarks.synthetic_fixtures import load_stub_worker, make_transcript, upload_job_inputs
+from frame_renderer import get_ffmpeg_binary
+from preview_delivery import preview_key
+from s3_io import S3IO
+
+BUCKET = "content-creator-benchmark"
+
+
+class RecordingS3IO(S3IO):
+    """S3IO that notes when videos land in S3 and every status the job's metadata goes through"""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.started = time.perf_counter()
+        self.uploaded_at = {}
+        self.statuses = []
+
+    def upload_file(self, path, bucket, key, content_type):
+        super().upload_file(path, bucket, key, content_type)
+        self.uploaded_at[key] = time.perf_counter() - self.started
+
+    def put_json(self, bucket, key, data):
+        super().put_json(bucket, key, data)
+        if key.startswith("metadata/"):
+            self.statuses.append(data["status"])
+
+
+def run_job(client, transcript, work_dir, video_id, preview_size, **job_fields):
+    s3_io = RecordingS3IO(client)
+    job_data = upload_job_inputs(s3_io, BUCKET, video_id, transcript, work_dir, **job_fields)
+    # What the Lambda leaves before the pod starts
+    s3_io.put_json(BUCKET, f"metadata/{video_id}.json", {"video_id": video_id, "status": "processing"})
+    worker = load_stub_worker(s3_io, PREVIEW_DELIVERY="true", PREVIEW_SIZE=preview_size, RENDER_ENGINE="ffmpeg",
+                              JOB_CHECKPOINTS="false", EXPORT_SEGMENT_WORKERS=0)
+    s3_io.started = time.perf_counter()
+    result = worker.process_video_job(job_data)
+    assert result["success"], f"job {video_id} failed: {result.get('error')}"
+    metadata = s3_io.read_json(BUCKET, f"metadata/{video_id}.json")
+    return result, s3_io, metadata
+
+
+def run(clip_count, words_per_clip, clip_seconds, preview_size):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    transcript = make_transcript(clip_count, words_per_clip, clip_seconds)
+
+    with mock_aws(), tempfile.TemporaryDirectory() as work_dir:
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        result, s3_io, metadata = run_job(client, transcript, work_dir, "video_preview", preview_size,
+                                          export_profile="production")
+        plain_result, plain_s3_io, plain_metadata = run_job(client, transcript, work_dir, "video_final_only",
+                                                            preview_size, export_profile="production", preview=False)
+
+        paths = {}
+        for name, key in (("preview", preview_key("video_preview")), ("final", result["video_key"])):
+            paths[name] = os.path.join(work_dir, f"{name}.mp4")
+            client.download_file(BUCKET, key, paths[name])
+        probes = {name: probe_timestamps(get_ffmpeg_binary(), path) for name, path in paths.items()}
+        sizes = {name: os.path.getsize(path) for name, path in paths.items()}
+
+    preview_ready = s3_io.uploaded_at[preview_key("video_preview")]
+    final_ready = s3_io.uploaded_at[result["video_key"]]
+    plain_ready = plain_s3_io.uploaded_at[plain_result["video_key"]]
+    (preview_timestamps, preview_duration), (final_timestamps, final_duration) = probes["preview"], probes["final"]
+    preview_fps = len(preview_timestamps) / preview_duration
+
+    print(f"=== Preview delivery through process_video_job: {clip_count} clips, {transcript['duration']:.1f}s, "
+          f"preview {preview_size}px ===")
+    print(f"{'preview':>8}: in S3 after {preview_ready:6.2f}s  {sizes['preview'] / 1024:9.1f} KiB  "
+          f"{len(preview_timestamps)} frames  {preview_duration:.3f}s")
+    print(f"{'final':>8}: in S3 after {final_ready:6.2f}s  {sizes['final'] / 1024:9.1f} KiB  "
+          f"{len(final_timestamps)} frames  {final_duration:.3f}s")
+    print(f"Without a preview the final video was in S3 after {plain_ready:.2f}s, "
+          f"the preview added {final_ready - plain_ready:+.2f}s to the job")
+    print(f"Metadata status with preview: {' -> '.join(s3_io.statuses)}, without: {' -> '.join(plain_s3_io.statuses)}")
+    print(f"Delivery block: {metadata['delivery']}")
+
+    assert result["preview_key"] == preview_key("video_preview") and plain_result["preview_key"] is None
+    assert preview_ready < final_ready, "the preview must reach S3 before the final video"
+    assert abs(preview_duration - final_duration) < 2 / preview_fps, "the preview must last as long as the video"
+    assert s3_io.statuses[-2:] == ["preview_ready", "completed"], f"statuses: {s3_io.statuses}"
+    assert metadata["delivery"]["stage"] == "final" and metadata["delivery"]["preview_key"]
+    assert plain_s3_io.statuses[-1] == "completed" and "preview_ready" not in plain_s3_io.statuses
+    assert plain_metadata["delivery"]["stage"] == "final"
+    assert plain_metadata["delivery"]["video_key"] == plain_result["video_key"]
+    print("Preview delivered first, final video recorded with and without a preview")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--words", type=int, default=8)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--preview-size", type=int, default=360)
+    args = parser.parse_args()
+    run(args.clips, args.words, args.clip_seconds, args.preview_size)
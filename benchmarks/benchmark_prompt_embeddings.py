@@ -0,0 +1,163 @@
+"""
+Text encoder work per job with prompt text passed to every pipeline call vs. the per-job embedding cache.
+
+    python benchmarks/benchmark_prompt_embeddings.py --clips 15 --prefix-words 80 --clip-latency 0.02 --t5-latency 0.1
+
+A stub encoder stands in for CLIP and T5: it truncates CLIP input at 77 tokens like the real tokenizer and
+sleeps per prompt. The prompts share a long style prefix and suffix the way the Deepseek clip prompts do,
+and a second pass over the same clips plays a batch retried after running out of memory. T5 reads the whole
+prompt, so in a single pass every clip still costs one T5 encode, only CLIP is shared.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_generation import LATENT_MODES, BatchedImageGenerator, clip_seeds, story_seed
+from model_registry import FakeFluxPipeline
+from prompt_embeddings import PromptEmbeddingCache
+
+CLIP_MAX_TOKENS = 77
+STYLE_WORDS = ("cinematic", "photorealistic", "soft", "golden", "hour", "light", "consistent", "palette",
+               "shallow", "depth", "of", "field", "35mm", "film", "grain", "muted", "teal", "orange")
+
+
+class StubPromptEncoder:
+    """Counts encoder calls, whitespace tokens stand in for the CLIP and T5 tokenizers"""
+
+    def __init__(self, clip_latency, t5_latency):
+        self.clip_latency = clip_latency
+        self.t5_latency = t5_latency
+        self.calls = {"clip": 0, "t5": 0}
+
+    def clip_key(self, prompt):
+        return tuple(prompt.split()[:CLIP_MAX_TOKENS])
+
+    def t5_key(self, prompt):
+        return prompt
+
+    def encode_clip(self, prompts):
+        self.calls["clip"] += len(prompts)
+        time.sleep(self.clip_latency * len(prompts))
+        return [f"clip:{' '.join(self.clip_key(prompt))}" for prompt in prompts]
+
+    def encode_t5(self, prompts):
+        self.calls["t5"] += len(prompts)
+        time.sleep(self.t5_latency * len(prompts))
+        return [f"t5:{prompt}" for prompt in prompts]
+
+    def pipeline_kwargs(self, clip_embeds, t5_embeds):
+        return {"prompt_embeds": t5_embeds, "pooled_prompt_embeds": clip_embeds}
+
+
+class TextEncodingPipeline(FakeFluxPipeline):
+    """Fake FLUX that runs the stub encoder on its prompt text every call, like FluxPipeline does"""
+
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def __call__(self, prompt=None, negative_prompt=None, prompt_embeds=None, **kwargs):
+        if prompt is not None:
+            self.encoder.encode_clip(prompt)
+            self.encoder.encode_t5(prompt)
+        return super().__call__(prompt, negative_prompt, prompt_embeds=prompt_embeds, **kwargs)
+
+
+class GeneratorRecordingPipeline(FakeFluxPipeline):
+    """Fake FLUX that keeps the generator argument of every call"""
+
+    def __init__(self):
+        super().__init__()
+        self.generators = []
+
+    def __call__(self, prompt=None, negative_prompt=None, generator=None, **kwargs):
+        self.generators.append(generator)
+        return super().__call__(prompt, negative_prompt, **kwargs)
+
+
+def check_mixed_seed_batch():
+    # Per-clip seed overrides with random latents: clips 0 and 2 are seeded, 1 and 3 are not
+    pipe = GeneratorRecordingPipeline()
+    generator = BatchedImageGenerator(pipe, 4, generation_params={"width": 64, "height": 64},
+                                      seeds={0: 11, 2: 13}, generator_factory=lambda seed: seed)
+    prompt_requests = [(i, f"scene {i}", "blurry") for i in range(4)]
+    generator.generate(prompt_requests)
+    generator.generate(prompt_requests)
+    first, second = pipe.generators
+    assert len(first) == 4 and first[0] == 11 and first[2] == 13, f"seeded clips lost their seeds: {first}"
+    assert first[1] != second[1] or first[3] != second[3], "unseeded clips must keep drawing random noise"
+    unseeded = BatchedImageGenerator(pipe, 4, generation_params={"width": 64, "height": 64})
+    unseeded.generate(prompt_requests)
+    assert pipe.generators[-1] is None, "batches without seeds must not get generators"
+    print(f"Mixed batch generators: {first}, seeded clips keep their seeds")
+
+
+def make_prompts(clip_count, prefix_words, suffix_words):
+    prefix = " ".join(STYLE_WORDS[i % len(STYLE_WORDS)] for i in range(prefix_words))
+    suffix = " ".join(STYLE_WORDS[-1 - i % len(STYLE_WORDS)] for i in range(suffix_words))
+    return [
+        (i, f"{prefix}, scene {i}: a traveller crossing bridge number {i} at dusk, {suffix}", "blurry, low quality")
+        for i in range(clip_count)
+    ]
+
+
+def run_mode(prompt_requests, cached, batch_size, clip_latency, t5_latency):
+    encoder = StubPromptEncoder(clip_latency, t5_latency)
+    pipe = TextEncodingPipeline(encoder)
+    embeddings = PromptEmbeddingCache(encoder) if cached else None
+    generator = BatchedImageGenerator(
+        pipe, batch_size, generation_params={"width": 64, "height": 64}, prompt_embeddings=embeddings
+    )
+    started = time.perf_counter()
+    generator.generate(prompt_requests)
+    one_pass = dict(encoder.calls)
+    # The same clips again, as when a batch is retried after running out of memory
+    generator.generate(prompt_requests)
+    seconds = time.perf_counter() - started
+    assert all(call["prompt_embeds"] == cached for call in pipe.calls)
+    return {"seconds": seconds, "one_pass": one_pass, "encoder_calls": dict(encoder.calls),
+            "cache": embeddings.stats() if cached else None}
+
+
+def run(clip_count, prefix_words, suffix_words, batch_size, clip_latency, t5_latency):
+    prompt_requests = make_prompts(clip_count, prefix_words, suffix_words)
+    results = {
+        "prompt text": run_mode(prompt_requests, False, batch_size, clip_latency, t5_latency),
+        "cached embeds": run_mode(prompt_requests, True, batch_size, clip_latency, t5_latency),
+    }
+
+    print(f"=== Prompt embeddings: {clip_count} clips, one pass then a retry, {prefix_words} word style prefix ===")
+    print(f"{'mode':<14} {'CLIP one pass':>13} {'T5 one pass':>11} {'CLIP +retry':>11} {'T5 +retry':>9} "
+          f"{'seconds':>8}")
+    for mode, entry in results.items():
+        print(f"{mode:<14} {entry['one_pass']['clip']:>13} {entry['one_pass']['t5']:>11} "
+              f"{entry['encoder_calls']['clip']:>11} {entry['encoder_calls']['t5']:>9} {entry['seconds']:>8.2f}")
+    cached = results["cached embeds"]
+    # Every clip prompt is different, so a single pass saves no T5 work, only the retry reuses it
+    assert cached["one_pass"]["t5"] == results["prompt text"]["one_pass"]["t5"] == clip_count
+    assert cached["encoder_calls"]["t5"] == clip_count, "a retried batch should not re-encode T5"
+    if prefix_words >= CLIP_MAX_TOKENS:
+        assert cached["one_pass"]["clip"] == 1, "prompts sharing the first 77 tokens should share one CLIP embedding"
+
+    print("=== Initial latent seeds per mode, story seed of video_demo ===")
+    seed = story_seed("video_demo")
+    for latent_mode in LATENT_MODES:
+        seeds = clip_seeds(min(clip_count, 4), seed, latent_mode)
+        print(f"{latent_mode:<8} {[seeds.get(i) for i in range(min(clip_count, 4))]}")
+    check_mixed_seed_batch()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=15)
+    parser.add_argument("--prefix-words", type=int, default=80)
+    parser.add_argument("--suffix-words", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--clip-latency", type=float, default=0.02, help="Seconds the stub CLIP spends per prompt")
+    parser.add_argument("--t5-latency", type=float, default=0.1, help="Seconds the stub T5 spends per prompt")
+    args = parser.parse_args()
+    run(args.clips, args.prefix_words, args.suffix_words, args.batch_size, args.clip_latency, args.t5_latency)
@@ -0,0 +1,95 @@
+"""
+Render time per quality tier with a stub FLUX whose cost grows with steps and pixels like the real one.
+
+    python benchmarks/benchmark_quality_tiers.py --clips 6 --step-cost 0.02
+
+Every tier goes through BatchedImageGenerator with its generation settings, draft images are upscaled to
+the video frame, and the job traces feed WorkerMetrics, whose per-tier histograms are printed at the end.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_image, make_transcript
+from frame_renderer import FRAME_SIZE
+from image_generation import BatchedImageGenerator
+from model_registry import FakeFluxPipeline, FakePipelineOutput
+from quality_tiers import QUALITY_TIERS, generation_params, resolve_quality_tier, upscale_to_frame
+from tracing import JobTrace, WorkerMetrics
+
+
+class CostedFluxPipeline(FakeFluxPipeline):
+    """Sleeps step_cost seconds per step and megapixel of every image, then returns gradient images"""
+
+    def __init__(self, step_cost):
+        super().__init__()
+        self.step_cost = step_cost
+
+    def __call__(self, prompt, negative_prompt=None, height=1080, width=1080, num_inference_steps=20, **kwargs):
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        super().__call__(prompts, negative_prompt, height=height, width=width,
+                         num_inference_steps=num_inference_steps, **kwargs)
+        time.sleep(self.step_cost * num_inference_steps * width * height / 1e6 * len(prompts))
+        return FakePipelineOutput([make_image(len(self.calls) * 31 + i, (width, height)) for i in range(len(prompts))])
+
+
+def render_tier(tier, image_clips_data, step_cost, batch_size, metrics):
+    trace = JobTrace(f"tier_{tier['name']}")
+    trace.labels["quality_tier"] = tier["name"]
+    pipe = CostedFluxPipeline(step_cost)
+    generator = BatchedImageGenerator(
+        pipe,
+        batch_size,
+        generation_params=generation_params(tier),
+        on_batch=lambda indexes, seconds: trace.record("diffusion_batch", seconds)
+    )
+    images = generator.generate([
+        (i, clip_data["image_prompt"], clip_data["image_negative_prompt"])
+        for i, clip_data in enumerate(image_clips_data)
+    ])
+    for i, image in images.items():
+        with trace.span("upscale", clip=i):
+            images[i] = upscale_to_frame(image, FRAME_SIZE)
+
+    assert all(call["width"] == tier["width"] and call["num_inference_steps"] == tier["num_inference_steps"]
+               for call in pipe.calls), "the pipeline did not get the tier's settings"
+    assert all(image.size == FRAME_SIZE for image in images.values()), "images must reach the frame size"
+    metrics.observe_job(trace, "done")
+    return trace.summary()
+
+
+def run(clip_count, step_cost, batch_size):
+    image_clips_data = make_transcript(clip_count, 6, 3.0)["image_clips_data"]
+    metrics = WorkerMetrics()
+    summaries = {name: render_tier(resolve_quality_tier(name), image_clips_data, step_cost, batch_size, metrics)
+                 for name in QUALITY_TIERS}
+
+    print(f"=== Quality tiers: {clip_count} clips, stub cost {step_cost}s per step and megapixel ===")
+    print(f"{'tier':<9} {'size':>9} {'steps':>5} {'diffusion s':>11} {'upscale s':>9} {'total s':>8} {'vs standard':>11}")
+    standard = summaries["standard"]["total_seconds"]
+    for name, summary in summaries.items():
+        tier = QUALITY_TIERS[name]
+        stages = summary["stages"]
+        size = f"{tier['width']}x{tier['height']}"
+        print(f"{name:<9} {size:>9} {tier['num_inference_steps']:>5} "
+              f"{stages['diffusion_batch']['total_seconds']:>11.2f} "
+              f"{stages.get('upscale', {}).get('total_seconds', 0.0):>9.3f} {summary['total_seconds']:>8.2f} "
+              f"{summary['total_seconds'] / standard:>10.2f}x")
+
+    print("=== /metrics per-tier diffusion time ===")
+    for line in metrics.render().splitlines():
+        if line.startswith("video_worker_quality_tier_diffusion_seconds_sum"):
+            print(line)
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--step-cost", type=float, default=0.02, help="Stub seconds per step and megapixel")
+    parser.add_argument("--batch-size", type=int, default=2)
+    args = parser.parse_args()
+    run(args.clips, args.step_cost, args.batch_size)
@@ -0,0 +1,73 @@
+"""
+Compare the MoviePy compositing export with the ffmpeg frame renderer on synthetic images.
+
+    python benchmarks/benchmark_render_engines.py --clips 5 --words 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviepy import AudioFileClip
+
+from benchmarks.synthetic_fixtures import make_transcript, make_image, write_silent_wav
+from export_profiles import EXPORT_PROFILES, resolve_export_profile
+from frame_renderer import prepare_frame_clip
+from runpod_video_generator import create_image_clip, export_with_frame_renderer, export_with_moviepy
+
+
+def run(clip_count, words_per_clip, clip_seconds, profile_name):
+    export_profile = resolve_export_profile(profile_name)
+    fps = export_profile["fps"]
+    transcript = make_transcript(clip_count, words_per_clip, clip_seconds)
+    image_clips_data = transcript["image_clips_data"]
+    duration = transcript["duration"]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = write_silent_wav(os.path.join(work_dir, "audio.wav"), duration + 2)
+        images = {}
+        image_paths = {}
+        for i in range(clip_count):
+            images[i] = make_image(i)
+            image_paths[i] = os.path.join(work_dir, f"image_{i}.png")
+            images[i].save(image_paths[i])
+
+        results = {}
+
+        started = time.perf_counter()
+        moviepy_clips = {
+            i: create_image_clip(image_clips_data[i], image_paths[i], i == clip_count - 1)
+            for i in range(clip_count)
+        }
+        moviepy_output = os.path.join(work_dir, "moviepy.mp4")
+        export_with_moviepy(moviepy_clips, image_clips_data, AudioFileClip(audio_path), duration, moviepy_output,
+                            export_profile)
+        results["moviepy"] = (time.perf_counter() - started, os.path.getsize(moviepy_output))
+
+        started = time.perf_counter()
+        frame_clips = {
+            i: prepare_frame_clip(image_clips_data[i], images[i], i == clip_count - 1)
+            for i in range(clip_count)
+        }
+        ffmpeg_output = os.path.join(work_dir, "ffmpeg.mp4")
+        export_with_frame_renderer(frame_clips, image_clips_data, audio_path, duration, ffmpeg_output, export_profile)
+        results["ffmpeg"] = (time.perf_counter() - started, os.path.getsize(ffmpeg_output))
+
+    print(f"=== Render engines: {clip_count} clips, {words_per_clip} words per clip, {duration:.1f}s, {profile_name} profile at {fps} fps ===")
+    for engine, (seconds, size) in results.items():
+        print(f"{engine:>8}: {seconds:8.2f}s  {size / 1024:10.1f} KiB")
+    print(f"Speedup: {results['moviepy'][0] / results['ffmpeg'][0]:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", type=int, default=5)
+    parser.add_argument("--words", type=int, default=10)
+    parser.add_argument("--clip-seconds", type=float, default=4.0)
+    parser.add_argument("--profile", choices=list(EXPORT_PROFILES), default="legacy")
+    args = parser.parse_args()
+    run(args.clips, args.words, args.clip_seconds, args.profile)
@@ -0,0 +1,112 @@
+"""
+Single-pass frame renderer export against the segmented export on the same synthetic slideshow.
+
+    python benchmarks/benchmark_segmented_export.py --clips 8 --clip-seconds 3 --workers 4
+
+Both outputs are decoded again to check that the segmented video has the same frame timestamps as the
+single-pass one, a segment boundary that drops or repeats a frame fails the run.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_image, make_transcript, write_silent_wav
+from caption_cache import CaptionSpriteCache
+from export_profiles import EXPORT_PROFILES, ffmpeg_audio_args, ffmpeg_video_args, resolve_export_profile
+from frame_renderer import FfmpegFrameRenderer, prepare_frame_clip
+from segmented_export import SegmentedExporter
+
+
+def probe_timestamps(ffmpeg_binary, path):
+    """Presentation timestamps in seconds of every decoded video frame, and the container duration"""
+    completed = subprocess.run(
+        [ffmpeg_binary, "-i", path, "-map", "0:v", "-f", "framemd5", "-"], capture_output=True, text=True, check=True
+    )
+    time_base = None
+    timestamps = []
+    for line in completed.stdout.splitlines():
+        match = re.match(r"#tb 0: (\d+)/(\d+)", line)
+        if match:
+            time_base = int(match.group(1)) / int(match.group(2))
+        elif line and not line.startswith("#"):
+            timestamps.append(int(line.split(",")[2]) * time_base)
+    duration = re.search(r"Duration: (\d+):(\d+):([\d.]+)", completed.stderr)
+    hours, minutes, seconds = duration.groups()
+    return timestamps, int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def run(clip_count, words_per_clip, clip_seconds, size, profile_name, workers):
+    profile = resolve_export_profile(profile_name)
+    fps = profile["fps"]
+    frame_size = (size, size)
+    transcript = make_transcript(clip_count, words_per_clip, clip_seconds)
+    image_clips_data = transcript["image_clips_data"]
+    duration = transcript["duration"]
+    sprite_cache = CaptionSpriteCache(256 * 1024 ** 2)
+    clips = [
+        prepare_frame_clip(clip_data, make_image(i, frame_size), i == clip_count - 1, sprite_cache=sprite_cache)
+        for i, clip_data in enumerate(image_clips_data)
+    ]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = write_silent_wav(os.path.join(work_dir, "audio.wav"), duration + 2)
+
+        single_path = os.path.join(work_dir, "single.mp4")
+        renderer = FfmpegFrameRenderer(frame_size=frame_size, fps=fps, video_args=ffmpeg_video_args(profile))
+        started = time.perf_counter()
+        renderer.render(clips, duration, single_path, audio_path)
+        single_seconds = time.perf_counter() - started
+
+        segmented_path = os.path.join(work_dir, "segmented.mp4")
+        exporter = SegmentedExporter(
+            FfmpegFrameRenderer(frame_size=frame_size, fps=fps, video_args=ffmpeg_video_args(profile, audio=False)),
+            audio_args=ffmpeg_audio_args(profile),
+            workers=workers
+        )
+        started = time.perf_counter()
+        segments = exporter.export(clips, duration, segmented_path, audio_path)
+        segmented_seconds = time.perf_counter() - started
+
+        single_timestamps, single_duration = probe_timestamps(renderer.ffmpeg_binary, single_path)
+        segmented_timestamps, segmented_duration = probe_timestamps(renderer.ffmpeg_binary, segmented_path)
+        sizes = os.path.getsize(single_path), os.path.getsize(segmented_path)
+
+    frame_seconds = 1 / fps
+    drift = max(
+        (abs(a - b) for a, b in zip(single_timestamps, segmented_timestamps)), default=0.0
+    )
+    matches = (
+        len(single_timestamps) == len(segmented_timestamps)
+        and drift < frame_seconds
+        and abs(single_duration - segmented_duration) < frame_seconds
+    )
+
+    print(f"=== Segmented export: {clip_count} clips, {duration:.1f}s at {size}x{size}, {fps} fps, "
+          f"profile {profile['name']}, {workers} processes ===")
+    print(f"{'single pass':>14}: {single_seconds:7.2f}s  {sizes[0] / 1024:9.1f} KiB  "
+          f"{len(single_timestamps)} frames  {single_duration:.3f}s")
+    print(f"{'segmented':>14}: {segmented_seconds:7.2f}s  {sizes[1] / 1024:9.1f} KiB  "
+          f"{len(segmented_timestamps)} frames  {segmented_duration:.3f}s")
+    print(f"Speedup: {single_seconds / segmented_seconds:.2f}x over {len(segments)} segments, "
+          f"slowest segment {max(segment['seconds'] for segment in segments):.2f}s")
+    print(f"Largest timestamp drift: {drift * 1000:.2f} ms, timing {'matches' if matches else 'DIFFERS'}")
+    return matches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--words", type=int, default=8)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--size", type=int, default=720)
+    parser.add_argument("--profile", choices=list(EXPORT_PROFILES), default="production")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    if not run(args.clips, args.words, args.clip_seconds, args.size, args.profile, args.workers):
+        sys.exit(1)
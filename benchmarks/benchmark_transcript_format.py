@@ -0,0 +1,129 @@
+"""
+Compare the indented JSON transcript with the compact versioned format, size and parse time.
+
+    python benchmarks/benchmark_transcript_format.py --seconds 60 600
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_alignment
+from transcript_alignment import align_clip_ranges, clip_span
+from transcript_format import decode_transcript, encode_transcript, load_transcript
+from word_segmentation import build_word_timestamps, find_boundaries
+
+
+def make_clip(clip_index, text, word_range, word_timestamps):
+    """Clip entry as the Lambda writes it, an empty word range sits between its neighbours' words"""
+    start, end, clip_words = clip_span(word_range, word_timestamps)
+    return {
+        "index": clip_index,
+        "text": text,
+        "start_time": start,
+        "end_time": end,
+        "word_timestamps": clip_words,
+        "word_range": list(word_range),
+        "duration": end - start,
+        "image_prompt": f"cinematic wide shot of scene {clip_index}: {text}",
+        "image_negative_prompt": "blurry, low quality, shaky, irrelevant content",
+    }
+
+
+def check_empty_ranges():
+    # Clips the aligner could not match get empty ranges (last == first - 1), in the middle and at the end
+    word_timestamps = [{"word": f"w{i}", "start": i * 0.25, "end": i * 0.25 + 0.2} for i in range(8)]
+    for ranges in ([(0, 3), (4, 7), (8, 7)], [(0, 1), (2, 1), (2, 7)], [(0, -1), (0, 7)]):
+        transcript = {
+            "script": " ".join(word["word"] for word in word_timestamps),
+            "duration": word_timestamps[-1]["end"],
+            "word_count": len(word_timestamps),
+            "word_timestamps": word_timestamps,
+            "image_clips_data": [make_clip(i, f"clip {i}", word_range, word_timestamps)
+                                 for i, word_range in enumerate(ranges)],
+            "clip_count": len(ranges),
+        }
+        decoded = decode_transcript(encode_transcript(transcript))
+        assert decoded == transcript, f"empty word ranges {ranges} did not round trip"
+        spans = [(clip["start_time"], clip["end_time"]) for clip in decoded["image_clips_data"]]
+        assert all(clip["duration"] >= 0 for clip in decoded["image_clips_data"]), f"negative duration: {spans}"
+        print(f"Word ranges {ranges} round trip as spans {spans}")
+
+
+def make_lambda_transcript(seconds, words_per_clip=10):
+    """Transcript built the way the Lambda builds it, from a synthetic character alignment"""
+    characters, starts, ends = make_alignment(seconds / 60)
+    word_timestamps = build_word_timestamps(characters, starts, ends)
+    boundaries = find_boundaries(word_timestamps)
+    clip_texts = [
+        " ".join(word["word"] for word in word_timestamps[first:first + words_per_clip])
+        for first in range(0, len(word_timestamps), words_per_clip)
+    ]
+
+    image_clips_data = [
+        make_clip(clip_index, text, word_range, word_timestamps)
+        for clip_index, (text, word_range) in enumerate(zip(clip_texts, align_clip_ranges(clip_texts, word_timestamps)))
+    ]
+
+    script = "".join(characters)
+    return {
+        "script": script,
+        "duration": ends[-1],
+        "word_count": len(script.split()),
+        "word_timestamps": word_timestamps,
+        "sentences": boundaries["sentences"],
+        "phrases": boundaries["phrases"],
+        "image_clips_data": image_clips_data,
+        "clip_count": len(clip_texts),
+        "full_alignment": {
+            "characters": characters,
+            "character_start_times_seconds": starts,
+            "character_end_times_seconds": ends,
+        },
+    }
+
+
+def timed(function, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - started) / repeats
+
+
+def run(second_values, repeats):
+    check_empty_ranges()
+    print(f"{'seconds':>8} {'words':>6} {'json KB':>8} {'compact KB':>11} {'ratio':>6} "
+          f"{'json parse s':>13} {'compact parse s':>16} {'encode s':>9}")
+    rows = []
+    for seconds in second_values:
+        transcript = make_lambda_transcript(seconds)
+        legacy = json.dumps(transcript, indent=2).encode("utf-8")
+        compact, encode_seconds = timed(lambda: encode_transcript(transcript), repeats)
+
+        legacy_parsed, legacy_seconds = timed(lambda: decode_transcript(legacy), repeats)
+        compact_parsed, compact_seconds = timed(lambda: decode_transcript(compact), repeats)
+        # The worker must see exactly what the Lambda built, whichever format it was written in
+        assert legacy_parsed == transcript, "Plain JSON transcripts must still be read unchanged"
+        assert compact_parsed == transcript, "Compact transcript must round trip exactly"
+        # S3IO.read_transcript reads from the streaming body instead of the whole object
+        assert load_transcript(io.BytesIO(compact)) == transcript, "Streamed compact transcript must round trip"
+        assert load_transcript(io.BytesIO(legacy)) == transcript, "Streamed plain JSON must be read unchanged"
+
+        rows.append((seconds, len(transcript["word_timestamps"]), len(legacy), len(compact),
+                     legacy_seconds, compact_seconds, encode_seconds))
+        print(f"{seconds:>8} {len(transcript['word_timestamps']):>6} {len(legacy) / 1024:>8.1f} "
+              f"{len(compact) / 1024:>11.1f} {len(legacy) / len(compact):>5.1f}x {legacy_seconds:>13.4f} "
+              f"{compact_seconds:>16.4f} {encode_seconds:>9.4f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[60, 600])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.seconds, args.repeats)
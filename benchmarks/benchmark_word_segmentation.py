@@ -0,0 +1,102 @@
+"""
+Compare the lambda's previous per-character word loop with the NumPy word segmentation.
+
+The speedup is the one of build_word_timestamps, the word dicts the Lambda stores. segment_words, the
+columnar form without the dicts, is timed alongside for reference.
+
+    python benchmarks/benchmark_word_segmentation.py --minutes 1 5 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_fixtures import make_alignment
+from word_segmentation import build_word_timestamps, find_boundaries, segment_words
+
+
+def build_word_timestamps_loop(characters, char_start_times, char_end_times):
+    """The lambda's previous implementation, kept here as the baseline"""
+    word_timestamps = []
+    current_word = ""
+    word_start_time = None
+
+    for i, (char, start_time, end_time) in enumerate(zip(characters, char_start_times, char_end_times)):
+        if char == ' ' or i == len(characters) - 1:
+            if current_word.strip():
+                current_word += char if i == len(characters) - 1 else ""
+                word_timestamps.append({
+                    "word": current_word.strip(),
+                    "start": word_start_time,
+                    "end": end_time
+                })
+            current_word = ""
+            word_start_time = None
+        else:
+            if word_start_time is None:
+                word_start_time = start_time
+            current_word += char
+    return word_timestamps
+
+
+EDGE_CASES = [
+    "Hello world.",
+    "Hello world ",
+    " leading space",
+    "double  space",
+    "ends with a",
+    "line\nbreak inside",
+    "x",
+]
+
+
+def check_edge_cases():
+    for text in EDGE_CASES:
+        characters = list(text)
+        starts = [i * 0.1 for i in range(len(characters))]
+        ends = [i * 0.1 + 0.1 for i in range(len(characters))]
+        expected = build_word_timestamps_loop(characters, starts, ends)
+        actual = build_word_timestamps(characters, starts, ends)
+        assert actual == expected, f"Mismatch for {text!r}: {actual} != {expected}"
+
+
+def run(minute_values, repeats):
+    check_edge_cases()
+    print(f"{'minutes':>8} {'chars':>8} {'words':>7} {'loop s':>9} {'dicts s':>9} {'columns s':>10} "
+          f"{'dict speedup':>12} {'sentences':>10} {'phrases':>8}")
+    rows = []
+    for minutes in minute_values:
+        characters, starts, ends = make_alignment(minutes)
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            expected = build_word_timestamps_loop(characters, starts, ends)
+        loop_seconds = (time.perf_counter() - started) / repeats
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            actual = build_word_timestamps(characters, starts, ends)
+        dicts_seconds = (time.perf_counter() - started) / repeats
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            segment_words(characters, starts, ends)
+        columns_seconds = (time.perf_counter() - started) / repeats
+
+        assert actual == expected, "NumPy word segmentation must match the previous loop"
+        boundaries = find_boundaries(actual)
+        rows.append((minutes, len(characters), len(actual), loop_seconds, dicts_seconds, columns_seconds))
+        print(f"{minutes:>8} {len(characters):>8} {len(actual):>7} {loop_seconds:>9.4f} {dicts_seconds:>9.4f} "
+              f"{columns_seconds:>10.4f} {loop_seconds / dicts_seconds:>11.1f}x "
+              f"{len(boundaries['sentences']):>10} {len(boundaries['phrases']):>8}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.minutes, args.repeats)
@@ -0,0 +1,122 @@
+import os
+import random
+import struct
+import wave
+
+WORDS = [
+    "the", "and", "she", "opens", "door", "finds", "letter", "from", "her", "father", "written",
+    "years", "ago", "rain", "falls", "on", "city", "as", "he", "runs", "toward", "old", "station",
+    "a", "stranger", "waits", "with", "key", "that", "changes", "everything", "they", "never", "knew",
+]
+
+
+def make_transcript(clip_count=15, words_per_clip=10, clip_seconds=4.0, seed=7):
+    """Transcript shaped like the one the Lambda uploads, with evenly spaced word timings"""
+    rng = random.Random(seed)
+    word_seconds = clip_seconds / words_per_clip
+    word_timestamps = []
+    image_clips_data = []
+    for clip_index in range(clip_count):
+        clip_words = []
+        for word_index in range(words_per_clip):
+            start = clip_index * clip_seconds + word_index * word_seconds
+            clip_words.append({
+                "word": rng.choice(WORDS),
+                "start": round(start, 3),
+                "end": round(start + word_seconds * 0.9, 3),
+            })
+        word_timestamps.extend(clip_words)
+        text = " ".join(word["word"] for word in clip_words)
+        start_time = clip_words[0]["start"]
+        end_time = clip_words[-1]["end"]
+        image_clips_data.append({
+            "index": clip_index,
+            "text": text,
+            "start_time": start_time,
+            "end_time": end_time,
+            "word_timestamps": clip_words,
+            "duration": end_time - start_time,
+            "image_prompt": f"cinematic wide shot of scene {clip_index}: {text}",
+            "image_negative_prompt": "blurry, low quality",
+        })
+
+    script = " ".join(clip["text"] for clip in image_clips_data)
+    return {
+        "script": script,
+        "duration": image_clips_data[-1]["end_time"] if image_clips_data else 0,
+        "word_count": len(word_timestamps),
+        "word_timestamps": word_timestamps,
+        "image_clips_data": image_clips_data,
+        "clip_count": clip_count,
+    }
+
+
+def make_alignment(minutes, seed=3, words_per_second=2.5, char_seconds=0.06):
+    """Character alignment shaped like the ElevenLabs with-timestamps response"""
+    rng = random.Random(seed)
+    words = []
+    for index in range(int(minutes * 60 * words_per_second)):
+        word = rng.choice(WORDS)
+        if index % 11 == 10:
+            word += rng.choice([".", ",", "!", "?"])
+        words.append(word.capitalize() if index % 11 == 0 else word)
+    text = " ".join(words) + "."
+
+    characters = list(text)
+    starts = []
+    ends = []
+    t = 0.0
+    for char in characters:
+        duration = char_seconds * (2 if char in ".!?" else 1)
+        starts.append(round(t, 3))
+        t += duration
+        ends.append(round(t, 3))
+    return characters, starts, ends
+
+
+def make_image(index, size=(1080, 1080)):
+    """Gradient test image, different per clip so encoders cannot cheat on identical frames"""
+    from PIL import Image
+
+    red = Image.linear_gradient("L").resize(size)
+    green = red.rotate(90 + index * 17)
+    blue = Image.new("L", size, (index * 37) % 256)
+    return Image.merge("RGB", (red, green, blue))
+
+
+def write_silent_wav(path, seconds, sample_rate=44100):
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        silence = struct.pack("<h", 0) * sample_rate
+        whole_seconds = int(seconds) + 1
+        for _ in range(whole_seconds):
+            wav_file.writeframes(silence)
+    return path
+
+
+def load_stub_worker(s3_io, **env):
+    """
+    The video worker module with FakeFluxPipeline behind its model registry and s3_io swapped in, so
+    process_video_job runs for real on CPU. env is applied first, the worker reads it per job.
+    """
+    os.environ.update({key: str(value) for key, value in env.items()})
+    import runpod_video_generator as worker
+    from model_registry import ModelRegistry, load_fake_pipeline
+
+    worker.s3_io = s3_io
+    worker.image_cache = None
+    worker.model_registry = ModelRegistry("fake-flux", loader=load_fake_pipeline, execution_mode="full")
+    return worker
+
+
+def upload_job_inputs(s3_io, bucket, video_id, transcript, work_dir, **job_fields):
+    """Transcript and silent voiceover in S3 the way the Lambda leaves them, returns the job payload"""
+    transcript_key = f"transcripts/{video_id}.json"
+    audio_key = f"audio/{video_id}.mp3"
+    s3_io.put_json(bucket, transcript_key, transcript)
+    audio_path = write_silent_wav(os.path.join(work_dir, f"{video_id}_voiceover.wav"), transcript["duration"] + 2)
+    s3_io.upload_file(audio_path, bucket, audio_key, "audio/wav")
+    return {"s3_bucket": bucket, "transcript_key": transcript_key, "audio_key": audio_key, "video_id": video_id,
+            **job_fields}
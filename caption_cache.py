@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+
+CAPTION_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+CAPTION_CANVAS_SIZE = (1080, 240)
+
+DEFAULT_CAPTION_STYLE = (
+    ("font_path", CAPTION_FONT_PATH),
+    ("font_size", 60),
+    ("color", (255, 255, 255)),
+    ("stroke_color", (0, 0, 0)),
+    ("stroke_width", 3),
+    ("canvas_size", CAPTION_CANVAS_SIZE),
+)
+
+
+def load_font(font_path, font_size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class CaptionSprite:
+    """A rasterized word cropped to its visible pixels, offset is its position on the caption canvas"""
+
+    def __init__(self, image, offset, canvas_size):
+        self.image = image
+        self.offset = offset
+        self.canvas_size = canvas_size
+
+    @property
+    def nbytes(self):
+        return self.image.width * self.image.height * 4
+
+    def to_array(self):
+        import numpy as np
+
+        return np.asarray(self.image)
+
+
+def rasterize_caption(word, style=DEFAULT_CAPTION_STYLE):
+    """Draw one caption word the way TextClip(method="caption") lays it out: centered on a transparent canvas"""
+    from PIL import Image, ImageDraw
+
+    options = dict(style)
+    canvas_size = options["canvas_size"]
+    canvas = Image.new("RGBA", canvas_size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    draw.text(
+        (canvas_size[0] / 2, canvas_size[1] / 2),
+        word,
+        font=load_font(options["font_path"], options["font_size"]),
+        fill=tuple(options["color"]) + (255,),
+        stroke_width=options["stroke_width"],
+        stroke_fill=tuple(options["stroke_color"]) + (255,),
+        anchor="mm"
+    )
+    box = canvas.getbbox() or (0, 0, 1, 1)
+    return CaptionSprite(canvas.crop(box), (box[0], box[1]), canvas_size)
+
+
+class CaptionSpriteCache:
+    """Memory-capped LRU of rasterized caption words shared by every clip and job in the process"""
+
+    def __init__(self, max_bytes, rasterizer=rasterize_caption):
+        self.max_bytes = max_bytes
+        self.rasterizer = rasterizer
+        self._lock = threading.Lock()
+        self._sprites = OrderedDict()
+        self._total_bytes = 0
+        self.counters = {"rasterizations": 0, "hits": 0, "evictions": 0}
+
+    def get(self, word, style=DEFAULT_CAPTION_STYLE):
+        key = (word, style)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.counters["hits"] += 1
+                return sprite
+
+        # Rasterize outside the lock so other words are not blocked, a rare duplicate render is harmless
+        sprite = self.rasterizer(word, style)
+        with self._lock:
+            self.counters["rasterizations"] += 1
+            if key not in self._sprites:
+                self._sprites[key] = sprite
+                self._total_bytes += sprite.nbytes
+                self._evict()
+        return sprite
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._sprites) > 1:
+            _, sprite = self._sprites.popitem(last=False)
+            self._total_bytes -= sprite.nbytes
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._sprites.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self._sprites)
+            stats["bytes"] = self._total_bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+# Process-wide cache so repeated words are rasterized once across clips and jobs
+caption_sprite_cache = CaptionSpriteCache(int(os.getenv("CAPTION_CACHE_MAX_BYTES", str(64 * 1024 ** 2))))
@@ -7,6 +7,12 @@ from datetime import datetime, timezone
 import re
 import random
 import uuid
+from job_manifests import JobManifestQueue
+from pod_readiness import PodReadinessProbe, backoff_delays
+from prompt_generation import ClipPromptClient
+from transcript_alignment import align_clip_ranges, clip_span
+from transcript_format import CONTENT_TYPE as COMPACT_TRANSCRIPT_CONTENT_TYPE, encode_transcript
+from word_segmentation import build_word_timestamps, find_boundaries
 
 DEEPSEEK_API_KEY = os.environ['DEEPSEEK_API_KEY']
 ELEVENLABS_API_KEY = os.environ['ELEVENLABS_API_KEY']
@@ -17,17 +23,6 @@ RUNPOD_POD_ID = os.environ['RUNPOD_POD_ID']
 def clean_text(text):
     return re.sub(r'[^\w\s.,?!:\']', '', text)  # \w = letters/numbers, \s = whitespace characters, .,?!:' are allowed
 
-def find_string_timestamps(word_timestamps, target_string):
-    target_words = target_string.split()
-    n = len(target_words)
-    for i in range(len(word_timestamps) - n + 1):
-        candidate_words = [w['word'] for w in word_timestamps[i:i + n]]
-        if candidate_words == target_words:
-            clip_word_timestamps = word_timestamps[i:i + n]
-            return word_timestamps[i]['start'], word_timestamps[i + n - 1]['end'], clip_word_timestamps
-
-    return None, None, None
-
 def stop_pod():
     count = 0
     while count < 10:
@@ -43,6 +38,27 @@ def stop_pod():
             count += 1
             time.sleep(10)
 
+def start_pod(timeout_seconds=None):
+    """Ask RunPod to start the pod, retrying with exponential backoff until it accepts or the deadline passes"""
+    timeout_seconds = timeout_seconds or float(os.getenv("POD_START_TIMEOUT_SECONDS", "600"))
+    start_url = f"https://rest.runpod.io/v1/pods/{RUNPOD_POD_ID}/start"
+    headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
+    deadline = time.monotonic() + timeout_seconds
+    for delay in backoff_delays(initial_delay=2.0, max_delay=30.0):
+        print("=== Starting RunPod instance ===")
+        try:
+            start_response = requests.post(start_url, headers=headers, timeout=30)
+            print(f"Start response: {start_response.status_code}")
+            if start_response.status_code == 200:
+                return True
+            print(f"Failed to start pod: {start_response.text}")
+        except requests.exceptions.RequestException as e:
+            print(f"Error starting RunPod instance: {str(e)}")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+
 def get_random_story():
     url = "https://shortstories-api.onrender.com/"
     response = requests.get(url)
@@ -54,6 +70,169 @@ def get_random_story():
         raise Exception("Failed to fetch example story from API")
 
 
+CLIP_PROMPT_OUTPUT_FORMAT = (
+    "**OUTPUT FORMAT**:\n"
+    "- Return ONLY valid JSON with:\n"
+    "  - `image_prompt`: (string) detailed image generation prompt\n"
+    "  - `image_negative_prompt`: (string) exclusions list\n\n"
+)
+
+BATCHED_CLIP_PROMPT_OUTPUT_FORMAT = (
+    "**OUTPUT FORMAT**:\n"
+    "- Return ONLY valid JSON with one key `clips`: an array with one object per scene, in scene order\n"
+    "- Each object has:\n"
+    "  - `index`: (integer) the scene number starting at 0\n"
+    "  - `image_prompt`: (string) detailed image generation prompt\n"
+    "  - `image_negative_prompt`: (string) exclusions list\n\n"
+)
+
+
+def narrative_flow(clip_index, clip_count):
+    return 'Opening hook' if clip_index < 3 else 'Rising action' if clip_index < clip_count * 0.7 else 'Climax/Resolution'
+
+
+def build_prompt_engineer_system_prompt(title, description, script_text, output_format):
+    return (
+        "You are a top-tier prompt engineer for FLUX.1-dev, an open-source text-to-image model. "
+        "Your job is to craft cinematic, ultra-detailed, and technically optimized prompts for maximum social media impact.\n\n"
+
+        f"{output_format}"
+
+        "**PROMPT STRUCTURE**:\n"
+        "- Subject\n"
+        "- Action/Pose\n"
+        "- Environment/Setting\n"
+        "- Lighting\n"
+        "- Camera Angle\n"
+        "- Style & Composition\n"
+        "- Technical Specs\n"
+        "- Mood/Atmosphere\n\n"
+
+        "**CREATE A STORY USING THIS EXAMPLE CONTEXT**:\n"
+        f"- Title: \"{title}\"\n"
+        f"- Description: \"{description}\"\n"
+        f"- Full Script: \"{script_text}\"\n\n"
+
+        "**VISUAL CONSISTENCY RULES**:\n"
+        "- Maintain character traits (age, clothing, features)\n"
+        "- Use a consistent color palette across scenes\n"
+        "- Ensure time and light continuity (day/night/weather)\n"
+        "- Keep environment type consistent (indoor/outdoor)\n"
+        "- Use uniform visual style and quality\n\n"
+
+        "**TECHNICAL OPTIMIZATION FOR FLUX.1-dev**:\n"
+        "- Camera terms: \"cinematic wide shot\", \"overhead view\", \"dramatic close-up\"\n"
+        "- Lighting: \"soft diffused light\", \"golden hour\", \"studio spotlight\"\n"
+        "- Specs: \"8K ultra-detailed\", \"hyperrealism\", \"professional photography\"\n"
+        "- Composition: \"rule of thirds\", \"leading lines\", \"depth of field\"\n"
+        "- Mood: \"ethereal ambiance\", \"tense atmosphere\", \"emotional resonance\"\n\n"
+
+        "**MOBILE-FIRST COMPOSITION TIPS**:\n"
+        "- Vertical or square (9:16 / 1:1)\n"
+        "- Single strong focal point\n"
+        "- Bold, high-contrast visuals\n"
+        "- Minimal background clutter\n\n"
+
+        "**VIRAL IMAGE FACTORS**:\n"
+        "- Contrasting, vibrant colors\n"
+        "- Visual surprises or metaphors\n"
+        "- Emotional storytelling through image alone\n"
+        "- Symbolism that grabs attention\n\n"
+
+        "**STYLE & QUALITY ANCHORS** (Always include):\n"
+        "- Camera: \"Shot on RED Komodo / Sony FX3 / Canon R5\"\n"
+        "- Lens: \"85mm f/1.4\" or \"24-70mm f/2.8\"\n"
+        "- Lighting setup: \"natural golden hour\" or \"studio softbox\"\n"
+        "- Color grading: \"cinematic LUT\", \"film emulation\"\n\n"
+
+        "**NEGATIVE PROMPT (Exclude):**\n"
+        "- blurry, low-res, bad anatomy, extra limbs\n"
+        "- watermarks, logos, text, distortions\n"
+        "- cartoonish or amateur styles (unless specified)\n"
+        "- cluttered backgrounds, oversaturation, generic look\n"
+    )
+
+
+def build_clip_prompt_payload(clip_index, clip_text, clip_count, title, description, script_text):
+    return {
+        "model": "deepseek-chat",
+        "messages": [
+            {
+                "role": "system",
+                "content": build_prompt_engineer_system_prompt(
+                    title, description, script_text, CLIP_PROMPT_OUTPUT_FORMAT
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Generate an image prompt for this scene:\n"
+                    f"Scene: \"{clip_text}\"\n"
+                    f"Scene Position: {clip_index + 1} of {clip_count}\n"
+                    f"Narrative Flow: "
+                    f"{narrative_flow(clip_index, clip_count)}\n\n"
+
+                    "REQUIREMENTS:\n"
+                    "- Focus on ONE powerful visual moment\n"
+                    "- Keep narrative and visual continuity\n"
+                    "- Include exact camera and lighting details\n"
+                    "- Use a dramatic composition (e.g., rule of thirds, close-up, symmetry)\n"
+                    "- Prompt length: 150–250 words, rich in technical detail\n\n"
+
+                    "The final image should be so visually compelling it makes viewers stop scrolling and emotionally connect."
+                )
+            }
+        ],
+        "max_tokens": 1500,
+        "temperature": 0.4,
+        "top_p": 0.8,
+        "frequency_penalty": 0.1,
+        "presence_penalty": 0.1
+    }
+
+
+def build_batched_clip_prompt_payload(clip_texts, title, description, script_text):
+    clip_count = len(clip_texts)
+    scenes = "".join(
+        f"Scene {clip_index} ({narrative_flow(clip_index, clip_count)}): \"{clip_text}\"\n"
+        for clip_index, clip_text in enumerate(clip_texts)
+    )
+    return {
+        "model": "deepseek-chat",
+        "messages": [
+            {
+                "role": "system",
+                "content": build_prompt_engineer_system_prompt(
+                    title, description, script_text, BATCHED_CLIP_PROMPT_OUTPUT_FORMAT
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Generate one image prompt for each of these {clip_count} scenes:\n"
+                    f"{scenes}\n"
+
+                    "REQUIREMENTS:\n"
+                    f"- Return exactly {clip_count} objects, one per scene, with matching `index` values\n"
+                    "- Each prompt focuses on ONE powerful visual moment\n"
+                    "- Keep narrative and visual continuity across all scenes\n"
+                    "- Include exact camera and lighting details\n"
+                    "- Use a dramatic composition (e.g., rule of thirds, close-up, symmetry)\n"
+                    "- Prompt length: 150–250 words each, rich in technical detail\n\n"
+
+                    "Every image should be so visually compelling it makes viewers stop scrolling and emotionally connect."
+                )
+            }
+        ],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 8000,
+        "temperature": 0.4,
+        "top_p": 0.8,
+        "frequency_penalty": 0.1,
+        "presence_penalty": 0.1
+    }
+
+
 def lambda_handler(event, context):
     try:
         print("=== Lambda function started ===")
@@ -268,164 +447,69 @@ def lambda_handler(event, context):
         print(f"Alignment data: {len(characters)} characters with timestamps")
 
         # Create word-level timestamps for video text overlays
-        word_timestamps = []
-        current_word = ""
-        word_start_time = None
-
-        for i, (char, start_time, end_time) in enumerate(zip(characters, char_start_times, char_end_times)):
-            if char == ' ' or i == len(characters) - 1:
-                if current_word.strip():
-                    current_word += char if i == len(characters) - 1 else ""
-                    word_timestamps.append({
-                        "word": current_word.strip(),
-                        "start": word_start_time,
-                        "end": end_time
-                    })
-                current_word = ""
-                word_start_time = None
-            else:
-                if word_start_time is None:
-                    word_start_time = start_time
-                current_word += char
-
+        word_timestamps = build_word_timestamps(characters, char_start_times, char_end_times)
         print(f"Created {len(word_timestamps)} word timestamps")
 
+        # Sentence and phrase spans so captions can be grouped
+        boundaries = find_boundaries(word_timestamps)
+        print(f"Found {len(boundaries['sentences'])} sentences and {len(boundaries['phrases'])} phrases")
+
         # Generate video prompts for each clip using Deepseek
         print("=== Generating image prompts for clips ===")
         image_clips_data = []
         title = content_data['title']
         description = content_data['description']
 
-        for clip_index, clip_text in enumerate(content_data['clip_texts']):
-            clip_prompt_payload = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a top-tier prompt engineer for FLUX.1-dev, an open-source text-to-image model. "
-                            "Your job is to craft cinematic, ultra-detailed, and technically optimized prompts for maximum social media impact.\n\n"
-        
-                            "**OUTPUT FORMAT**:\n"
-                            "- Return ONLY valid JSON with:\n"
-                            "  - `image_prompt`: (string) detailed image generation prompt\n"
-                            "  - `image_negative_prompt`: (string) exclusions list\n\n"
-        
-                            "**PROMPT STRUCTURE**:\n"
-                            "- Subject\n"
-                            "- Action/Pose\n"
-                            "- Environment/Setting\n"
-                            "- Lighting\n"
-                            "- Camera Angle\n"
-                            "- Style & Composition\n"
-                            "- Technical Specs\n"
-                            "- Mood/Atmosphere\n\n"
-        
-                            "**CREATE A STORY USING THIS EXAMPLE CONTEXT**:\n"
-                            f"- Title: \"{title}\"\n"
-                            f"- Description: \"{description}\"\n"
-                            f"- Full Script: \"{script_text}\"\n\n"
-                
-                            "**VISUAL CONSISTENCY RULES**:\n"
-                            "- Maintain character traits (age, clothing, features)\n"
-                            "- Use a consistent color palette across scenes\n"
-                            "- Ensure time and light continuity (day/night/weather)\n"
-                            "- Keep environment type consistent (indoor/outdoor)\n"
-                            "- Use uniform visual style and quality\n\n"
-                
-                            "**TECHNICAL OPTIMIZATION FOR FLUX.1-dev**:\n"
-                            "- Camera terms: \"cinematic wide shot\", \"overhead view\", \"dramatic close-up\"\n"
-                            "- Lighting: \"soft diffused light\", \"golden hour\", \"studio spotlight\"\n"
-                            "- Specs: \"8K ultra-detailed\", \"hyperrealism\", \"professional photography\"\n"
-                            "- Composition: \"rule of thirds\", \"leading lines\", \"depth of field\"\n"
-                            "- Mood: \"ethereal ambiance\", \"tense atmosphere\", \"emotional resonance\"\n\n"
-                
-                            "**MOBILE-FIRST COMPOSITION TIPS**:\n"
-                            "- Vertical or square (9:16 / 1:1)\n"
-                            "- Single strong focal point\n"
-                            "- Bold, high-contrast visuals\n"
-                            "- Minimal background clutter\n\n"
-                
-                            "**VIRAL IMAGE FACTORS**:\n"
-                            "- Contrasting, vibrant colors\n"
-                            "- Visual surprises or metaphors\n"
-                            "- Emotional storytelling through image alone\n"
-                            "- Symbolism that grabs attention\n\n"
-                
-                            "**STYLE & QUALITY ANCHORS** (Always include):\n"
-                            "- Camera: \"Shot on RED Komodo / Sony FX3 / Canon R5\"\n"
-                            "- Lens: \"85mm f/1.4\" or \"24-70mm f/2.8\"\n"
-                            "- Lighting setup: \"natural golden hour\" or \"studio softbox\"\n"
-                            "- Color grading: \"cinematic LUT\", \"film emulation\"\n\n"
-                
-                            "**NEGATIVE PROMPT (Exclude):**\n"
-                            "- blurry, low-res, bad anatomy, extra limbs\n"
-                            "- watermarks, logos, text, distortions\n"
-                            "- cartoonish or amateur styles (unless specified)\n"
-                            "- cluttered backgrounds, oversaturation, generic look\n"
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            f"Generate an image prompt for this scene:\n"
-                            f"Scene: \"{clip_text}\"\n"
-                            f"Scene Position: {clip_index + 1} of {clip_count}\n"
-                            f"Narrative Flow: "
-                            f"{'Opening hook' if clip_index < 3 else 'Rising action' if clip_index < clip_count * 0.7 else 'Climax/Resolution'}\n\n"
-        
-                            "REQUIREMENTS:\n"
-                            "- Focus on ONE powerful visual moment\n"
-                            "- Keep narrative and visual continuity\n"
-                            "- Include exact camera and lighting details\n"
-                            "- Use a dramatic composition (e.g., rule of thirds, close-up, symmetry)\n"
-                            "- Prompt length: 150–250 words, rich in technical detail\n\n"
-        
-                            "The final image should be so visually compelling it makes viewers stop scrolling and emotionally connect."
-                        )
-                    }
-                ],
-                "max_tokens": 1500,
-                "temperature": 0.4,
-                "top_p": 0.8,
-                "frequency_penalty": 0.1,
-                "presence_penalty": 0.1
-            }
-            clip_response = requests.post(deepseek_url, headers=deepseek_headers, json=clip_prompt_payload)
-            clip_response.raise_for_status()
-
-            clip_json = clip_response.json()
-            clip_raw_content = clip_json['choices'][0]['message']['content']
-
-            # Clean markdown formatting
-            if clip_raw_content.strip().startswith('```json'):
-                json_start = clip_raw_content.find('```json') + 7
-                json_end = clip_raw_content.rfind('```')
-                clip_json_content = clip_raw_content[json_start:json_end].strip()
-            elif clip_raw_content.strip().startswith('```'):
-                json_start = clip_raw_content.find('```') + 3
-                json_end = clip_raw_content.rfind('```')
-                clip_json_content = clip_raw_content[json_start:json_end].strip()
-            else:
-                clip_json_content = clip_raw_content.strip()
+        clip_texts = content_data['clip_texts']
+        prompt_client = ClipPromptClient(deepseek_url, deepseek_headers)
+        clip_prompt_results = [None] * len(clip_texts)
 
+        # Ask for every clip in one structured answer so the shared context is only sent once
+        if os.getenv("CLIP_PROMPT_MODE", "batched") == "batched":
             try:
-                clip_prompts = json.loads(clip_json_content)
-                start, end, clip_word_timestamps = find_string_timestamps(word_timestamps, clip_text)
-
+                batched_prompts = prompt_client.request_batched_prompts(
+                    build_batched_clip_prompt_payload(clip_texts, title, description, script_text),
+                    len(clip_texts)
+                )
+            except Exception as e:
+                print(f"Batched prompt generation failed: {str(e)}")
+                batched_prompts = {}
+            for clip_index, clip_prompts in batched_prompts.items():
+                clip_prompt_results[clip_index] = clip_prompts
+            print(f"Batched answer covered {len(batched_prompts)} of {len(clip_texts)} clips")
+
+        # Request the missing or malformed clips one by one, concurrently and in clip order
+        missing_indexes = [clip_index for clip_index, result in enumerate(clip_prompt_results) if result is None]
+        if missing_indexes:
+            missing_results = prompt_client.request_prompts([
+                build_clip_prompt_payload(clip_index, clip_texts[clip_index], clip_count, title, description, script_text)
+                for clip_index in missing_indexes
+            ])
+            for clip_index, clip_prompts in zip(missing_indexes, missing_results):
+                clip_prompt_results[clip_index] = clip_prompts
+
+        prompt_generation_report = prompt_client.savings_report(len(clip_texts))
+        print(f"Prompt generation usage: {json.dumps(prompt_generation_report)}")
+
+        # Align every clip against the word stream in one pass
+        clip_ranges = align_clip_ranges(clip_texts, word_timestamps)
+        for clip_index, (clip_text, clip_prompts) in enumerate(zip(clip_texts, clip_prompt_results)):
+            word_range = clip_ranges[clip_index]
+            start, end, clip_word_timestamps = clip_span(word_range, word_timestamps)
+            if clip_prompts is not None:
                 image_clips_data.append({
                     "index": clip_index,
                     "text": clip_text,
                     "start_time": start,
                     "end_time": end,
                     "word_timestamps": clip_word_timestamps,
-                    "duration": end - start if start is not None and end is not None else 0,
+                    "word_range": list(word_range),
+                    "duration": end - start,
                     "image_prompt": clip_prompts['image_prompt'],
                     "image_negative_prompt": clip_prompts['image_negative_prompt']
                 })
                 print(f"Generated prompts for clip {clip_text}")
-            except json.JSONDecodeError:
-                start, end, clip_word_timestamps = find_string_timestamps(word_timestamps, clip_text)
+            else:
                 # Fallback prompt if parsing fails
                 image_clips_data.append({
                     "index": clip_index,
@@ -433,7 +517,8 @@ def lambda_handler(event, context):
                     "start_time": start,
                     "end_time": end,
                     "word_timestamps": clip_word_timestamps,
-                    "duration": end - start if start is not None and end is not None else 0,
+                    "word_range": list(word_range),
+                    "duration": end - start,
                     "image_prompt": clip_text,
                     "image_negative_prompt": "blurry, low quality, shaky, irrelevant content"
                 })
@@ -452,6 +537,8 @@ def lambda_handler(event, context):
             "duration": audio_duration,
             "word_count": len(script_text.split()),
             "word_timestamps": word_timestamps,
+            "sentences": boundaries["sentences"],
+            "phrases": boundaries["phrases"],
             "image_clips_data": image_clips_data,
             "clip_count": len(content_data["clip_texts"]),
             "full_alignment": {
@@ -460,13 +547,21 @@ def lambda_handler(event, context):
                 "character_end_times_seconds": char_end_times
             }
         }
-        transcript_key = f"transcripts/{video_id}.json"
-        print(f"Transcript S3 key: {transcript_key}")
+        if os.getenv("TRANSCRIPT_FORMAT", "compact") == "json":
+            transcript_key = f"transcripts/{video_id}.json"
+            transcript_body = json.dumps(transcript_data, indent=2)
+            transcript_content_type = 'application/json'
+        else:
+            # Versioned columnar transcript, the worker still reads the plain JSON of older jobs
+            transcript_key = f"transcripts/{video_id}.json.gz"
+            transcript_body = encode_transcript(transcript_data)
+            transcript_content_type = COMPACT_TRANSCRIPT_CONTENT_TYPE
+        print(f"Transcript S3 key: {transcript_key} ({len(transcript_body)} bytes)")
         s3_client.put_object(
             Bucket=S3_BUCKET,
             Key=transcript_key,
-            Body=json.dumps(transcript_data, indent=2),
-            ContentType='application/json'
+            Body=transcript_body,
+            ContentType=transcript_content_type
         )
         print("Transcript with timestamps uploaded to S3 successfully")
 
@@ -483,6 +578,7 @@ def lambda_handler(event, context):
             'audio_key': f"audio/{video_id}.mp3",
             'duration': audio_duration,
             'clip_count': len(content_data['clip_texts']),
+            'prompt_generation': prompt_generation_report,
             'status': 'processing'
         }
         print(f"Metadata S3 key: {metadata_key}")
@@ -506,96 +602,67 @@ def lambda_handler(event, context):
         )
         print("MP3 uploaded to S3 successfully")
 
+        runpod_payload = {
+            "s3_bucket": S3_BUCKET,
+            "transcript_key": transcript_key,
+            "audio_key": audio_key,
+            "video_id": video_id,
+        }
+
+        # Manifests only run on pods started with JOB_MANIFEST_BUCKET, so they are opt-in
+        if os.getenv("JOB_DISPATCH_MODE", "http") == "manifest":
+            # The worker claims the manifest on boot or on its next poll, nothing to wait for here
+            print("=== Writing job manifest ===")
+            manifest_key = JobManifestQueue(s3_client, S3_BUCKET).enqueue(runpod_payload)
+            print(f"Job manifest S3 key: {manifest_key}")
+            # No long retries, a pod that does not start now still drains the manifest on its next start
+            pod_started = start_pod(timeout_seconds=30)
+            return {
+                "success": True,
+                "video_id": video_id,
+                "status": "queued",
+                "manifest_key": manifest_key,
+                "pod_start_requested": pod_started
+            }
+
         # Start RunPod instance
-        print("=== Starting RunPod instance ===")
-        start_url = f"https://rest.runpod.io/v1/pods/{RUNPOD_POD_ID}/start"
-        headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
-        start_response = requests.post(start_url, headers=headers)
-        print(f"Start response: {start_response.status_code}")
-        retry_count = 0
+        if not start_pod():
+            return None
 
-        while retry_count < 60:
-            if start_response.status_code == 200:
-                print("Pod started, waiting for Flask server...")
+        flask_base_url = f"https://{RUNPOD_POD_ID}-8000.proxy.runpod.net"
+        flask_url = f"{flask_base_url}/process"
+        print(f"Flask URL: {flask_url}")
 
-                runpod_payload = {
-                    "s3_bucket": S3_BUCKET,
-                    "transcript_key": transcript_key,
-                    "audio_key": audio_key,
-                    "video_id": video_id,
-                }
+        print("=== Waiting for the Flask server to report the model loaded ===")
+        probe = PodReadinessProbe(f"{flask_base_url}/health")
+        if probe.wait() is None:
+            stop_pod()
+            return None
 
-                flask_url = f"https://{RUNPOD_POD_ID}-8000.proxy.runpod.net/process"
-                print(f"Flask URL: {flask_url}")
-
-                print("=== Waiting for pod to start (checking every 10 seconds) ===")
-
-                for i in range(10):  # Check for up to 1.5 minutes
-                    # Check pod status
-                    status_query = {
-                        "query": f"""
-                            query {{
-                                pod(input: {{podId: "{RUNPOD_POD_ID}"}}) {{
-                                    id
-                                    name
-                                    runtime {{
-                                        uptimeInSeconds
-                                    }}
-                                    desiredStatus
-                                    lastStatusChange
-                                }}
-                            }}
-                            """
-                    }
-
-                    status_response = requests.post(
-                        "https://api.runpod.io/graphql",
-                        headers=headers,
-                        json=status_query
-                    )
+        print(f"=== Calling Flask server ===")
+        print(f"URL: {flask_url}")
+        print(f"Payload: {json.dumps(runpod_payload, indent=2)}")
 
-                    pod_data = status_response.json().get('data', {}).get('pod', {})
-                    runtime = pod_data.get('runtime')
-
-                    print(f"Check {i + 1}: Runtime = {runtime}")
-
-                    if runtime and runtime.get('uptimeInSeconds') is not None:
-                        print("Pod is now running!")
-
-                        time.sleep(10)
-
-                        print(f"=== Calling Flask server ===")
-                        print(f"URL: {flask_url}")
-                        print(f"Payload: {json.dumps(runpod_payload, indent=2)}")
-
-                        try:
-                            response = requests.post(flask_url, json=runpod_payload, timeout=300)  # 5 minute timeout
-                            print(f"Flask response status: {response.status_code}")
-                            print(f"Flask response: {response.text}")
-
-                            if response.status_code == 202:
-                                result = response.json()
-                                print(f"Success: {result}")
-                                return result
-                            else:
-                                print(f"Flask error: {response.status_code}")
-                                return None
-
-                        except requests.exceptions.Timeout:
-                            print("Request timed out video generation might still be running")
-                            return None
-                        except Exception as e:
-                            print(f"Error calling Flask: {str(e)}")
-                            stop_pod()
-                            return None
-                    else:
-                        print(f"Pod still starting... waiting 10 seconds")
-                        time.sleep(10)
+        try:
+            response = requests.post(flask_url, json=runpod_payload, timeout=300)  # 5 minute timeout
+            print(f"Flask response status: {response.status_code}")
+            print(f"Flask response: {response.text}")
+
+            if response.status_code == 202:
+                result = response.json()
+                print(f"Success: {result}")
+                return result
             else:
-                print(f"Failed to start pod: {start_response.text}")
-                retry_count += 1
-                time.sleep(60)
-        return None
+                print(f"Flask error: {response.status_code}")
+                return None
+
+        except requests.exceptions.Timeout:
+            print("Request timed out video generation might still be running")
+            return None
+        except Exception as e:
+            print(f"Error calling Flask: {str(e)}")
+            stop_pod()
+            return None
 
     except Exception as e:
         error_msg = f"Error occurred: {str(e)}"
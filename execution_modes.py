@@ -0,0 +1,126 @@
+import os
+
+GB = 1024 ** 3
+
+# From most to least VRAM. FLUX.1-dev in bfloat16 is about 24 GB of transformer plus 10 GB of T5, the
+# smaller modes keep only the running component on the GPU and shrink the transformer weights.
+EXECUTION_MODES = {
+    "full": {
+        "min_vram_bytes": 40 * GB,
+        "placement": "cuda",
+        "quantization": None,
+        "vae_tiling": False,
+        "vae_slicing": False,
+        "attention_slicing": False,
+        "max_batch_size": None,
+    },
+    # Text encoders, transformer and VAE take turns on the GPU
+    "model_offload": {
+        "min_vram_bytes": 26 * GB,
+        "placement": "model_offload",
+        "quantization": None,
+        "vae_tiling": True,
+        "vae_slicing": True,
+        "attention_slicing": False,
+        "max_batch_size": 2,
+    },
+    "quantized_8bit": {
+        "min_vram_bytes": 16 * GB,
+        "placement": "model_offload",
+        "quantization": "int8",
+        "vae_tiling": True,
+        "vae_slicing": True,
+        "attention_slicing": False,
+        "max_batch_size": 1,
+    },
+    "quantized_4bit": {
+        "min_vram_bytes": 10 * GB,
+        "placement": "model_offload",
+        "quantization": "nf4",
+        "vae_tiling": True,
+        "vae_slicing": True,
+        "attention_slicing": True,
+        "max_batch_size": 1,
+    },
+    # Streams every layer from host memory, runs on almost any GPU but several times slower
+    "sequential_offload": {
+        "min_vram_bytes": 0,
+        "placement": "sequential_offload",
+        "quantization": None,
+        "vae_tiling": True,
+        "vae_slicing": True,
+        "attention_slicing": True,
+        "max_batch_size": 1,
+    },
+}
+
+
+def cuda_total_memory():
+    """Total memory of the first CUDA device in bytes, or None when there is none"""
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return None
+        return torch.cuda.get_device_properties(0).total_memory
+    except Exception:
+        return None
+
+
+def choose_execution_mode(vram_bytes):
+    """The fastest mode whose VRAM floor fits, the most frugal one when the VRAM is unknown"""
+    if vram_bytes is None:
+        return "sequential_offload"
+    for name, mode in EXECUTION_MODES.items():
+        if vram_bytes >= mode["min_vram_bytes"]:
+            return name
+    return "sequential_offload"
+
+
+def resolve_execution_mode(requested=None, memory_probe=cuda_total_memory):
+    """
+    Mode settings by name, FLUX_EXECUTION_MODE picks one or "auto" chooses from the detected VRAM.
+    Returns a dict with "name" and "vram_bytes" added.
+    """
+    requested = requested or os.getenv("FLUX_EXECUTION_MODE") or "auto"
+    vram_bytes = memory_probe() if memory_probe else None
+    if requested == "auto":
+        name = choose_execution_mode(vram_bytes)
+    elif requested in EXECUTION_MODES:
+        name = requested
+    else:
+        raise ValueError(f"Unknown execution mode: {requested} (expected auto or one of {', '.join(EXECUTION_MODES)})")
+    return dict(EXECUTION_MODES[name], name=name, vram_bytes=vram_bytes)
+
+
+def quantization_config(quantization):
+    """bitsandbytes settings of the transformer weights, needs diffusers with bitsandbytes installed"""
+    import torch
+    from diffusers import BitsAndBytesConfig
+
+    if quantization == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    if quantization == "nf4":
+        return BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4", bnb_4bit_compute_dtype=torch.bfloat16)
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def apply_execution_mode(pipe, mode):
+    """Place a loaded pipeline on the device and switch on the memory savers of the mode"""
+    if mode["placement"] == "cuda":
+        pipe.to("cuda")
+    elif mode["placement"] == "model_offload":
+        pipe.enable_model_cpu_offload()
+    elif mode["placement"] == "sequential_offload":
+        pipe.enable_sequential_cpu_offload()
+
+    if mode["vae_tiling"]:
+        pipe.vae.enable_tiling()
+    if mode["vae_slicing"]:
+        pipe.vae.enable_slicing()
+    if mode["attention_slicing"]:
+        try:
+            pipe.enable_attention_slicing()
+        except Exception as e:
+            # Not every attention processor can be sliced, the other savers still apply
+            print(f"Attention slicing is not available: {str(e)}")
+    return pipe
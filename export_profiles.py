@@ -0,0 +1,137 @@
+import os
+
+# The output is a slideshow of still images with a slow zoom, so x264's stillimage tune and long
+# keyframe intervals cost little quality while a slower preset mostly burns CPU
+EXPORT_PROFILES = {
+    "preview": {
+        "codec": "libx264",
+        "preset": "veryfast",
+        "crf": 30,
+        "bitrate": None,
+        "tune": "stillimage",
+        "keyframe_seconds": 10,
+        "threads": 0,
+        "fps": 24,
+        "audio_bitrate": "96k",
+    },
+    "production": {
+        "codec": "libx264",
+        "preset": "faster",
+        "crf": 23,
+        "bitrate": None,
+        # Capped so social platforms do not re-encode uploads for exceeding their bitrate limits
+        "maxrate": "3000k",
+        "tune": "stillimage",
+        "keyframe_seconds": 2,
+        "threads": 0,
+        "fps": 30,
+        "audio_bitrate": "128k",
+    },
+    "archive": {
+        "codec": "libx264",
+        "preset": "slow",
+        "crf": 18,
+        "bitrate": None,
+        "tune": "stillimage",
+        "keyframe_seconds": 10,
+        "threads": 0,
+        "fps": 30,
+        "audio_bitrate": "192k",
+    },
+    # The settings every video was exported with before profiles existed
+    "legacy": {
+        "codec": "libx264",
+        "preset": "medium",
+        "crf": None,
+        "bitrate": "2000k",
+        "tune": None,
+        "keyframe_seconds": None,
+        "threads": None,
+        "fps": 30,
+        "audio_bitrate": None,
+    },
+    # Hardware encoder of the GPU pod, needs an ffmpeg build with NVENC (FFMPEG_BINARY)
+    "nvenc": {
+        "codec": "h264_nvenc",
+        "preset": "p4",
+        "crf": None,
+        "cq": 23,
+        "bitrate": None,
+        "maxrate": "3000k",
+        "tune": None,
+        "keyframe_seconds": 2,
+        "threads": None,
+        "fps": 30,
+        "audio_bitrate": "128k",
+    },
+}
+
+
+def get_default_export_profile():
+    return os.getenv("EXPORT_PROFILE", "production")
+
+
+def resolve_export_profile(name=None):
+    """Profile settings by name, the EXPORT_PROFILE env var picks the default"""
+    name = name or get_default_export_profile()
+    if name not in EXPORT_PROFILES:
+        raise ValueError(f"Unknown export profile: {name} (expected one of {', '.join(EXPORT_PROFILES)})")
+    return dict(EXPORT_PROFILES[name], name=name)
+
+
+def _encoder_params(profile):
+    """Encoder flags that write_videofile has no keyword for"""
+    params = []
+    if profile.get("crf") is not None:
+        params += ["-crf", str(profile["crf"])]
+    if profile.get("cq") is not None:
+        params += ["-rc", "vbr", "-cq", str(profile["cq"])]
+    if profile.get("maxrate"):
+        params += ["-maxrate", profile["maxrate"], "-bufsize", profile.get("bufsize") or profile["maxrate"]]
+    if profile.get("tune"):
+        params += ["-tune", profile["tune"]]
+    if profile.get("keyframe_seconds"):
+        gop = str(int(profile["keyframe_seconds"] * profile["fps"]))
+        params += ["-g", gop, "-keyint_min", gop]
+    return params
+
+
+def ffmpeg_audio_args(profile):
+    """Audio encoder flags, on their own for the segmented export's single audio mux"""
+    args = ["-c:a", "aac"]
+    if profile.get("audio_bitrate"):
+        args += ["-b:a", profile["audio_bitrate"]]
+    return args
+
+
+def ffmpeg_video_args(profile, audio=True):
+    """Output arguments for the ffmpeg frame renderer, audio=False leaves out the audio bitrate"""
+    args = ["-c:v", profile["codec"], "-preset", profile["preset"]]
+    if profile.get("bitrate"):
+        args += ["-b:v", profile["bitrate"]]
+    if profile.get("threads") is not None:
+        args += ["-threads", str(profile["threads"])]
+    args += _encoder_params(profile)
+    if audio and profile.get("audio_bitrate"):
+        args += ["-b:a", profile["audio_bitrate"]]
+    return args
+
+
+def moviepy_write_kwargs(profile):
+    """Keyword arguments for MoviePy's write_videofile"""
+    kwargs = {
+        "codec": profile["codec"],
+        "audio_codec": "aac",
+        "fps": profile["fps"],
+        "preset": profile["preset"],
+    }
+    if profile.get("bitrate"):
+        kwargs["bitrate"] = profile["bitrate"]
+    if profile.get("threads") is not None:
+        kwargs["threads"] = profile["threads"]
+    if profile.get("audio_bitrate"):
+        kwargs["audio_bitrate"] = profile["audio_bitrate"]
+    ffmpeg_params = _encoder_params(profile)
+    if ffmpeg_params:
+        kwargs["ffmpeg_params"] = ffmpeg_params
+    return kwargs
@@ -0,0 +1,212 @@
+import os
+import subprocess
+
+from caption_cache import caption_sprite_cache, load_font, CAPTION_FONT_PATH
+
+FRAME_SIZE = (1080, 1080)
+CAPTION_FADE_SECONDS = 0.1
+ZOOM_FACTOR = 1.05
+
+
+def get_ffmpeg_binary():
+    """Prefer the ffmpeg build MoviePy already ships through imageio-ffmpeg"""
+    binary = os.getenv("FFMPEG_BINARY")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+class FrameCaption:
+    def __init__(self, start, end, sprite):
+        self.start = start
+        self.end = end
+        self.sprite = sprite
+        self._fade_sprites = {}
+
+    def position(self, frame_size):
+        # The caption canvas sits at ("center", "bottom") of the frame
+        canvas_width, canvas_height = self.sprite.canvas_size
+        left = (frame_size[0] - canvas_width) // 2 + self.sprite.offset[0]
+        top = frame_size[1] - canvas_height + self.sprite.offset[1]
+        return left, top
+
+    def sprite_at(self, t, fps):
+        """Sprite with the cross-fade-in applied, faded variants are built once per frame step"""
+        elapsed = t - self.start
+        if elapsed >= CAPTION_FADE_SECONDS:
+            return self.sprite.image
+        step = int(elapsed * fps)
+        if step not in self._fade_sprites:
+            opacity = max(0.0, min(1.0, elapsed / CAPTION_FADE_SECONDS))
+            faded = self.sprite.image.copy()
+            faded.putalpha(self.sprite.image.getchannel("A").point(lambda value: int(value * opacity)))
+            self._fade_sprites[step] = faded
+        return self._fade_sprites[step]
+
+
+class FrameClip:
+    """A still image shown from start for duration with a precomputed zoom and prerendered captions"""
+
+    def __init__(self, image, start, duration, captions=None, zoom_factor=ZOOM_FACTOR):
+        self.image = image
+        self.start = start
+        self.duration = duration
+        self.captions = captions or []
+        self.zoom_factor = zoom_factor
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def affine_at(self, t):
+        # Same zoom as ImageClip.resized(1 + (zoom - 1) * t / duration), anchored at the top-left corner
+        scale = 1 + (self.zoom_factor - 1) * t / self.duration if self.duration > 0 else 1
+        return (1 / scale, 0, 0, 0, 1 / scale, 0)
+
+    def frame_at(self, t, frame_size):
+        from PIL import Image
+
+        if self.zoom_factor == 1:
+            return self.image.copy()
+        return self.image.transform(frame_size, Image.AFFINE, self.affine_at(t), resample=Image.BILINEAR)
+
+
+def prepare_frame_clip(clip_data, image, is_last, sprite_cache=caption_sprite_cache):
+    """Frame-renderer counterpart of create_image_clip"""
+    clip_duration = clip_data['duration'] if not is_last else clip_data['duration'] + 2
+    captions = [
+        FrameCaption(word_data["start"], word_data["end"], sprite_cache.get(word_data["word"]))
+        for word_data in clip_data['word_timestamps'] or []
+    ]
+    return FrameClip(image.convert("RGB"), clip_data['start_time'], clip_duration, captions)
+
+
+def scale_frame_clip(clip, scale, scaled_sprites=None):
+    """Copy of a frame clip for a frame scale times the size, the preview renders these at a fraction of the cost"""
+    from PIL import Image
+
+    from caption_cache import CaptionSprite
+
+    scaled_sprites = scaled_sprites if scaled_sprites is not None else {}
+
+    def scaled(size, minimum=1):
+        return max(minimum, int(round(size[0] * scale))), max(minimum, int(round(size[1] * scale)))
+
+    captions = []
+    for caption in clip.captions:
+        # Words repeat across clips, each sprite is resized once per preview
+        sprite = scaled_sprites.get(id(caption.sprite))
+        if sprite is None:
+            sprite = CaptionSprite(
+                caption.sprite.image.resize(scaled(caption.sprite.image.size), Image.BILINEAR),
+                scaled(caption.sprite.offset, minimum=0),
+                scaled(caption.sprite.canvas_size)
+            )
+            scaled_sprites[id(caption.sprite)] = sprite
+        captions.append(FrameCaption(caption.start, caption.end, sprite))
+    image = clip.image.resize(scaled(clip.image.size), Image.BILINEAR)
+    return FrameClip(image, clip.start, clip.duration, captions, zoom_factor=clip.zoom_factor)
+
+
+def prepare_fallback_frame_clip(clip_data, frame_size=FRAME_SIZE):
+    """Frame-renderer counterpart of create_fallback_clip: grey frame with the clip text"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", frame_size, (50, 50, 50))
+    draw = ImageDraw.Draw(image)
+    draw.text(
+        (frame_size[0] / 2, frame_size[1] / 2),
+        clip_data['text'],
+        font=load_font(CAPTION_FONT_PATH, 24),
+        fill=(255, 255, 255),
+        anchor="mm"
+    )
+    return FrameClip(image, clip_data['start_time'] or 0, clip_data['duration'], zoom_factor=1)
+
+
+class FfmpegFrameRenderer:
+    """Composites frames with PIL and streams them as raw RGB into a single ffmpeg process"""
+
+    def __init__(self, frame_size=FRAME_SIZE, fps=30, video_args=None, ffmpeg_binary=None):
+        self.frame_size = frame_size
+        self.fps = fps
+        self.video_args = video_args or ["-c:v", "libx264", "-preset", "medium", "-b:v", "2000k"]
+        self.ffmpeg_binary = ffmpeg_binary or get_ffmpeg_binary()
+
+    def build_command(self, output_path, audio_path, duration, frame_count=None):
+        command = [
+            self.ffmpeg_binary, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{self.frame_size[0]}x{self.frame_size[1]}",
+            "-r", str(self.fps),
+            "-i", "-",
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", "aac"]
+        command += self.video_args
+        command += ["-pix_fmt", "yuv420p"]
+        if frame_count is not None:
+            command += ["-frames:v", str(frame_count)]
+        else:
+            command += ["-t", f"{duration:.3f}"]
+        command.append(output_path)
+        return command
+
+    def frame_count(self, duration):
+        return int(round(duration * self.fps))
+
+    def iter_frames(self, clips, duration, start_frame=0):
+        from PIL import Image
+
+        black = Image.new("RGB", self.frame_size, (0, 0, 0))
+        captions = [caption for clip in clips for caption in clip.captions]
+        for frame_index in range(start_frame, self.frame_count(duration)):
+            t = frame_index / self.fps
+            # Later clips are drawn on top, exactly like the CompositeVideoClip layer order
+            active_clip = None
+            for clip in clips:
+                if clip.start <= t < clip.end:
+                    active_clip = clip
+            frame = active_clip.frame_at(t - active_clip.start, self.frame_size) if active_clip else black.copy()
+
+            for caption in captions:
+                if caption.start <= t < caption.end:
+                    sprite_image = caption.sprite_at(t, self.fps)
+                    frame.paste(sprite_image, caption.position(self.frame_size), sprite_image)
+            yield frame
+
+    def render(self, clips, duration, output_path, audio_path=None):
+        command = self.build_command(output_path, audio_path, duration)
+        print(f"Streaming frames to ffmpeg: {' '.join(command)}")
+        self._stream(command, self.iter_frames(clips, duration))
+
+    def render_range(self, clips, start_frame, end_frame, output_path):
+        """Encode frames [start_frame, end_frame) of the timeline without audio, one segment of a segmented export"""
+        command = self.build_command(output_path, None, None, frame_count=end_frame - start_frame)
+        self._stream(command, self.iter_frames(clips, end_frame / self.fps, start_frame))
+
+    def _stream(self, command, frames):
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for frame in frames:
+                process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            # ffmpeg exited early, its stderr below explains why
+            pass
+        except Exception:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        stderr = process.stderr.read().decode("utf-8", errors="replace")
+        return_code = process.wait()
+        if return_code != 0:
+            raise RuntimeError(f"ffmpeg exited with code {return_code}: {stderr.strip()}")
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+
+class IdleShutdownController:
+    """
+    Stops the pod once it had nothing to do for quiet_seconds in a row. is_busy reports queued or
+    in-flight jobs, before_stop gets a last chance to find work (it returns True to cancel the stop).
+    """
+
+    def __init__(self, stop_fn, is_busy, quiet_seconds=None, check_interval=None, before_stop=None,
+                 clock=time.monotonic):
+        self.stop_fn = stop_fn
+        self.is_busy = is_busy
+        self.quiet_seconds = quiet_seconds if quiet_seconds is not None else float(
+            os.getenv("POD_IDLE_TIMEOUT_SECONDS", "300")
+        )
+        self.check_interval = check_interval or float(os.getenv("POD_IDLE_CHECK_SECONDS", "5"))
+        self.before_stop = before_stop
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._idle_since = clock()
+        self._stop_requested = False
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._idle_since = self.clock()
+            self._thread = threading.Thread(target=self._run, name="idle-shutdown", daemon=True)
+            self._thread.start()
+        print(f"Idle shutdown armed, pod stops after {self.quiet_seconds:.0f}s without jobs")
+
+    def shutdown(self):
+        self._stopping.set()
+
+    def touch(self):
+        """Restart the countdown, called whenever a job arrives"""
+        with self._lock:
+            self._idle_since = None if self.is_busy() else self.clock()
+            self._stop_requested = False
+
+    def check(self):
+        """One controller step, returns True when it requested the pod stop"""
+        now = self.clock()
+        with self._lock:
+            if self.is_busy():
+                self._idle_since = None
+                self._stop_requested = False
+                return False
+            if self._idle_since is None:
+                self._idle_since = now
+            if self._stop_requested or now - self._idle_since < self.quiet_seconds:
+                return False
+
+        if self.before_stop is not None and self.before_stop():
+            self.touch()
+            return False
+
+        with self._lock:
+            # A job may have arrived while before_stop ran
+            if self.is_busy() or self._idle_since is None:
+                return False
+            self._stop_requested = True
+        print(f"Pod idle for {now - self._idle_since:.0f}s, stopping")
+        self.stop_fn()
+        return True
+
+    def status(self):
+        with self._lock:
+            if self._idle_since is None:
+                idle_seconds = 0.0
+                seconds_until_stop = None
+            else:
+                idle_seconds = self.clock() - self._idle_since
+                seconds_until_stop = max(0.0, self.quiet_seconds - idle_seconds)
+            return {
+                "quiet_seconds": self.quiet_seconds,
+                "idle": self._idle_since is not None,
+                "idle_seconds": round(idle_seconds, 1),
+                "seconds_until_stop": round(seconds_until_stop, 1) if seconds_until_stop is not None else None,
+                "stop_requested": self._stop_requested,
+            }
+
+    def _run(self):
+        while not self._stopping.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Idle shutdown check failed: {str(e)}")
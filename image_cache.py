@@ -0,0 +1,191 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+S3_CACHE_PREFIX = "images/cache/"
+
+
+def image_cache_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed=None,
+                    model_id=None):
+    """Content address of an image: the same inputs always produce the same key"""
+    payload = json.dumps({
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "width": width,
+        "height": height,
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": guidance_scale,
+        "seed": seed,
+        "model_id": model_id,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskImageCache:
+    """Local PNG store that evicts the least recently used images above a byte budget"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            # mtime carries the LRU order across restarts
+            os.utime(path, None)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            path = self._path(key)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def size_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ImageCache:
+    """Two tier image cache: local disk first, then an optional S3 copy under images/"""
+
+    def __init__(self, disk_cache, s3_client=None, s3_enabled=False):
+        self.disk_cache = disk_cache
+        self.s3_client = s3_client
+        self.s3_enabled = s3_enabled
+        self._lock = threading.Lock()
+        self.counters = {"disk_hits": 0, "s3_hits": 0, "misses": 0, "stores": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key, s3_bucket=None):
+        """Return the cached image as a PIL image, or None on a miss"""
+        data = self.disk_cache.get(key)
+        if data is not None:
+            self._count("disk_hits")
+            return _decode_png(data)
+
+        if self._s3_ready(s3_bucket):
+            try:
+                response = self.s3_client.get_object(Bucket=s3_bucket, Key=f"{S3_CACHE_PREFIX}{key}.png")
+                data = response['Body'].read()
+            except Exception:
+                data = None
+            if data is not None:
+                self._count("s3_hits")
+                self.disk_cache.put(key, data)
+                return _decode_png(data)
+
+        self._count("misses")
+        return None
+
+    def put(self, key, image, s3_bucket=None):
+        self.put_png(key, _encode_png(image), s3_bucket)
+
+    def put_png(self, key, data, s3_bucket=None):
+        self.disk_cache.put(key, data)
+        if self._s3_ready(s3_bucket):
+            try:
+                self.s3_client.put_object(
+                    Bucket=s3_bucket,
+                    Key=f"{S3_CACHE_PREFIX}{key}.png",
+                    Body=data,
+                    ContentType='image/png'
+                )
+            except Exception as e:
+                print(f"Failed to store image {key} in S3 cache: {str(e)}")
+        self._count("stores")
+
+    def _s3_ready(self, s3_bucket):
+        return self.s3_enabled and self.s3_client is not None and s3_bucket
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["disk_hits"] + counters["s3_hits"] + counters["misses"]
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 3) if lookups else None
+        counters["disk_entries"] = len(self.disk_cache)
+        counters["disk_bytes"] = self.disk_cache.size_bytes()
+        counters["s3_enabled"] = bool(self.s3_enabled)
+        return counters
+
+
+def _encode_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _decode_png(data):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def create_image_cache(s3_client=None):
+    """Build the cache from the IMAGE_CACHE_* env vars"""
+    disk_cache = DiskImageCache(
+        os.getenv("IMAGE_CACHE_DIR", "/workspace/image_cache"),
+        int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    )
+    return ImageCache(
+        disk_cache,
+        s3_client=s3_client,
+        s3_enabled=os.getenv("IMAGE_CACHE_S3", "false").lower() in ("1", "true", "yes")
+    )
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import secrets
+import time
+
+DEFAULT_GENERATION_PARAMS = {
+    "height": 1080,
+    "width": 1080,
+    "num_inference_steps": 20,
+    "guidance_scale": 3.5,
+}
+
+# How each clip's initial noise is chosen: unrelated noise, a seed per clip derived from the story seed,
+# or the story seed for every clip so all clips start from the same latents
+LATENT_MODES = ("random", "seeded", "shared")
+
+# Rough activation memory one 1080x1080 FLUX image needs on top of the loaded weights
+DEFAULT_BYTES_PER_IMAGE = 4 * 1024 ** 3
+
+
+def cuda_free_memory():
+    """Free device memory in bytes, or None when there is no CUDA device"""
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return None
+        free_bytes, _ = torch.cuda.mem_get_info()
+        return free_bytes
+    except Exception:
+        return None
+
+
+def release_cuda_memory():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+def is_out_of_memory_error(error):
+    if type(error).__name__ == "OutOfMemoryError":
+        return True
+    return "out of memory" in str(error).lower()
+
+
+def choose_batch_size(max_batch_size=None, bytes_per_image=None, memory_probe=cuda_free_memory):
+    """Pick how many prompts to send per pipeline call from the free device memory"""
+    if max_batch_size is None:
+        max_batch_size = int(os.getenv("FLUX_MAX_BATCH_SIZE", "4"))
+    if bytes_per_image is None:
+        bytes_per_image = int(os.getenv("FLUX_BYTES_PER_IMAGE", str(DEFAULT_BYTES_PER_IMAGE)))
+
+    free_bytes = memory_probe() if memory_probe else None
+    if free_bytes is None:
+        return max(1, max_batch_size)
+    return max(1, min(max_batch_size, int(free_bytes // bytes_per_image)))
+
+
+def get_latent_mode():
+    latent_mode = os.getenv("FLUX_LATENT_MODE", "random")
+    if latent_mode not in LATENT_MODES:
+        print(f"Unknown latent mode {latent_mode}, using random latents")
+        return "random"
+    return latent_mode
+
+
+def story_seed(video_id):
+    """Stable seed of a video when the job does not pass one"""
+    return int.from_bytes(hashlib.sha256(str(video_id).encode("utf-8")).digest()[:4], "big")
+
+
+def clip_seeds(clip_count, seed, latent_mode):
+    """{clip_index: seed} for the latent mode, empty for random latents"""
+    if latent_mode == "seeded":
+        return {i: (seed + i) % 2 ** 32 for i in range(clip_count)}
+    if latent_mode == "shared":
+        return {i: seed for i in range(clip_count)}
+    return {}
+
+
+def seed_generator(seed):
+    """CPU torch.Generator for one clip, so the noise does not depend on the GPU model"""
+    import torch
+
+    return torch.Generator("cpu").manual_seed(seed)
+
+
+class BatchedImageGenerator:
+    """Generates clip images N prompts per pipeline call, halving batches that run out of memory"""
+
+    def __init__(self, pipe, batch_size, generation_params=None, inference_lock=None, on_batch=None,
+                 prompt_embeddings=None, seeds=None, generator_factory=seed_generator):
+        self.pipe = pipe
+        self.batch_size = max(1, batch_size)
+        self.generation_params = dict(DEFAULT_GENERATION_PARAMS, **(generation_params or {}))
+        self.inference_lock = inference_lock
+        # on_batch(clip_indexes, seconds) is called after every pipeline call, failed ones included
+        self.on_batch = on_batch
+        # PromptEmbeddingCache, the pipeline then gets prompt_embeds instead of prompt text
+        self.prompt_embeddings = prompt_embeddings
+        # {clip_index: seed}, clips without one start from random noise
+        self.seeds = seeds or {}
+        self.generator_factory = generator_factory
+        self.pipeline_calls = 0
+
+    def generate(self, prompt_requests, on_image=None):
+        """
+        prompt_requests is a list of (clip_index, prompt, negative_prompt).
+        Returns {clip_index: PIL image or the exception that clip failed with}.
+        on_image(clip_index, result) is called as soon as each batch finishes.
+        """
+        results = {}
+        pending = list(prompt_requests)
+        while pending:
+            batch = pending[:self.batch_size]
+            pending = pending[self.batch_size:]
+            self._generate_batch(batch, results, on_image)
+        return results
+
+    def _generate_batch(self, batch, results, on_image=None):
+        indexes = [clip_index for clip_index, _, _ in batch]
+        print(f"Generating images for clips {[i + 1 for i in indexes]} in one batch")
+        try:
+            images = self._call_pipeline(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error generating image for clip {indexes[0] + 1}: {str(e)}")
+                results[indexes[0]] = e
+                if on_image:
+                    on_image(indexes[0], e)
+                return
+
+            if is_out_of_memory_error(e):
+                release_cuda_memory()
+                # Later batches start from the size that is known to fit
+                self.batch_size = max(1, len(batch) // 2)
+                print(f"Out of memory with batch of {len(batch)}, retrying with batch size {self.batch_size}")
+            else:
+                print(f"Batch of {len(batch)} failed ({str(e)}), splitting it and retrying")
+
+            middle = len(batch) // 2
+            self._generate_batch(batch[:middle], results, on_image)
+            self._generate_batch(batch[middle:], results, on_image)
+            return
+
+        for clip_index, image in zip(indexes, images):
+            results[clip_index] = image
+            if on_image:
+                on_image(clip_index, image)
+
+    def _call_pipeline(self, batch):
+        self.pipeline_calls += 1
+
+        if self.inference_lock is not None:
+            with self.inference_lock:
+                output = self._timed_pipe(batch)
+        else:
+            output = self._timed_pipe(batch)
+
+        images = list(output.images)
+        if len(images) != len(batch):
+            raise RuntimeError(f"Pipeline returned {len(images)} images for {len(batch)} prompts")
+        return images
+
+    def _pipe_kwargs(self, batch):
+        prompts = [prompt for _, prompt, _ in batch]
+        kwargs = dict(self.generation_params)
+        embeddings = None
+        if self.prompt_embeddings is not None:
+            try:
+                embeddings = self.prompt_embeddings.pipeline_kwargs(prompts)
+            except Exception as e:
+                print(f"Prompt embedding failed ({str(e)}), passing prompt text from now on")
+                self.prompt_embeddings = None
+        if embeddings is not None:
+            # FLUX only reads negative prompts with true CFG, which these generation params do not enable
+            kwargs.update(embeddings)
+        else:
+            kwargs.update(prompt=prompts, negative_prompt=[negative_prompt for _, _, negative_prompt in batch])
+
+        indexes = [clip_index for clip_index, _, _ in batch]
+        if any(clip_index in self.seeds for clip_index in indexes):
+            # FLUX takes one generator per image or none at all, so clips of a mixed batch that have no seed
+            # draw a random one and still start from unrelated noise
+            kwargs["generator"] = [
+                self.generator_factory(self.seeds[clip_index] if clip_index in self.seeds else secrets.randbits(32))
+                for clip_index in indexes
+            ]
+        return kwargs
+
+    def _timed_pipe(self, batch):
+        # Text encoding happens before the clock starts, it is reported by the prompt embedding cache
+        kwargs = self._pipe_kwargs(batch)
+        # Timed inside the inference lock so waiting for another job does not count as diffusion
+        started = time.perf_counter()
+        try:
+            return self.pipe(**kwargs)
+        finally:
+            if self.on_batch:
+                self.on_batch([clip_index for clip_index, _, _ in batch], time.perf_counter() - started)
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+CHECKPOINT_PREFIX = os.getenv("JOB_CHECKPOINT_PREFIX", "checkpoints/")
+
+
+def checkpoints_enabled():
+    return os.getenv("JOB_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+
+
+def encode_fingerprint(cache_keys, export_profile, duration):
+    """Inputs of the export, encoded segments are only reused when these did not change"""
+    payload = json.dumps({
+        "cache_keys": [cache_keys[i] for i in sorted(cache_keys)],
+        "export_profile": export_profile,
+        "duration": duration,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobCheckpoint:
+    """
+    Progress of one video job in S3, so a job restarted after its worker died picks up where it stopped.
+
+        checkpoints/{video_id}.json                      clips whose image is uploaded, encoded segments
+        checkpoints/{video_id}/segment_{start}_{end}.mp4  segments of the segmented export
+
+    Clips are matched by their image cache key, a checkpoint written for other prompts or generation
+    settings is ignored. Also the segment store of SegmentedExporter.
+    """
+
+    def __init__(self, s3_io, bucket, video_id, prefix=CHECKPOINT_PREFIX):
+        self.s3_io = s3_io
+        self.bucket = bucket
+        self.video_id = video_id
+        self.prefix = prefix.rstrip("/") + "/"
+        self._lock = threading.Lock()
+        self.state = {"video_id": video_id, "clips": {}, "encode": None}
+
+    @property
+    def key(self):
+        return f"{self.prefix}{self.video_id}.json"
+
+    def load(self):
+        try:
+            state = self.s3_io.read_json(self.bucket, self.key)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ("NoSuchKey", "404"):
+                raise
+            return self
+        self.state.update(state)
+        encode = self.state.get("encode") or {}
+        print(f"Resuming job {self.video_id} from its checkpoint: {len(self.state['clips'])} clip images and "
+              f"{len(encode.get('segments', {}))} encoded segments done")
+        return self
+
+    @property
+    def resumed(self):
+        return bool(self.state["clips"])
+
+    def _save(self):
+        # Called with the lock held, so concurrent updates never overwrite each other
+        self.state["updated_at"] = time.time()
+        self.s3_io.put_json(self.bucket, self.key, self.state)
+
+    def completed_image_key(self, index, cache_key):
+        entry = self.state["clips"].get(str(index))
+        if entry and entry["cache_key"] == cache_key:
+            return entry["image_key"]
+        return None
+
+    def restore_image(self, index, cache_key):
+        """The stored image of a finished clip, or None when the clip has to be rendered"""
+        image_key = self.completed_image_key(index, cache_key)
+        if image_key is None:
+            return None
+        from PIL import Image
+
+        try:
+            image = Image.open(io.BytesIO(self.s3_io.get_bytes(self.bucket, image_key)))
+            image.load()
+            return image
+        except Exception as e:
+            print(f"Could not restore clip {index + 1} from {image_key}: {str(e)}")
+            return None
+
+    def mark_clip_done(self, index, cache_key, image_key):
+        with self._lock:
+            self.state["clips"][str(index)] = {
+                "cache_key": cache_key,
+                "image_key": image_key,
+                "completed_at": time.time(),
+            }
+            self._save()
+
+    def start_encode(self, fingerprint):
+        """Segments encoded earlier are kept only when they came from the same inputs"""
+        with self._lock:
+            encode = self.state.get("encode")
+            if not encode or encode.get("fingerprint") != fingerprint:
+                self.state["encode"] = {"fingerprint": fingerprint, "segments": {}}
+        return self
+
+    def segment_key(self, segment):
+        return f"{self.prefix}{self.video_id}/segment_{segment['start_frame']}_{segment['end_frame']}.mp4"
+
+    def fetch_segment(self, segment, path):
+        """Download an already encoded segment to path, returns False when it has to be encoded"""
+        segment_key = self.segment_key(segment)
+        if segment_key not in self.state["encode"]["segments"]:
+            return False
+        try:
+            self.s3_io.download_file(self.bucket, segment_key, path)
+            return True
+        except Exception as e:
+            print(f"Could not restore segment {segment_key}: {str(e)}")
+            return False
+
+    def store_segment(self, segment, path):
+        segment_key = self.segment_key(segment)
+        self.s3_io.upload_file(path, self.bucket, segment_key, 'video/mp4')
+        with self._lock:
+            self.state["encode"]["segments"][segment_key] = {"completed_at": time.time()}
+            self._save()
+
+    def finish(self):
+        """The video is uploaded, drop the checkpoint and its segments"""
+        encode = self.state.get("encode") or {}
+        for segment_key in encode.get("segments", {}):
+            self.s3_io.delete(self.bucket, segment_key)
+        self.s3_io.delete(self.bucket, self.key)
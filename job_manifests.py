@@ -0,0 +1,241 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+JOB_MANIFEST_PREFIX = os.getenv("JOB_MANIFEST_PREFIX", "jobs/")
+
+PENDING = "pending"
+CLAIMS = "claims"
+DONE = "done"
+FAILED = "failed"
+
+# Claims are heartbeated, so a few missed intervals are enough to tell a dead worker
+DEFAULT_CLAIM_TTL_SECONDS = 300
+
+# S3 answers a conditional write that lost the race with one of these
+_CLAIM_CONFLICT_CODES = {"PreconditionFailed", "ConditionalRequestConflict", "412", "409"}
+
+
+class JobManifestQueue:
+    """
+    Job manifests under an S3 prefix, written by the Lambda and drained by the video worker.
+
+        jobs/pending/{video_id}.json   written by the Lambda, removed once the job finished
+        jobs/claims/{video_id}.json    created with If-None-Match so only one worker runs a job, heartbeated
+        jobs/done/{video_id}.json      manifest plus result of finished jobs
+        jobs/failed/{video_id}.json    manifest plus error of failed jobs
+    """
+
+    def __init__(self, client, bucket, prefix=JOB_MANIFEST_PREFIX, worker_id=None, claim_ttl_seconds=None):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/"
+        # Stable across restarts of the same pod, so a pod that died mid-job takes its own claims back at once
+        self.worker_id = worker_id or os.getenv("RUNPOD_POD_ID") or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.claim_ttl_seconds = claim_ttl_seconds or float(
+            os.getenv("JOB_CLAIM_TTL_SECONDS", str(DEFAULT_CLAIM_TTL_SECONDS))
+        )
+        # ETag of every claim this worker holds, refreshed by heartbeat() and checked on release
+        self._held = {}
+        self._held_lock = threading.RLock()
+
+    def key(self, state, video_id):
+        return f"{self.prefix}{state}/{video_id}.json"
+
+    def _put_json(self, key, data, **kwargs):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(data, indent=2),
+            ContentType='application/json',
+            **kwargs
+        )
+
+    def _get_json(self, key):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        try:
+            return json.load(body)
+        finally:
+            body.close()
+
+    def enqueue(self, job_data):
+        """Write the manifest of a job, returns its key"""
+        key = self.key(PENDING, job_data["video_id"])
+        self._put_json(key, {**job_data, "enqueued_at": time.time()})
+        return key
+
+    def pending_video_ids(self):
+        """Video ids with a pending manifest, oldest manifest first"""
+        pending_prefix = f"{self.prefix}{PENDING}/"
+        objects = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=pending_prefix):
+            objects.extend(page.get('Contents', []))
+        objects.sort(key=lambda obj: obj['LastModified'])
+        return [obj['Key'][len(pending_prefix):-len(".json")] for obj in objects if obj['Key'].endswith(".json")]
+
+    def _read_claim(self, video_id):
+        """The current claim and its ETag, or (None, None) when the job is unclaimed"""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key(CLAIMS, video_id))
+        except ClientError as e:
+            if e.response['Error']['Code'] in ("NoSuchKey", "404"):
+                return None, None
+            raise
+        try:
+            return json.load(response['Body']), response['ETag']
+        finally:
+            response['Body'].close()
+
+    def _write_claim(self, video_id, **condition):
+        """Write this worker's claim under an If-None-Match or If-Match condition, False when the race is lost"""
+        claim = {"video_id": video_id, "worker_id": self.worker_id, "claimed_at": time.time()}
+        try:
+            response = self.client.put_object(
+                Bucket=self.bucket,
+                Key=self.key(CLAIMS, video_id),
+                Body=json.dumps(claim, indent=2),
+                ContentType='application/json',
+                **condition
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] not in _CLAIM_CONFLICT_CODES:
+                raise
+            return False
+        with self._held_lock:
+            self._held[video_id] = response['ETag']
+        return True
+
+    def claim(self, video_id):
+        """
+        Atomically claim a pending job. The claim object is created with If-None-Match: *, so when two
+        workers race exactly one write succeeds. A stale claim, or one this worker id left behind before a
+        restart, is replaced with If-Match on the ETag it was read with, so of several workers that saw the
+        same claim only one takes it over. Returns the manifest, or None when the job is taken.
+        """
+        if not self._write_claim(video_id, IfNoneMatch="*"):
+            stale_claim, etag = self._read_claim(video_id)
+            if stale_claim is None:
+                # Released between the write and the read, the next drain picks it up
+                return None
+            with self._held_lock:
+                if video_id in self._held:
+                    # Already claimed and queued by this process
+                    return None
+            restarted = stale_claim.get("worker_id") == self.worker_id
+            if not restarted and time.time() - stale_claim.get("claimed_at", 0) <= self.claim_ttl_seconds:
+                return None
+            # The worker holding the claim stopped heartbeating, most likely it died mid-job
+            if not self._write_claim(video_id, IfMatch=etag):
+                return None
+            if restarted:
+                print(f"Took back the claim on job {video_id} held before this worker restarted")
+            else:
+                print(f"Took over stale claim of {stale_claim.get('worker_id')} on job {video_id}")
+
+        try:
+            manifest = self._get_json(self.key(PENDING, video_id))
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ("NoSuchKey", "404"):
+                raise
+            # Finished by another worker between the listing and the claim
+            self.release(video_id)
+            return None
+        return {**manifest, "claimed_by": self.worker_id}
+
+    def heartbeat(self):
+        """
+        Rewrite claimed_at of every claim this worker holds, so jobs running past the TTL are not taken
+        over. A claim whose ETag changed was taken over by another worker and is dropped.
+        Returns the video ids still held.
+        """
+        with self._held_lock:
+            video_ids = list(self._held)
+        for video_id in video_ids:
+            # Held across the write so release() never runs between the check and the refresh
+            with self._held_lock:
+                etag = self._held.get(video_id)
+                if etag is None:
+                    continue
+                try:
+                    if not self._write_claim(video_id, IfMatch=etag):
+                        print(f"Claim on job {video_id} was taken over by another worker")
+                        del self._held[video_id]
+                except ClientError as e:
+                    if e.response['Error']['Code'] in ("NoSuchKey", "404"):
+                        print(f"Claim on job {video_id} was removed by another worker")
+                        del self._held[video_id]
+                    else:
+                        print(f"Failed to refresh claim on job {video_id}: {str(e)}")
+        with self._held_lock:
+            return list(self._held)
+
+    def start_heartbeat(self, interval_seconds=None):
+        """Refresh held claims in a daemon thread, every JOB_CLAIM_HEARTBEAT_SECONDS by default"""
+        interval_seconds = interval_seconds or float(
+            os.getenv("JOB_CLAIM_HEARTBEAT_SECONDS", str(max(1.0, self.claim_ttl_seconds / 5)))
+        )
+
+        def beat():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"Claim heartbeat failed: {str(e)}")
+
+        threading.Thread(target=beat, name="job-claim-heartbeat", daemon=True).start()
+
+    def release(self, video_id):
+        """Give a claimed job back to the queue, a claim another worker took over is left alone"""
+        with self._held_lock:
+            etag = self._held.pop(video_id, None)
+            condition = {"IfMatch": etag} if etag else {}
+            try:
+                self.client.delete_object(Bucket=self.bucket, Key=self.key(CLAIMS, video_id), **condition)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in _CLAIM_CONFLICT_CODES | {"NoSuchKey", "404"}:
+                    raise
+                print(f"Claim on job {video_id} is no longer held by this worker")
+
+    def complete(self, video_id, manifest, result):
+        """Record how a claimed job ended and remove it from the queue"""
+        failed = not (isinstance(result, dict) and result.get("success"))
+        record = {**manifest, "result": result, "finished_at": time.time()}
+        self._put_json(self.key(FAILED if failed else DONE, video_id), record)
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(PENDING, video_id))
+        self.release(video_id)
+
+    def drain(self, submit, capacity):
+        """
+        Claim pending jobs oldest first and hand each manifest to submit, at most capacity() at a time.
+        Jobs that submit rejects are released for a later drain. submit returns the scheduler's job status,
+        a job it already has from another source is released too, since that run never completes the
+        manifest. Returns the claimed video ids.
+        """
+        claimed = []
+        for video_id in self.pending_video_ids():
+            if capacity() <= 0:
+                break
+            manifest = self.claim(video_id)
+            if manifest is None:
+                continue
+            try:
+                status = submit(manifest)
+            except Exception as e:
+                print(f"Could not queue claimed job {video_id}: {str(e)}")
+                self.release(video_id)
+                continue
+            if isinstance(status, dict) and status.get("duplicate"):
+                print(f"Job {video_id} is already {status.get('status')} on this worker, releasing its manifest")
+                self.release(video_id)
+                continue
+            claimed.append(video_id)
+        if claimed:
+            print(f"Claimed {len(claimed)} job manifest(s): {', '.join(claimed)}")
+        return claimed
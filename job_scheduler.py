@@ -0,0 +1,167 @@
+import threading
+import time
+import traceback
+from collections import deque, OrderedDict
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobScheduler:
+    """Bounded in-memory job queue drained by a fixed number of GPU worker threads"""
+
+    def __init__(self, work_fn, max_queue_size=8, worker_count=1, history_size=100, on_idle=None):
+        self.work_fn = work_fn
+        self.max_queue_size = max_queue_size
+        self.worker_count = worker_count
+        self.history_size = history_size
+        self.on_idle = on_idle
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._jobs = OrderedDict()
+        self._running = 0
+        self._workers = []
+        self._stopping = False
+
+    def start(self):
+        with self._condition:
+            if self._workers:
+                return
+            self._stopping = False
+            for slot in range(self.worker_count):
+                worker = threading.Thread(target=self._worker_loop, args=(slot,), name=f"gpu-worker-{slot}")
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+        print(f"Job scheduler started with {self.worker_count} GPU worker slot(s)")
+
+    def shutdown(self, wait=True, timeout=None):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            workers = list(self._workers)
+            self._workers = []
+        if wait:
+            for worker in workers:
+                worker.join(timeout)
+
+    def submit(self, job_id, job_data):
+        """
+        Queue a job and return its status with the 1-based queue position. A job that is already queued or
+        running is left as it is, its current status is returned with duplicate set.
+        """
+        with self._condition:
+            existing = self._jobs.get(job_id)
+            if existing and existing["status"] in (JOB_QUEUED, JOB_RUNNING):
+                return dict(self._status(job_id), duplicate=True)
+            if len(self._queue) >= self.max_queue_size:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs waiting)")
+
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": JOB_QUEUED,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "progress": {},
+            }
+            self._jobs.move_to_end(job_id)
+            self._queue.append((job_id, job_data))
+            self._trim_history()
+            self._condition.notify()
+            return dict(self._status(job_id), duplicate=False)
+
+    def get_status(self, job_id):
+        with self._condition:
+            if job_id not in self._jobs:
+                return None
+            return self._status(job_id)
+
+    def set_progress(self, job_id, **progress):
+        """Merge fields into the progress a running job reports on its status, unknown jobs are ignored"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["progress"] = dict(job["progress"], **progress)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued": len(self._queue),
+                "running": self._running,
+                "max_queue_size": self.max_queue_size,
+                "worker_slots": self.worker_count,
+            }
+
+    def free_capacity(self):
+        """Jobs that can still be queued before submit raises QueueFullError"""
+        with self._condition:
+            return self.max_queue_size - len(self._queue)
+
+    def is_idle(self):
+        with self._condition:
+            return not self._queue and self._running == 0
+
+    def _status(self, job_id):
+        status = dict(self._jobs[job_id])
+        status["queue_position"] = self._position(job_id)
+        return status
+
+    def _position(self, job_id):
+        for index, (queued_id, _) in enumerate(self._queue):
+            if queued_id == job_id:
+                return index + 1
+        return None
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (JOB_DONE, JOB_FAILED)]
+        while len(self._jobs) > self.history_size and finished:
+            del self._jobs[finished.pop(0)]
+
+    def _worker_loop(self, slot):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                job_id, job_data = self._queue.popleft()
+                self._running += 1
+                job = self._jobs[job_id]
+                job["status"] = JOB_RUNNING
+                job["started_at"] = time.time()
+
+            print(f"Worker slot {slot} running job: {job_id}")
+            try:
+                result = self.work_fn(job_data)
+                failed = isinstance(result, dict) and result.get("success") is False
+                error = result.get("error") if failed else None
+            except Exception as e:
+                print(f"Job {job_id} crashed: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+                result = None
+                failed = True
+                error = str(e)
+
+            with self._condition:
+                job["status"] = JOB_FAILED if failed else JOB_DONE
+                job["finished_at"] = time.time()
+                job["result"] = result
+                job["error"] = error
+                self._running -= 1
+                idle = not self._queue and self._running == 0
+            print(f"Job {job_id} finished with status: {job['status']}")
+
+            if idle and self.on_idle and self.is_idle():
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    print(f"Idle callback failed: {str(e)}")
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import hashlib
+
+from execution_modes import apply_execution_mode, cuda_total_memory, quantization_config, resolve_execution_mode
+
+FLUX_MODEL_ID = "black-forest-labs/FLUX.1-dev"
+
+
+def load_diffusers_pipeline(model_id, execution_mode=None):
+    """Load the real FLUX pipeline and place it on the GPU the way the execution mode says"""
+    import torch
+    from diffusers import FluxPipeline, FluxTransformer2DModel
+
+    execution_mode = execution_mode or resolve_execution_mode()
+    components = {}
+    if execution_mode["quantization"]:
+        components["transformer"] = FluxTransformer2DModel.from_pretrained(
+            model_id,
+            subfolder="transformer",
+            quantization_config=quantization_config(execution_mode["quantization"]),
+            torch_dtype=torch.bfloat16
+        )
+    pipe = FluxPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.bfloat16,
+        **components
+    )
+    return apply_execution_mode(pipe, execution_mode)
+
+
+class FakePipelineOutput:
+    def __init__(self, images):
+        self.images = images
+
+
+class FakeFluxPipeline:
+    """CPU-only stand-in for FluxPipeline that returns solid color images"""
+
+    def __init__(self, model_id=FLUX_MODEL_ID, delay_seconds=0.0):
+        self.model_id = model_id
+        self.delay_seconds = delay_seconds
+        self.calls = []
+
+    def __call__(self, prompt=None, negative_prompt=None, height=1080, width=1080,
+                 num_inference_steps=20, guidance_scale=3.5, prompt_embeds=None, **kwargs):
+        from PIL import Image
+
+        # Precomputed embeddings stand in for the prompt text, one image per embedding
+        if prompt is None:
+            prompts = list(prompt_embeds)
+        else:
+            prompts = prompt if isinstance(prompt, list) else [prompt]
+        self.calls.append({
+            "prompts": list(prompts),
+            "prompt_embeds": prompt_embeds is not None,
+            "height": height,
+            "width": width,
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+        })
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds * len(prompts))
+
+        images = []
+        for text in prompts:
+            digest = hashlib.md5(str(text).encode("utf-8")).digest()
+            images.append(Image.new("RGB", (width, height), color=(digest[0], digest[1], digest[2])))
+        return FakePipelineOutput(images)
+
+
+def load_fake_pipeline(model_id, execution_mode=None):
+    delay_seconds = float(os.getenv("FAKE_PIPELINE_DELAY_SECONDS", "0"))
+    return FakeFluxPipeline(model_id, delay_seconds=delay_seconds)
+
+
+PIPELINE_BACKENDS = {
+    "diffusers": load_diffusers_pipeline,
+    "fake": load_fake_pipeline,
+}
+
+
+class ModelRegistry:
+    """Process-wide registry that loads a pipeline once and shares it between jobs"""
+
+    def __init__(self, model_id=FLUX_MODEL_ID, loader=None, execution_mode=None, memory_probe=cuda_total_memory):
+        self.model_id = model_id
+        self.loader = loader or load_diffusers_pipeline
+        # Requested mode name, None reads FLUX_EXECUTION_MODE. Resolved at load time, so importing the
+        # worker never touches CUDA
+        self.requested_execution_mode = execution_mode
+        self.memory_probe = memory_probe
+        self.execution_mode = None
+        # Diffusers pipelines are not safe to call from several threads at once
+        self.inference_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._pipeline = None
+        self._state = "not_loaded"
+        self._error = None
+        self._load_seconds = None
+        self._loaded_at = None
+
+    def get_pipeline(self):
+        if self._pipeline is not None:
+            return self._pipeline
+
+        with self._load_lock:
+            # Another job may have finished loading while we waited for the lock
+            if self._pipeline is not None:
+                return self._pipeline
+
+            print(f"Loading model: {self.model_id}")
+            self._state = "loading"
+            self._error = None
+            started = time.time()
+            try:
+                self.execution_mode = resolve_execution_mode(self.requested_execution_mode, self.memory_probe)
+                vram_bytes = self.execution_mode["vram_bytes"]
+                vram = f"{vram_bytes / 1024 ** 3:.1f} GiB VRAM" if vram_bytes is not None else "no CUDA device"
+                print(f"Execution mode: {self.execution_mode['name']} ({vram})")
+                pipeline = self.loader(self.model_id, self.execution_mode)
+            except Exception as e:
+                self._state = "error"
+                self._error = str(e)
+                print(f"Error loading model: {str(e)}")
+                raise
+
+            self._load_seconds = round(time.time() - started, 2)
+            self._loaded_at = time.time()
+            self._pipeline = pipeline
+            self._state = "loaded"
+            print(f"{self.model_id} loaded successfully in {self._load_seconds}s")
+            return pipeline
+
+    def warm_up(self, background=True):
+        """Start loading the pipeline so the first job does not pay for it"""
+
+        def _load():
+            try:
+                self.get_pipeline()
+            except Exception:
+                # The error is kept in the status and raised again for the next job
+                pass
+
+        if not background:
+            _load()
+            return None
+
+        thread = threading.Thread(target=_load, name="model-warm-up")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def is_loaded(self):
+        return self._pipeline is not None
+
+    def unload(self):
+        with self._load_lock:
+            self._pipeline = None
+            self._state = "not_loaded"
+            self._load_seconds = None
+            self._loaded_at = None
+
+    def max_batch_size(self):
+        """Batch size cap of the execution mode, None when the mode sets none or nothing is loaded yet"""
+        return self.execution_mode["max_batch_size"] if self.execution_mode else None
+
+    def status(self):
+        return {
+            "model": self.model_id,
+            "state": self._state,
+            "loaded": self.is_loaded(),
+            "load_seconds": self._load_seconds,
+            "error": self._error,
+            "execution_mode": self.execution_mode["name"] if self.execution_mode else None,
+            "vram_bytes": self.execution_mode["vram_bytes"] if self.execution_mode else None,
+        }
+
+
+def create_model_registry():
+    """Build the registry from the FLUX_MODEL_ID and FLUX_PIPELINE_BACKEND env vars"""
+    backend = os.getenv("FLUX_PIPELINE_BACKEND", "diffusers")
+    if backend not in PIPELINE_BACKENDS:
+        raise ValueError(f"Unknown pipeline backend: {backend}")
+    return ModelRegistry(
+        model_id=os.getenv("FLUX_MODEL_ID", FLUX_MODEL_ID),
+        loader=PIPELINE_BACKENDS[backend]
+    )
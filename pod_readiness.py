@@ -0,0 +1,77 @@
+import os
+import time
+
+import requests
+
+
+def backoff_delays(initial_delay=1.0, max_delay=15.0, factor=2.0):
+    """Endless exponential delays capped at max_delay"""
+    delay = initial_delay
+    while True:
+        yield delay
+        delay = min(max_delay, delay * factor)
+
+
+class PodReadinessProbe:
+    """
+    Polls the worker's /health endpoint with exponential backoff until it reports the FLUX model
+    loaded or the deadline passes. A pod that is still booting answers through the RunPod proxy
+    with an error or not at all, both just count as not ready yet.
+    """
+
+    def __init__(self, health_url, timeout_seconds=None, initial_delay=None, max_delay=None,
+                 request_timeout=5.0, require_model_loaded=True, session=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.health_url = health_url
+        self.timeout_seconds = timeout_seconds or float(os.getenv("POD_READY_TIMEOUT_SECONDS", "600"))
+        self.initial_delay = initial_delay or float(os.getenv("POD_READY_INITIAL_DELAY", "1"))
+        self.max_delay = max_delay or float(os.getenv("POD_READY_MAX_DELAY", "15"))
+        self.request_timeout = request_timeout
+        self.require_model_loaded = require_model_loaded
+        self.session = session or requests.Session()
+        self.clock = clock
+        self.sleep = sleep
+        self.attempts = 0
+        self.waited_seconds = 0.0
+
+    def check(self):
+        """One probe, returns (ready, health JSON or None)"""
+        self.attempts += 1
+        try:
+            response = self.session.get(self.health_url, timeout=self.request_timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Health check {self.attempts} failed: {type(e).__name__}")
+            return False, None
+        if response.status_code != 200:
+            print(f"Health check {self.attempts} returned {response.status_code}")
+            return False, None
+        try:
+            health = response.json()
+        except ValueError:
+            # The proxy serves an HTML page while the container is starting
+            print(f"Health check {self.attempts} returned a non JSON body")
+            return False, None
+        ready = bool(health.get("model_loaded")) if self.require_model_loaded else True
+        if not ready:
+            print(f"Health check {self.attempts}: server up, model {health.get('model_status', {}).get('state')}")
+        return ready, health
+
+    def wait(self):
+        """Block until the pod is ready, returns its health JSON, or None when the deadline passes"""
+        started = self.clock()
+        deadline = started + self.timeout_seconds
+        for delay in backoff_delays(self.initial_delay, self.max_delay):
+            ready, health = self.check()
+            now = self.clock()
+            self.waited_seconds = now - started
+            if ready:
+                print(f"Pod ready after {self.waited_seconds:.1f}s and {self.attempts} health checks")
+                return health
+            if health and health.get("model_status", {}).get("state") == "error":
+                print(f"Pod model failed to load: {health['model_status'].get('error')}")
+                return None
+            remaining = deadline - now
+            if remaining <= 0:
+                print(f"Pod not ready after {self.waited_seconds:.1f}s, giving up")
+                return None
+            self.sleep(min(delay, remaining))
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from export_profiles import ffmpeg_video_args, resolve_export_profile
+from frame_renderer import FRAME_SIZE, FfmpegFrameRenderer, scale_frame_clip
+
+# Outside videos/, whose uploads trigger publishing
+PREVIEW_PREFIX = "previews/"
+
+
+def preview_enabled():
+    return os.getenv("PREVIEW_DELIVERY", "true").lower() in ("1", "true", "yes")
+
+
+def preview_key(video_id):
+    return f"{PREVIEW_PREFIX.rstrip('/')}/{video_id}.mp4"
+
+
+def render_preview(frame_clips, duration, output_path, audio_path=None, size=None, export_profile=None):
+    """Low resolution, low bitrate MP4 of the same frame clips the final render uses"""
+    size = size or int(os.getenv("PREVIEW_SIZE", "360"))
+    export_profile = export_profile or resolve_export_profile(os.getenv("PREVIEW_EXPORT_PROFILE", "preview"))
+    scale = size / FRAME_SIZE[0]
+    scaled_sprites = {}
+    preview_clips = [scale_frame_clip(clip, scale, scaled_sprites) for clip in frame_clips]
+    renderer = FfmpegFrameRenderer(
+        frame_size=(size, int(round(FRAME_SIZE[1] * scale))),
+        fps=export_profile["fps"],
+        video_args=ffmpeg_video_args(export_profile)
+    )
+    renderer.render(preview_clips, duration, output_path, audio_path)
+    return output_path
+
+
+class DeliveryMetadata:
+    """
+    Progress from preview to final in metadata/{video_id}.json, next to what the Lambda wrote there:
+
+        "status": "preview_ready" then "completed"
+        "delivery": {"stage", "preview_key", "preview_ready_at", "video_key", "final_ready_at"}
+    """
+
+    def __init__(self, s3_io, bucket, video_id):
+        self.s3_io = s3_io
+        self.bucket = bucket
+        self.video_id = video_id
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        return f"metadata/{self.video_id}.json"
+
+    def _read(self):
+        try:
+            return self.s3_io.read_json(self.bucket, self.key)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ("NoSuchKey", "404"):
+                raise
+            # Jobs posted by hand have no Lambda metadata
+            return {"video_id": self.video_id}
+
+    def mark(self, stage, object_key):
+        """Record that the preview or final video is in S3, returns the delivery block"""
+        with self._lock:
+            metadata = self._read()
+            delivery = metadata.setdefault("delivery", {})
+            now = time.time()
+            if stage == "preview":
+                delivery.update(preview_key=object_key, preview_ready_at=now)
+                # The final upload may already have won the race, it is never downgraded
+                if delivery.get("stage") != "final":
+                    delivery["stage"] = "preview"
+                    metadata["status"] = "preview_ready"
+            else:
+                delivery.update(stage="final", video_key=object_key, final_ready_at=now)
+                if delivery.get("preview_ready_at"):
+                    delivery["preview_lead_seconds"] = round(now - delivery["preview_ready_at"], 1)
+                metadata["status"] = "completed"
+            self.s3_io.put_json(self.bucket, self.key, metadata)
+            return dict(delivery)
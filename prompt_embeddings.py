@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+
+def prompt_embeddings_enabled():
+    return os.getenv("FLUX_PROMPT_EMBEDDINGS", "cached") == "cached"
+
+
+class FluxPromptEncoder:
+    """
+    Runs the two text encoders of a diffusers FluxPipeline separately, so each result is cached on its own.
+    CLIP only sees the first tokenizer_max_length (77) tokens and gives the pooled embedding, so clips whose
+    prompts open with the same style anchors share it. T5 attends over the whole prompt, a shared prefix
+    cannot be encoded once and reused, and its cache only hits when the same clip is generated again.
+    """
+
+    def __init__(self, pipe, max_sequence_length=512):
+        self.pipe = pipe
+        self.max_sequence_length = max_sequence_length
+
+    def clip_key(self, prompt):
+        tokenizer = self.pipe.tokenizer
+        return tuple(tokenizer(prompt, truncation=True, max_length=self.pipe.tokenizer_max_length).input_ids)
+
+    def t5_key(self, prompt):
+        return prompt
+
+    def encode_clip(self, prompts):
+        import torch
+
+        with torch.no_grad():
+            embeds = self.pipe._get_clip_prompt_embeds(prompt=prompts, device=self.pipe._execution_device)
+        return list(embeds.split(1))
+
+    def encode_t5(self, prompts):
+        import torch
+
+        with torch.no_grad():
+            embeds = self.pipe._get_t5_prompt_embeds(
+                prompt=prompts, max_sequence_length=self.max_sequence_length, device=self.pipe._execution_device
+            )
+        return list(embeds.split(1))
+
+    def pipeline_kwargs(self, clip_embeds, t5_embeds):
+        import torch
+
+        return {"prompt_embeds": torch.cat(t5_embeds), "pooled_prompt_embeds": torch.cat(clip_embeds)}
+
+
+def create_prompt_encoder(pipe):
+    """FluxPromptEncoder for pipelines that expose both text encoders, None for anything else"""
+    if hasattr(pipe, "_get_clip_prompt_embeds") and hasattr(pipe, "_get_t5_prompt_embeds"):
+        return FluxPromptEncoder(pipe)
+    return None
+
+
+class PromptEmbeddingCache:
+    """
+    Prompt embeddings of one job, each text encoder runs once per distinct input it sees. Within one pass
+    over the clips only CLIP repeats, T5 hits come from batches retried after running out of memory.
+    """
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self._lock = threading.Lock()
+        self._caches = {"clip": {}, "t5": {}}
+        self._stats = {"clip_encodes": 0, "clip_hits": 0, "t5_encodes": 0, "t5_hits": 0, "encode_seconds": 0.0}
+
+    def pipeline_kwargs(self, prompts):
+        """prompt_embeds and pooled_prompt_embeds for a batch of prompts, encoding only the uncached ones"""
+        with self._lock:
+            clip_embeds = self._lookup("clip", [self.encoder.clip_key(prompt) for prompt in prompts], prompts,
+                                       self.encoder.encode_clip)
+            t5_embeds = self._lookup("t5", [self.encoder.t5_key(prompt) for prompt in prompts], prompts,
+                                     self.encoder.encode_t5)
+        return self.encoder.pipeline_kwargs(clip_embeds, t5_embeds)
+
+    def _lookup(self, name, keys, prompts, encode):
+        cache = self._caches[name]
+        missing = {}
+        for key, prompt in zip(keys, prompts):
+            if key in cache or key in missing:
+                self._stats[f"{name}_hits"] += 1
+            else:
+                missing[key] = prompt
+        if missing:
+            started = time.perf_counter()
+            cache.update(zip(missing, encode(list(missing.values()))))
+            self._stats["encode_seconds"] += time.perf_counter() - started
+            self._stats[f"{name}_encodes"] += len(missing)
+        return [cache[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, encode_seconds=round(self._stats["encode_seconds"], 4))
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def strip_markdown_json(raw_content):
+    """Remove ```json fences Deepseek sometimes wraps around its JSON answer"""
+    if raw_content.strip().startswith('```json'):
+        json_start = raw_content.find('```json') + 7
+        json_end = raw_content.rfind('```')
+        return raw_content[json_start:json_end].strip()
+    elif raw_content.strip().startswith('```'):
+        json_start = raw_content.find('```') + 3
+        json_end = raw_content.rfind('```')
+        return raw_content[json_start:json_end].strip()
+    return raw_content.strip()
+
+
+def create_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def post_with_retry(session, url, headers, payload, timeout, max_attempts=3, base_delay=1.0, max_delay=20.0):
+    """POST with a per-request timeout, retrying timeouts, connection errors and 429/5xx with jittered backoff"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response = session.post(url, headers=headers, json=payload, timeout=timeout)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == max_attempts:
+                response.raise_for_status()
+                return response
+            print(f"Request returned {response.status_code}, attempt {attempt}/{max_attempts}")
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if attempt == max_attempts:
+                raise
+            print(f"Request failed: {str(e)}, attempt {attempt}/{max_attempts}")
+
+        # Full jitter keeps parallel clip requests from retrying in lockstep
+        time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+
+
+def is_valid_clip_prompt(clip_prompt):
+    return (
+        isinstance(clip_prompt, dict)
+        and isinstance(clip_prompt.get('image_prompt'), str) and clip_prompt['image_prompt'].strip() != ""
+        and isinstance(clip_prompt.get('image_negative_prompt'), str)
+    )
+
+
+def parse_batched_clip_prompts(data, clip_count):
+    """
+    Pick the usable prompts out of a batched answer shaped like {"clips": [{"index", "image_prompt", ...}]}.
+    Returns {clip_index: prompt}, clips that are missing or malformed are left out.
+    """
+    entries = data.get('clips') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+    if len(entries) != clip_count:
+        print(f"Batched answer has {len(entries)} clips, expected {clip_count}")
+
+    prompts = {}
+    for position, entry in enumerate(entries):
+        if not is_valid_clip_prompt(entry):
+            continue
+        clip_index = entry.get('index', position)
+        if not isinstance(clip_index, int) or not 0 <= clip_index < clip_count or clip_index in prompts:
+            continue
+        prompts[clip_index] = {
+            'image_prompt': entry['image_prompt'],
+            'image_negative_prompt': entry['image_negative_prompt']
+        }
+    return prompts
+
+
+class ClipPromptClient:
+    """Issues Deepseek clip prompt requests, one batched call or per-clip calls run concurrently"""
+
+    def __init__(self, url, headers, max_workers=None, timeout=None, max_attempts=None, session=None):
+        self.url = url
+        self.headers = headers
+        self.max_workers = max_workers or int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8"))
+        self.timeout = timeout or float(os.getenv("DEEPSEEK_TIMEOUT_SECONDS", "120"))
+        self.max_attempts = max_attempts or int(os.getenv("DEEPSEEK_MAX_ATTEMPTS", "3"))
+        self.session = session or create_session(self.max_workers)
+        self._stats_lock = threading.Lock()
+        self.stats = {}
+
+    def _record(self, mode, seconds, usage):
+        with self._stats_lock:
+            entry = self.stats.setdefault(mode, {
+                "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0
+            })
+            entry["calls"] += 1
+            entry["seconds"] = round(entry["seconds"] + seconds, 3)
+            entry["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            entry["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    def _request_content(self, payload, mode, timeout=None):
+        started = time.time()
+        response = post_with_retry(
+            self.session, self.url, self.headers, payload, timeout or self.timeout, max_attempts=self.max_attempts
+        )
+        response_json = response.json()
+        self._record(mode, time.time() - started, response_json.get('usage') or {})
+        raw_content = response_json['choices'][0]['message']['content']
+        return json.loads(strip_markdown_json(raw_content))
+
+    def request_prompt(self, payload):
+        """Return the parsed prompt JSON, or None when the answer is not valid JSON or misses a key"""
+        try:
+            clip_prompt = self._request_content(payload, "per_clip")
+        except json.JSONDecodeError:
+            return None
+        return clip_prompt if is_valid_clip_prompt(clip_prompt) else None
+
+    def request_batched_prompts(self, payload, clip_count):
+        """Ask for every clip in one structured answer, returns {clip_index: prompt} for the usable clips"""
+        try:
+            # The whole story is generated in one answer, so it gets several per-clip timeouts
+            data = self._request_content(payload, "batched", timeout=self.timeout * 3)
+        except json.JSONDecodeError as e:
+            print(f"Batched answer is not valid JSON: {str(e)}")
+            return {}
+        return parse_batched_clip_prompts(data, clip_count)
+
+    def request_prompts(self, payloads):
+        """Run every payload concurrently, results keep the order of payloads"""
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.request_prompt, payloads))
+        print(f"Received {len(payloads)} clip prompts in {time.time() - started:.1f}s")
+        return results
+
+    def savings_report(self, clip_count):
+        """Token and latency use of this run next to an estimate of the all per-clip run it replaced"""
+        with self._stats_lock:
+            stats = {mode: dict(entry) for mode, entry in self.stats.items()}
+        report = {"clip_count": clip_count, "calls": stats}
+        per_clip = stats.get("per_clip")
+        batched = stats.get("batched")
+        if batched and per_clip:
+            average_tokens = (per_clip["prompt_tokens"] + per_clip["completion_tokens"]) / per_clip["calls"]
+            estimated_tokens = average_tokens * clip_count
+        elif batched:
+            # Every per-clip call resends roughly the whole batched prompt context
+            estimated_tokens = batched["prompt_tokens"] * clip_count + batched["completion_tokens"]
+        else:
+            return report
+        used_tokens = sum(entry["prompt_tokens"] + entry["completion_tokens"] for entry in stats.values())
+        report["tokens_used"] = used_tokens
+        report["estimated_per_clip_tokens"] = int(estimated_tokens)
+        report["estimated_tokens_saved"] = int(estimated_tokens - used_tokens)
+        report["seconds"] = round(sum(entry["seconds"] for entry in stats.values()), 3)
+        return report
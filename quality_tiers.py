@@ -0,0 +1,52 @@
+import os
+
+# Image generation settings per job tier. The video frame stays 1080x1080, tiers rendered smaller are
+# upscaled before captioning, so only the diffusion cost changes.
+QUALITY_TIERS = {
+    # Quarter of the pixels at under half the steps, for previews and script iteration
+    "draft": {
+        "width": 512,
+        "height": 512,
+        "num_inference_steps": 8,
+        "guidance_scale": 3.5,
+    },
+    # The settings every job rendered with before tiers existed
+    "standard": {
+        "width": 1080,
+        "height": 1080,
+        "num_inference_steps": 20,
+        "guidance_scale": 3.5,
+    },
+    "final": {
+        "width": 1080,
+        "height": 1080,
+        "num_inference_steps": 28,
+        "guidance_scale": 3.5,
+    },
+}
+
+
+def get_default_quality_tier():
+    return os.getenv("QUALITY_TIER", "standard")
+
+
+def resolve_quality_tier(name=None):
+    """Tier settings by name, the QUALITY_TIER env var picks the default"""
+    name = name or get_default_quality_tier()
+    if name not in QUALITY_TIERS:
+        raise ValueError(f"Unknown quality tier: {name} (expected one of {', '.join(QUALITY_TIERS)})")
+    return dict(QUALITY_TIERS[name], name=name)
+
+
+def generation_params(tier):
+    """Keyword arguments of the FLUX call for the tier"""
+    return {key: tier[key] for key in ("width", "height", "num_inference_steps", "guidance_scale")}
+
+
+def upscale_to_frame(image, frame_size):
+    """Resize an image rendered below the frame size, images already at the frame size are returned as is"""
+    from PIL import Image
+
+    if image.size == tuple(frame_size):
+        return image
+    return image.resize(frame_size, Image.LANCZOS)
@@ -0,0 +1,62 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+_PRODUCER_DONE = object()
+
+
+def run_pipeline(producer, stage_fn, worker_count=None, queue_size=None):
+    """
+    Run a producer and a pool of consumers at the same time.
+
+    producer(emit) runs on its own thread and calls emit(index, item) for every item it makes,
+    blocking while the bounded hand-off queue is full. stage_fn(index, item) runs on a thread pool.
+    Returns {index: stage result or the exception the stage raised}. An exception raised by the
+    producer itself is raised again once the already emitted items are finished.
+    """
+    if worker_count is None:
+        worker_count = int(os.getenv("RENDER_PIPELINE_WORKERS", "4"))
+    if queue_size is None:
+        queue_size = int(os.getenv("RENDER_PIPELINE_QUEUE_SIZE", "4"))
+
+    handoff = queue.Queue(maxsize=max(1, queue_size))
+    producer_errors = []
+
+    def _produce():
+        try:
+            producer(lambda index, item: handoff.put((index, item)))
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            handoff.put(_PRODUCER_DONE)
+
+    producer_thread = threading.Thread(target=_produce, name="pipeline-producer")
+    producer_thread.daemon = True
+    producer_thread.start()
+
+    # Bounds the work waiting inside the pool so the hand-off queue really applies backpressure
+    in_flight = threading.BoundedSemaphore(worker_count)
+    futures = {}
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="pipeline-stage") as executor:
+        while True:
+            entry = handoff.get()
+            if entry is _PRODUCER_DONE:
+                break
+            index, item = entry
+            in_flight.acquire()
+            future = executor.submit(stage_fn, index, item)
+            future.add_done_callback(lambda _: in_flight.release())
+            futures[index] = future
+        wait(list(futures.values()))
+
+    producer_thread.join()
+
+    results = {}
+    for index, future in futures.items():
+        error = future.exception()
+        results[index] = error if error is not None else future.result()
+
+    if producer_errors:
+        raise producer_errors[0]
+    return results
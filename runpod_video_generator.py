@@ -1,26 +1,46 @@
+import io
 import json
 import os
-import boto3
-import torch
-import threading
-from diffusers import FluxPipeline
 from moviepy import AudioFileClip, CompositeVideoClip, TextClip, vfx, ImageClip, ColorClip
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import requests
+import threading
+import time
 import traceback
-
-def create_captions(clip_data):
+from model_registry import create_model_registry
+from job_scheduler import JobScheduler, QueueFullError
+from job_manifests import JobManifestQueue
+from idle_shutdown import IdleShutdownController
+from image_generation import BatchedImageGenerator, choose_batch_size, clip_seeds, get_latent_mode, story_seed
+from quality_tiers import generation_params as tier_generation_params, resolve_quality_tier, upscale_to_frame
+from prompt_embeddings import PromptEmbeddingCache, create_prompt_encoder, prompt_embeddings_enabled
+from image_cache import create_image_cache, image_cache_key
+from render_pipeline import run_pipeline
+from caption_cache import caption_sprite_cache
+from s3_io import S3IO, create_s3_client
+from job_checkpoints import JobCheckpoint, checkpoints_enabled, encode_fingerprint
+from tracing import JobTrace, WorkerMetrics, cuda_peak_memory, reset_cuda_peak_memory
+from export_profiles import ffmpeg_audio_args, ffmpeg_video_args, moviepy_write_kwargs, resolve_export_profile
+from frame_renderer import FRAME_SIZE, FfmpegFrameRenderer, FrameClip, prepare_frame_clip, prepare_fallback_frame_clip
+from preview_delivery import DeliveryMetadata, preview_enabled, preview_key, render_preview
+from segmented_export import SegmentedExporter, get_segment_workers
+
+def create_captions(clip_data, frame_size=(1080, 1080)):
     text_clips = []
     word_timestamps = clip_data['word_timestamps']
-    font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
     for word_data in word_timestamps:
         start = word_data["start"]
         end = word_data["end"]
-        word_text = word_data["word"]
+        # Each distinct word is rasterized once and reused across clips and jobs
+        sprite = caption_sprite_cache.get(word_data["word"])
+        canvas_width, canvas_height = sprite.canvas_size
+        position = (
+            (frame_size[0] - canvas_width) // 2 + sprite.offset[0],
+            frame_size[1] - canvas_height + sprite.offset[1]
+        )
         txt_clip = (
-            TextClip(text=word_text, font=font_path, font_size=60, color='white', stroke_color='black',
-                     stroke_width=3, method="caption", size = (1080, 240))
-            .with_position(("center", "bottom"))
+            ImageClip(sprite.to_array(), transparent=True)
+            .with_position(position)
             .with_start(start)
             .with_end(end)
             .with_duration(end - start)
@@ -30,127 +50,352 @@ def create_captions(clip_data):
 
     return text_clips
 
-def generate_video_from_images(transcript_data, audio_path, output_path, s3_bucket, video_id):
-    print("=== Starting image-based video generation with FLUX.1-dev ===")
-    print(f"Script: {transcript_data['script']}")
-    print(f"Duration: {transcript_data.get('duration', 'unknown')} seconds")
-    print(f"Clip count: {transcript_data.get('clip_count', 'unknown')}")
+def create_image_clip(clip_data, image_path, is_last):
+    # Create video clip from static image with exact timing from voiceover
+    clip_duration = clip_data['duration'] if is_last != True else clip_data['duration'] + 2
+    video_clip = ImageClip(image_path, duration=clip_duration)
 
-    # Load FLUX.1-dev model from Hugging Face
-    model_id = "black-forest-labs/FLUX.1-dev"
-    print(f"Loading model: {model_id}")
+    # Apply subtle zoom effect for more dynamic feel
+    zoom_factor = 1.05
+    video_clip = video_clip.resized(lambda t: 1 + (zoom_factor - 1) * t / clip_duration)
 
-    try:
-        # Load FLUX pipeline
-        pipe = FluxPipeline.from_pretrained(
-            model_id,
-            torch_dtype=torch.bfloat16
+    # Set the start time for this clip to match voiceover timing
+    video_clip = video_clip.with_start(clip_data['start_time'])
+
+    # Create synchronized captions using absolute timing
+    text_clips = create_captions(clip_data)
+    print(f"Created {len(text_clips)} caption segments for clip {clip_data['text'][:30]}...")
+
+    # Composite video with synchronized text
+    if text_clips:
+        video_clip = CompositeVideoClip([video_clip] + text_clips)
+    return video_clip
+
+
+def create_fallback_clip(clip_data):
+    # Create a fallback clip (solid color with text) with proper timing
+    return (
+        ColorClip(
+            size=(1080, 1080),
+            color=(50, 50, 50),
+            duration=clip_data['duration']
         )
-        pipe.to("cuda")
-        print("FLUX.1-dev model loaded successfully")
-    except Exception as e:
-        print(f"Error loading model: {str(e)}")
-        raise e
+        .with_start(clip_data['start_time'])
+        .with_effects([
+            TextClip(
+                text=clip_data['text'],
+                font_size=24,
+                color='white'
+            ).with_position("center")
+        ])
+    )
 
-    # Get audio and clip data
-    print("=== Processing audio and clips ===")
-    audio_clip = AudioFileClip(audio_path)
-    audio_duration = audio_clip.duration
-    print(f"Audio duration: {audio_duration} seconds")
 
+def generate_video_from_images(transcript_data, audio_path, output_path, s3_bucket, video_id, audio_download=None,
+                               trace=None, export_profile=None, checkpoint=None, seed=None, quality_tier=None,
+                               on_preview=None):
+    print("=== Starting image-based video generation with FLUX.1-dev ===")
+    trace = trace or JobTrace(video_id)
+    print(f"Script: {transcript_data['script']}")
+    print(f"Duration: {transcript_data.get('duration', 'unknown')} seconds")
+    print(f"Clip count: {transcript_data.get('clip_count', 'unknown')}")
+
+    # Get clip data, the audio may still be downloading and is only needed for the export
+    print("=== Processing clips ===")
     image_clips_data = transcript_data['image_clips_data']
     target_duration = transcript_data['duration']
 
     print(f"Processing {len(image_clips_data)} image clips with variable timing...")
     print(f"Target video duration: {target_duration} seconds")
 
-    # Generate each image and create video clips with proper timing
-    generated_clips = []
-    fps = 30
     clip_count = len(image_clips_data)
-    for i in range(clip_count):
+    quality_tier = quality_tier or resolve_quality_tier()
+    trace.labels["quality_tier"] = quality_tier["name"]
+    generation_params = tier_generation_params(quality_tier)
+    print(f"Quality tier: {quality_tier['name']} ({generation_params['width']}x{generation_params['height']}, "
+          f"{generation_params['num_inference_steps']} steps)")
+    # Clips of one story can start from seeded or shared initial latents, a seed in the clip data wins
+    latent_mode = get_latent_mode()
+    seeds = clip_seeds(clip_count, seed if seed is not None else story_seed(video_id), latent_mode)
+    for i, clip_data in enumerate(image_clips_data):
+        if clip_data.get('seed') is not None:
+            seeds[i] = clip_data['seed']
+    print(f"Latent mode: {latent_mode}")
+    cache_keys = {}
+    for i, clip_data in enumerate(image_clips_data):
+        cache_keys[i] = image_cache_key(
+            clip_data['image_prompt'],
+            clip_data['image_negative_prompt'],
+            generation_params['width'],
+            generation_params['height'],
+            generation_params['num_inference_steps'],
+            generation_params['guidance_scale'],
+            seed=seeds.get(i),
+            model_id=model_registry.model_id
+        )
+
+    def produce_images(emit):
+        # Clips finished before a restart and cache hits are handed over first and never touch the GPU
+        prompt_requests = []
+        for i, clip_data in enumerate(image_clips_data):
+            if checkpoint is not None and checkpoint.completed_image_key(i, cache_keys[i]):
+                with trace.span("checkpoint_restore", clip=i):
+                    restored_image = checkpoint.restore_image(i, cache_keys[i])
+                if restored_image is not None:
+                    print(f"Clip {i + 1} restored from the job checkpoint")
+                    emit(i, (restored_image, "checkpoint"))
+                    continue
+            with trace.span("image_cache_lookup", clip=i):
+                cached_image = image_cache.get(cache_keys[i], s3_bucket) if image_cache else None
+            if cached_image is not None:
+                print(f"Image cache hit for clip {i + 1}")
+                emit(i, (cached_image, "cache"))
+            else:
+                prompt_requests.append((i, clip_data['image_prompt'], clip_data['image_negative_prompt']))
+
+        if not prompt_requests:
+            print("All clip images served from the checkpoint or cache, skipping FLUX")
+            return
+
+        # Reuse the process-wide FLUX pipeline, loading it only if warm-up has not finished yet
+        print(f"Acquiring model: {model_registry.model_id}")
+
+        try:
+            with trace.span("model_load"):
+                pipe = model_registry.get_pipeline()
+            print("FLUX.1-dev model ready")
+        except Exception as e:
+            print(f"Error loading model: {str(e)}")
+            raise e
+
+        # The GPU keeps generating while earlier clips are encoded, uploaded and captioned
+        batch_size = choose_batch_size()
+        # Offloaded and quantized execution modes leave no room for large batches
+        if model_registry.max_batch_size():
+            batch_size = min(batch_size, model_registry.max_batch_size())
+        print(f"=== Generating {len(prompt_requests)} images with batch size {batch_size} ===")
+        # CLIP runs once per distinct 77-token opening, batches retried after an OOM re-encode nothing
+        prompt_encoder = create_prompt_encoder(pipe) if prompt_embeddings_enabled() else None
+        prompt_embeddings = PromptEmbeddingCache(prompt_encoder) if prompt_encoder else None
+        image_generator = BatchedImageGenerator(
+            pipe,
+            batch_size,
+            generation_params=generation_params,
+            inference_lock=model_registry.inference_lock,
+            on_batch=record_diffusion,
+            prompt_embeddings=prompt_embeddings,
+            seeds=seeds
+        )
+        image_generator.generate(prompt_requests, on_image=lambda i, image: emit(i, (image, "generated")))
+        print(f"Generated {len(prompt_requests)} images in {image_generator.pipeline_calls} pipeline calls")
+        if prompt_embeddings is not None:
+            embedding_stats = prompt_embeddings.stats()
+            trace.record("text_encode", embedding_stats["encode_seconds"])
+            print(f"Prompt embeddings: {embedding_stats}")
+
+    def record_diffusion(indexes, seconds):
+        trace.record("diffusion_batch", seconds)
+        # A batch renders its clips together, each clip is charged an equal share
+        for i in indexes:
+            trace.record("diffusion", seconds / len(indexes), clip=i)
+
+    def prepare_clip(i, generated):
+        image, source = generated
+        if isinstance(image, Exception):
+            raise image
         clip_data = image_clips_data[i]
-        print(f"=== Generating image {i + 1}/{clip_count} ===")
+        print(f"=== Processing clip {i + 1}/{clip_count} ===")
         print(f"Clip text: {clip_data['text']}")
         print(f"Clip timing: {clip_data['start_time']:.2f}s - {clip_data['end_time']:.2f}s ({clip_data['duration']:.2f}s)")
-        print(f"Image prompt: {clip_data['image_prompt'][:100]}...")
 
-        try:
-            # Generate image using FLUX
-            print(f"Generating image for clip {i + 1}")
-            image = pipe(
-                prompt=clip_data['image_prompt'],
-                negative_prompt=clip_data['image_negative_prompt'],
-                height=1080,
-                width=1080,
-                num_inference_steps=20,
-                guidance_scale=3.5,
-            ).images[0]
-
-            print(f"Generated image for clip {i + 1}")
-
-            # Save image temporarily
-            temp_image_path = f"/tmp/image_{i}.png"
-            image.save(temp_image_path)
-            print(f"Image {i + 1} saved to: {temp_image_path}")
-
-            print("=== Uploading clip images of video to S3 ===")
-            image_key = f"images/{video_id}_image_{i}.png"
-            s3_client.upload_file(
-                temp_image_path,
-                s3_bucket,
-                image_key,
-                ExtraArgs={'ContentType': 'image/png'}
-            )
+        # Tiers rendered below the frame size are upscaled before anything else sees the image
+        if image.size != FRAME_SIZE:
+            with trace.span("upscale", clip=i):
+                image = upscale_to_frame(image, FRAME_SIZE)
+
+        # Encode the PNG once for the temp file, the S3 upload and the image cache
+        with trace.span("png_encode", clip=i):
+            png_buffer = io.BytesIO()
+            image.save(png_buffer, format="PNG")
+            png_data = png_buffer.getvalue()
+
+            temp_image_path = f"/tmp/{video_id}_image_{i}.png"
+            with open(temp_image_path, "wb") as f:
+                f.write(png_data)
+        print(f"Image {i + 1} saved to: {temp_image_path}")
+
+        image_key = f"images/{video_id}_image_{i}.png"
+        if source != "checkpoint":
+            with trace.span("image_upload", clip=i):
+                s3_io.put_bytes(s3_bucket, image_key, png_data, 'image/png')
             print(f"Clip image uploaded to: {image_key}")
+            if checkpoint is not None:
+                try:
+                    checkpoint.mark_clip_done(i, cache_keys[i], image_key)
+                except Exception as e:
+                    print(f"Failed to checkpoint clip {i + 1}: {str(e)}")
+
+        if image_cache and source == "generated":
+            try:
+                with trace.span("image_cache_put", clip=i):
+                    image_cache.put_png(cache_keys[i], png_data, s3_bucket)
+            except Exception as e:
+                print(f"Failed to cache image for clip {i + 1}: {str(e)}")
+
+        image_paths[i] = temp_image_path
+        is_last = i == clip_count - 1
+        with trace.span("caption_compositing", clip=i):
+            if render_engine == "ffmpeg":
+                return prepare_frame_clip(clip_data, image, is_last)
+            return create_image_clip(clip_data, temp_image_path, is_last)
+
+    render_engine = get_render_engine()
+    image_paths = {}
+    export_profile = export_profile or resolve_export_profile()
+    print(f"Export profile: {export_profile['name']}")
+    print(f"=== Rendering {clip_count} clips with pipelined generation, upload and captioning ===")
+    with trace.span("clip_pipeline"):
+        prepared_clips = run_pipeline(produce_images, prepare_clip)
+
+    if audio_download is not None:
+        print("=== Waiting for audio download ===")
+        with trace.span("audio_wait"):
+            audio_download.result()
+    print(f"Audio downloaded: {os.path.getsize(audio_path)} bytes")
+
+    # A small, fast preview of the same images is encoded next to the final video, so the final encode
+    # does not wait for it
+    preview_thread = None
+    if on_preview is not None:
+        preview_thread = threading.Thread(
+            target=publish_job_preview,
+            args=(dict(prepared_clips), dict(image_paths), image_clips_data, audio_path, target_duration, video_id,
+                  trace, on_preview),
+            name=f"preview-{video_id}",
+            daemon=True
+        )
+        preview_thread.start()
+
+    try:
+        if render_engine == "ffmpeg":
+            try:
+                with trace.span("encode"):
+                    # Encoded segments are checkpointed only when no clip fell back to its placeholder
+                    segment_store = None
+                    if checkpoint is not None and all(
+                        i in prepared_clips and not isinstance(prepared_clips[i], Exception) for i in range(clip_count)
+                    ):
+                        segment_store = checkpoint.start_encode(
+                            encode_fingerprint(cache_keys, export_profile, target_duration)
+                        )
+                    export_with_frame_renderer(
+                        prepared_clips, image_clips_data, audio_path, target_duration, output_path, export_profile,
+                        trace=trace, segment_store=segment_store
+                    )
+                return
+            except Exception as e:
+                print(f"Frame renderer failed, falling back to MoviePy: {str(e)}")
+                prepared_clips = {
+                    i: create_image_clip(image_clips_data[i], image_paths[i], i == clip_count - 1)
+                    for i in image_paths
+                }
+
+        audio_clip = AudioFileClip(audio_path)
+        print(f"Audio duration: {audio_clip.duration} seconds")
+        with trace.span("encode"):
+            export_with_moviepy(prepared_clips, image_clips_data, audio_clip, target_duration, output_path, export_profile)
+    finally:
+        if preview_thread is not None:
+            preview_thread.join()
+
+
+def get_render_engine():
+    render_engine = os.getenv("RENDER_ENGINE", "ffmpeg")
+    if render_engine not in ("ffmpeg", "moviepy"):
+        print(f"Unknown render engine {render_engine}, using MoviePy")
+        return "moviepy"
+    return render_engine
+
+
+def export_with_frame_renderer(prepared_clips, image_clips_data, audio_path, target_duration, output_path, export_profile,
+                               trace=None, segment_store=None):
+    # Assemble the clips in order, any clip whose stage failed gets the fallback clip
+    frame_clips = []
+    for i, clip_data in enumerate(image_clips_data):
+        frame_clip = prepared_clips.get(i)
+        if frame_clip is None or isinstance(frame_clip, Exception):
+            print(f"Error generating image for clip {i + 1}: {str(frame_clip or 'No image was generated')}")
+            frame_clip = prepare_fallback_frame_clip(clip_data)
+            print(f"Using fallback clip for segment {i + 1}")
+        frame_clips.append(frame_clip)
 
-            is_last = i == clip_count - 1
-            # Create video clip from static image with exact timing from voiceover
-            clip_duration = clip_data['duration'] if is_last != True else clip_data['duration'] + 2
-            video_clip = ImageClip(temp_image_path, duration=clip_duration)
+    segment_workers = get_segment_workers()
+    if segment_workers > 1 and len(frame_clips) > 1:
+        print(f"=== Exporting final video in segments ({len(frame_clips)} clips, {segment_workers} processes) ===")
+        renderer = FfmpegFrameRenderer(fps=export_profile["fps"], video_args=ffmpeg_video_args(export_profile, audio=False))
+        exporter = SegmentedExporter(renderer, audio_args=ffmpeg_audio_args(export_profile), workers=segment_workers)
+        try:
+            segments = exporter.export(frame_clips, target_duration, output_path, audio_path, segment_store=segment_store)
+            if trace is not None:
+                for index, segment in enumerate(segments):
+                    if not segment["restored"]:
+                        trace.record("segment_encode", segment["seconds"], clip=index)
+            print("Final video exported successfully")
+            return
+        except Exception as e:
+            print(f"Segmented export failed, rendering in a single pass: {str(e)}")
 
-            # Apply subtle zoom effect for more dynamic feel
-            zoom_factor = 1.05
-            video_clip = video_clip.resized(lambda t: 1 + (zoom_factor - 1) * t / clip_duration)
+    print(f"=== Exporting final video with the frame renderer ({len(frame_clips)} clips) ===")
+    renderer = FfmpegFrameRenderer(fps=export_profile["fps"], video_args=ffmpeg_video_args(export_profile))
+    renderer.render(frame_clips, target_duration, output_path, audio_path)
+    print("Final video exported successfully")
 
-            # Set the start time for this clip to match voiceover timing
-            video_clip = video_clip.with_start(clip_data['start_time'])
 
-            print(
-                f"Created video clip from image {i + 1} with timing {clip_data['start_time']:.2f}-{clip_data['end_time']:.2f}")
+def publish_job_preview(prepared_clips, image_paths, image_clips_data, audio_path, target_duration, video_id, trace,
+                        on_preview):
+    # Runs on its own thread, a failed preview never fails the job
+    preview_path = f"/tmp/{video_id}_preview.mp4"
+    try:
+        print("=== Rendering preview video ===")
+        with trace.span("preview_encode"):
+            render_job_preview(prepared_clips, image_paths, image_clips_data, audio_path, target_duration, preview_path)
+        print(f"Preview rendered: {os.path.getsize(preview_path)} bytes")
+        on_preview(preview_path)
+    except Exception as e:
+        print(f"Preview render failed, the final video is not affected: {str(e)}")
 
-            # Create synchronized captions using absolute timing
-            print(f"Creating synchronized captions for clip {i + 1}")
-            text_clips = create_captions(clip_data)
-            print(f"Created {len(text_clips)} caption segments for clip {i + 1}")
 
-            # Composite video with synchronized text
-            if text_clips:
-                video_clip = CompositeVideoClip([video_clip] + text_clips)
+def render_job_preview(prepared_clips, image_paths, image_clips_data, audio_path, target_duration, preview_path):
+    # The frame clips of the final export, MoviePy clips are rebuilt from their saved PNGs
+    from PIL import Image
 
-            generated_clips.append(video_clip)
-            print(f"Clip {i + 1} processed successfully")
+    frame_clips = []
+    for i, clip_data in enumerate(image_clips_data):
+        frame_clip = prepared_clips.get(i)
+        if not isinstance(frame_clip, FrameClip):
+            if i in image_paths:
+                with Image.open(image_paths[i]) as image:
+                    frame_clip = prepare_frame_clip(clip_data, image, i == len(image_clips_data) - 1)
+            else:
+                frame_clip = prepare_fallback_frame_clip(clip_data)
+        frame_clips.append(frame_clip)
+    render_preview(frame_clips, target_duration, preview_path, audio_path)
 
-        except Exception as e:
-            print(f"Error generating image for clip {i + 1}: {str(e)}")
-            # Create a fallback clip (solid color with text) with proper timing
-            fallback_clip = (
-                ColorClip(
-                    size=(1080, 1080),
-                    color=(50, 50, 50),
-                    duration=clip_data['duration']
-                )
-                .with_start(clip_data['start_time'])
-                .with_effects([
-                    TextClip(
-                        text=clip_data['text'],
-                        font_size=24,
-                        color='white'
-                    ).with_position("center")
-                ])
-            )
-            generated_clips.append(fallback_clip)
+
+def export_with_moviepy(prepared_clips, image_clips_data, audio_clip, target_duration, output_path, export_profile):
+    # Assemble the clips in order, any clip whose stage failed gets the fallback clip
+    generated_clips = []
+    for i, clip_data in enumerate(image_clips_data):
+        video_clip = prepared_clips.get(i)
+        if video_clip is None:
+            video_clip = RuntimeError("No image was generated")
+        if isinstance(video_clip, Exception):
+            print(f"Error generating image for clip {i + 1}: {str(video_clip)}")
+            generated_clips.append(create_fallback_clip(clip_data))
             print(f"Using fallback clip for segment {i + 1}")
+        else:
+            generated_clips.append(video_clip)
+            print(f"Clip {i + 1} processed successfully")
 
     print(f"Generated all {len(generated_clips)} video clips")
 
@@ -168,14 +413,7 @@ def generate_video_from_images(transcript_data, audio_path, output_path, s3_buck
 
     # Export final video
     print("=== Exporting final video ===")
-    final_video.write_videofile(
-        output_path,
-        codec="libx264",
-        audio_codec="aac",
-        fps=fps,
-        preset='medium',
-        bitrate='2000k'
-    )
+    final_video.write_videofile(output_path, **moviepy_write_kwargs(export_profile))
     print("Final video exported successfully")
 
 
@@ -193,44 +431,91 @@ def process_video_job(job_data):
     print(f"Audio Key: {audio_key}")
     print(f"Video ID: {video_id}")
 
+    trace = JobTrace(video_id)
+    if job_gpu_peak_tracked():
+        reset_cuda_peak_memory()
+    result = None
     try:
-        print("=== Downloading transcript from S3 ===")
-        transcript_response = s3_client.get_object(Bucket=s3_bucket, Key=transcript_key)
-        transcript_data = json.loads(transcript_response['Body'].read())
-        print(f"Transcript downloaded with {transcript_data.get('clip_count', 'unknown')} clips")
-
-        print("=== Downloading audio from S3 ===")
+        export_profile = resolve_export_profile(job_data.get("export_profile"))
+        quality_tier = resolve_quality_tier(job_data.get("quality_tier"))
+        # Clips and segments finished by an earlier run of this job are picked up from its checkpoint
+        checkpoint = JobCheckpoint(s3_io, s3_bucket, video_id).load() if checkpoints_enabled() else None
+        # The audio is only needed for the export, fetch it while the model warms up and images render
+        print("=== Downloading audio from S3 in the background ===")
         audio_local_path = f"/tmp/{video_id}_audio.mp3"
-        s3_client.download_file(s3_bucket, audio_key, audio_local_path)
-        audio_size = os.path.getsize(audio_local_path)
-        print(f"Audio downloaded: {audio_size} bytes")
+        audio_download = s3_io.download_file_async(s3_bucket, audio_key, audio_local_path)
+        if not model_registry.is_loaded():
+            model_registry.warm_up()
+
+        # The preview uploads in the background while the final video renders
+        delivery = DeliveryMetadata(s3_io, s3_bucket, video_id)
+        preview = job_data.get("preview")
+        preview = preview_enabled() if preview is None else preview
+        preview_uploads = []
+
+        def publish_preview(preview_path):
+            preview_uploads.append(s3_io.submit(upload_preview, preview_path, s3_bucket, video_id, delivery, trace))
+
+        print("=== Reading transcript from S3 ===")
+        with trace.span("transcript_read"):
+            transcript_data = s3_io.read_transcript(s3_bucket, transcript_key)
+        print(f"Transcript downloaded with {transcript_data.get('clip_count', 'unknown')} clips")
 
         # Generate video using image-based approach with synchronized timing
         print("=== Starting synchronized image-based video generation ===")
         output_video_path = f"/tmp/{video_id}_final.mp4"
-        generate_video_from_images(transcript_data, audio_local_path, output_video_path, s3_bucket, video_id)
+        generate_video_from_images(
+            transcript_data,
+            audio_local_path,
+            output_video_path,
+            s3_bucket,
+            video_id,
+            audio_download=audio_download,
+            trace=trace,
+            export_profile=export_profile,
+            checkpoint=checkpoint,
+            seed=job_data.get("seed"),
+            quality_tier=quality_tier,
+            on_preview=publish_preview if preview else None
+        )
 
         video_size = os.path.getsize(output_video_path)
         print(f"Video generated: {video_size} bytes")
 
         print("=== Uploading final video to S3 ===")
         video_key = f"videos/{video_id}.mp4"
-        s3_client.upload_file(
-            output_video_path,
-            s3_bucket,
-            video_key,
-            ExtraArgs={'ContentType': 'video/mp4'}
-        )
+        with trace.span("video_upload"):
+            s3_io.upload_file(output_video_path, s3_bucket, video_key, 'video/mp4')
         print(f"Video uploaded to: {video_key}")
+        if checkpoint is not None:
+            try:
+                checkpoint.finish()
+            except Exception as e:
+                print(f"Failed to remove the job checkpoint: {str(e)}")
+        uploaded_preview_key = None
+        for upload in preview_uploads:
+            try:
+                uploaded_preview_key = upload.result()
+            except Exception as e:
+                print(f"Preview upload failed: {str(e)}")
+        # Recorded for every job, the preview stage is only there when a preview went out first
+        try:
+            delivery.mark("final", video_key)
+        except Exception as e:
+            print(f"Failed to update delivery metadata: {str(e)}")
+        job_scheduler.set_progress(video_id, stage="final", video_key=video_key)
         print(f"=== VIDEO GENERATION COMPLETED SUCCESSFULLY ===")
 
-        return {
+        result = {
             "success": True,
             "video_id": video_id,
             "video_key": video_key,
             "duration": transcript_data['duration'],
-            "clip_count": transcript_data['clip_count']
+            "clip_count": transcript_data['clip_count'],
+            "quality_tier": quality_tier["name"],
+            "preview_key": uploaded_preview_key
         }
+        return result
 
     except Exception as e:
         error_msg = f"Error during video generation: {str(e)}"
@@ -246,23 +531,88 @@ def process_video_job(job_data):
             }
 
             error_key = f"errors/{video_id}_error.json"
-            s3_client.put_object(
-                Bucket=s3_bucket,
-                Key=error_key,
-                Body=json.dumps(error_metadata, indent=2),
-                ContentType='application/json'
-            )
+            s3_io.put_json(s3_bucket, error_key, error_metadata)
             print(f"Error metadata uploaded: {error_key}")
         except Exception as meta_error:
             print(f"Failed to upload error metadata: {str(meta_error)}")
 
-        return {
+        result = {
             "success": False,
             "video_id": video_id,
             "error": str(e)
         }
+        return result
+
     finally:
-        stop_pod()
+        record_job_timings(trace, s3_bucket, video_id, "done" if result and result["success"] else "failed")
+
+
+def upload_preview(preview_path, s3_bucket, video_id, delivery, trace):
+    """Publish the preview under previews/ and mark it in the metadata, returns its key"""
+    key = preview_key(video_id)
+    with trace.span("preview_upload"):
+        s3_io.upload_file(preview_path, s3_bucket, key, 'video/mp4')
+    print(f"Preview uploaded to: {key}")
+    delivery.mark("preview", key)
+    job_scheduler.set_progress(video_id, stage="preview", preview_key=key)
+    return key
+
+
+def job_gpu_peak_tracked():
+    """
+    torch keeps one peak memory counter per process, so a job's own peak is only known while it has the
+    GPU to itself. With more than one slot the peak is left to the worker-level /metrics gauge.
+    """
+    return job_scheduler.worker_count == 1
+
+
+def record_job_timings(trace, s3_bucket, video_id, status):
+    """Feed the job's spans into /metrics and write its timing summary next to the video"""
+    trace.gpu_memory_peak_bytes = cuda_peak_memory() if job_gpu_peak_tracked() else None
+    worker_metrics.observe_job(trace, status)
+    summary = trace.summary()
+    summary["status"] = status
+    print(f"Job {video_id} took {summary['total_seconds']:.1f}s: " + ", ".join(
+        f"{stage} {entry['total_seconds']:.1f}s" for stage, entry in summary["stages"].items()
+    ))
+    try:
+        s3_io.put_json(s3_bucket, f"videos/{video_id}_timings.json", summary)
+    except Exception as e:
+        print(f"Failed to upload job timings: {str(e)}")
+
+
+def run_job(job_data):
+    """Scheduler entry point, jobs claimed from a manifest are moved to done/ or failed/ afterwards"""
+    result = None
+    try:
+        result = process_video_job(job_data)
+        return result
+    finally:
+        if job_data.get("claimed_by") and job_manifests is not None:
+            try:
+                job_manifests.complete(job_data["video_id"], job_data, result)
+            except Exception as e:
+                print(f"Failed to complete job manifest {job_data['video_id']}: {str(e)}")
+
+
+def drain_job_manifests():
+    """Claim pending job manifests while the queue has room, returns the claimed video ids"""
+    if job_manifests is None:
+        return []
+    try:
+        return job_manifests.drain(
+            lambda manifest: job_scheduler.submit(manifest["video_id"], manifest),
+            job_scheduler.free_capacity
+        )
+    except Exception as e:
+        print(f"Failed to drain job manifests: {str(e)}")
+        return []
+
+
+def poll_job_manifests(interval_seconds):
+    while True:
+        time.sleep(interval_seconds)
+        drain_job_manifests()
 
 
 def stop_pod():
@@ -282,31 +632,89 @@ def stop_pod():
         print(f"Error stopping RunPod instance: {str(e)}")
 
 
+# Stage timings of finished jobs, served on /metrics
+worker_metrics = WorkerMetrics()
+
+# Shared FLUX pipeline, loaded once per process
+model_registry = create_model_registry()
+
+# Content-addressed clip image cache, created once the S3 client exists
+image_cache = None
+
+# S3 job manifest queue, created once the S3 client exists when JOB_MANIFEST_BUCKET is set
+job_manifests = None
+
+# Jobs run one at a time per GPU slot
+job_scheduler = JobScheduler(
+    run_job,
+    max_queue_size=int(os.getenv("JOB_QUEUE_SIZE", "8")),
+    worker_count=int(os.getenv("GPU_WORKER_SLOTS", "1"))
+)
+
+# The pod is stopped after a quiet period without queued or running jobs, manifests written
+# meanwhile are claimed first and cancel the stop
+idle_shutdown = IdleShutdownController(
+    stop_pod,
+    is_busy=lambda: not job_scheduler.is_idle(),
+    before_stop=lambda: bool(drain_job_manifests())
+)
+
 # Flask app setup
 app = Flask(__name__)
 
 
 @app.route('/process', methods=['POST'])
 def process_video_async():
-    """Endpoint to start video processing asynchronously"""
+    """Endpoint to queue video processing asynchronously"""
     try:
         job_data = request.json
         job_id = job_data["video_id"]
 
         print(f"Received video processing request for job: {job_id}")
 
-        # Start video processing in a separate thread
-        thread = threading.Thread(target=process_video_job, args=(job_data,))
-        thread.daemon = True  # Dies when main thread dies
-        thread.start()
+        try:
+            resolve_export_profile(job_data.get("export_profile"))
+            resolve_quality_tier(job_data.get("quality_tier"))
+            if job_data.get("seed") is not None and not isinstance(job_data["seed"], int):
+                raise ValueError(f"seed must be an integer, got {job_data['seed']!r}")
+            if job_data.get("preview") is not None and not isinstance(job_data["preview"], bool):
+                raise ValueError(f"preview must be true or false, got {job_data['preview']!r}")
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "job_id": job_id,
+                "status": "rejected"
+            }), 400
 
-        print(f"Started background processing for job: {job_id}")
+        try:
+            job_status = job_scheduler.submit(job_id, job_data)
+        except QueueFullError as e:
+            print(f"Rejected job {job_id}: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "job_id": job_id,
+                "status": "rejected"
+            }), 429, {"Retry-After": "60"}
+
+        idle_shutdown.touch()
+        if job_status["duplicate"]:
+            # The job keeps its place or keeps rendering, the resubmitted payload is ignored
+            print(f"Job {job_id} is already {job_status['status']}")
+            message = f"Video generation job already {job_status['status']}"
+        else:
+            print(f"Queued job {job_id} at position {job_status['queue_position']}")
+            message = "Video generation job queued"
 
         return jsonify({
             "success": True,
-            "message": "Video generation process started",
+            "message": message,
             "job_id": job_id,
-            "status": "processing"
+            "status": job_status["status"],
+            "queue_position": job_status["queue_position"],
+            "duplicate": job_status["duplicate"],
+            "status_url": f"/jobs/{job_id}"
         }), 202  # HTTP 202 Accepted
 
     except Exception as e:
@@ -317,24 +725,81 @@ def process_video_async():
         }), 500
 
 
+@app.route('/jobs/<video_id>', methods=['GET'])
+def job_status(video_id):
+    """Status polling endpoint for queued, running and finished jobs"""
+    status = job_scheduler.get_status(video_id)
+    if status is None:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown job: {video_id}"
+        }), 404
+    return jsonify(status)
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
+    model_status = model_registry.status()
     return jsonify({
         "status": "healthy",
         "service": "synchronized-video-generator",
-        "model": "FLUX.1-dev"
+        "model": "FLUX.1-dev",
+        "model_loaded": model_status["loaded"],
+        "execution_mode": model_status["execution_mode"],
+        "model_status": model_status,
+        "jobs": job_scheduler.stats(),
+        "idle_shutdown": idle_shutdown.status(),
+        "image_cache": image_cache.stats() if image_cache else None,
+        "caption_cache": caption_sprite_cache.stats()
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of job stages, the queue and the GPU"""
+    model_status = model_registry.status()
+    jobs = job_scheduler.stats()
+    idle_status = idle_shutdown.status()
+    gauges = {
+        "video_worker_jobs_queued": ("Jobs waiting for a GPU worker slot", jobs["queued"]),
+        "video_worker_jobs_running": ("Jobs currently rendering", jobs["running"]),
+        "video_worker_model_loaded": ("1 once the FLUX pipeline is loaded", 1 if model_status["loaded"] else 0),
+        "video_worker_model_load_seconds": ("Time the FLUX pipeline took to load", model_status["load_seconds"]),
+        "video_worker_gpu_memory_allocated_peak_bytes": (
+            "GPU memory peak since the current job started" if job_gpu_peak_tracked()
+            else "GPU memory peak since the worker started", cuda_peak_memory()
+        ),
+        "video_worker_idle_seconds_until_stop": (
+            "Seconds left before the idle pod is stopped", idle_status["seconds_until_stop"]
+        ),
+    }
+    return Response(worker_metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     print("Starting synchronized video generator service...")
     print("=== Initializing S3 client ===")
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_REGION')
-    )
+    s3_client = create_s3_client()
+    s3_io = S3IO(s3_client)
     print("S3 client initialized")
+    image_cache = create_image_cache(s3_client)
+    print(f"Image cache ready with {len(image_cache.disk_cache)} cached images")
+    print("=== Warming up FLUX pipeline ===")
+    model_registry.warm_up()
+    job_scheduler.start()
+    manifest_bucket = os.getenv("JOB_MANIFEST_BUCKET")
+    if manifest_bucket:
+        job_manifests = JobManifestQueue(s3_client, manifest_bucket)
+        # Claims of queued and running jobs stay fresh, so long jobs are not taken over after the TTL
+        job_manifests.start_heartbeat()
+        print("=== Draining pending job manifests ===")
+        drain_job_manifests()
+        threading.Thread(
+            target=poll_job_manifests,
+            args=(float(os.getenv("JOB_MANIFEST_POLL_SECONDS", "30")),),
+            name="job-manifest-poller",
+            daemon=True
+        ).start()
+    idle_shutdown.start()
     app.run(host='0.0.0.0', port=8000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from transcript_format import load_transcript
+
+MB = 1024 ** 2
+
+
+def create_s3_client(max_pool_connections=None):
+    """boto3 S3 client with an explicit connection pool shared by every transfer thread"""
+    import boto3
+    from botocore.config import Config
+
+    if max_pool_connections is None:
+        max_pool_connections = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION'),
+        endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": 5, "mode": "adaptive"}
+        )
+    )
+
+
+def create_transfer_config():
+    """Multipart settings tuned for MP4 uploads of tens to hundreds of MB"""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16")) * MB,
+        multipart_chunksize=int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "16")) * MB,
+        max_concurrency=int(os.getenv("S3_MAX_CONCURRENCY", "10")),
+        use_threads=True
+    )
+
+
+class S3IO:
+    """S3 reads and writes for the video worker on top of one shared client"""
+
+    def __init__(self, client, transfer_config=None, background_workers=4):
+        self.client = client
+        self.transfer_config = transfer_config or create_transfer_config()
+        self._executor = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="s3-io")
+
+    def open_stream(self, bucket, key):
+        """File-like streaming body of an object, nothing is buffered up front"""
+        return self.client.get_object(Bucket=bucket, Key=key)['Body']
+
+    def read_json(self, bucket, key):
+        body = self.open_stream(bucket, key)
+        try:
+            return json.load(body)
+        finally:
+            body.close()
+
+    def get_bytes(self, bucket, key):
+        body = self.open_stream(bucket, key)
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def read_transcript(self, bucket, key):
+        """Transcript in the compact gzip format or the plain JSON of older jobs, inflated from the streaming body"""
+        body = self.open_stream(bucket, key)
+        try:
+            return load_transcript(body)
+        finally:
+            body.close()
+
+    def download_file(self, bucket, key, path):
+        self.client.download_file(bucket, key, path, Config=self.transfer_config)
+        return path
+
+    def download_file_async(self, bucket, key, path):
+        """Start a download in the background and return its Future"""
+        return self._executor.submit(self.download_file, bucket, key, path)
+
+    def upload_file(self, path, bucket, key, content_type):
+        self.client.upload_file(
+            path,
+            bucket,
+            key,
+            ExtraArgs={'ContentType': content_type},
+            Config=self.transfer_config
+        )
+
+    def submit(self, fn, *args):
+        """Run fn on the background pool and return its Future, for uploads the job does not wait on"""
+        return self._executor.submit(fn, *args)
+
+    def put_bytes(self, bucket, key, data, content_type):
+        self.client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+
+    def put_json(self, bucket, key, data):
+        self.put_bytes(bucket, key, json.dumps(data, indent=2), 'application/json')
+
+    def delete(self, bucket, key):
+        self.client.delete_object(Bucket=bucket, Key=key)
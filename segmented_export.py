@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def get_segment_workers():
+    """EXPORT_SEGMENT_WORKERS above 1 turns on the segmented export, "auto" uses every core"""
+    value = os.getenv("EXPORT_SEGMENT_WORKERS", "0")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value)
+
+
+def segment_boundaries(clips, frame_count, fps):
+    """Frame ranges [start, end) of the timeline, cut where each clip starts"""
+    cuts = {0, frame_count}
+    for clip in clips:
+        cut = int(round(clip.start * fps))
+        if 0 < cut < frame_count:
+            cuts.add(cut)
+    cuts = sorted(cuts)
+    return list(zip(cuts, cuts[1:]))
+
+
+def segment_clips(clips, start_frame, end_frame, fps):
+    """Clips a segment draws from, on screen or with a caption on screen during its frames, in layer order"""
+    start, end = start_frame / fps, end_frame / fps
+
+    def overlaps(item):
+        return item.start < end and item.end > start
+
+    return [clip for clip in clips if overlaps(clip) or any(overlaps(caption) for caption in clip.captions)]
+
+
+def _encode_segment(renderer, clips, start_frame, end_frame, output_path):
+    # Runs in a pool process, the renderer and clips arrive pickled
+    started = time.perf_counter()
+    renderer.render_range(clips, start_frame, end_frame, output_path)
+    return time.perf_counter() - started
+
+
+def _concat_entry(path):
+    # The concat demuxer reads single-quoted paths, a quote inside one is closed, escaped and reopened
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+
+class SegmentedExporter:
+    """
+    Splits the timeline at clip boundaries, composites and encodes every segment in a process pool, then
+    joins the segments with ffmpeg's concat demuxer without re-encoding and muxes the audio once.
+    Every frame is still composited at its global timestamp, so the timing matches the single-pass render.
+    """
+
+    def __init__(self, renderer, audio_args=None, workers=None, start_method=None):
+        self.renderer = renderer
+        self.audio_args = audio_args or ["-c:a", "aac"]
+        self.workers = workers or get_segment_workers() or 1
+        # spawn keeps the pool clear of the worker's CUDA context and threads
+        self.start_method = start_method or os.getenv("EXPORT_SEGMENT_START_METHOD", "spawn")
+
+    def build_concat_command(self, list_path, output_path, audio_path, duration):
+        command = [
+            self.renderer.ffmpeg_binary, "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v", "-map", "1:a"] + self.audio_args
+        command += ["-c:v", "copy", "-t", f"{duration:.3f}", output_path]
+        return command
+
+    def export(self, clips, duration, output_path, audio_path=None, segment_store=None):
+        """
+        Writes the video and returns the segments as {start_frame, end_frame, seconds, restored} dicts.
+        segment_store (fetch_segment/store_segment, a JobCheckpoint) keeps finished segments across restarts.
+        """
+        fps = self.renderer.fps
+        segments = [
+            {"start_frame": start_frame, "end_frame": end_frame, "seconds": 0.0, "restored": False}
+            for start_frame, end_frame in segment_boundaries(clips, self.renderer.frame_count(duration), fps)
+        ]
+        if not segments:
+            raise ValueError("Nothing to export, the video has no frames")
+
+        with tempfile.TemporaryDirectory(prefix="segments_") as work_dir:
+            segment_paths = [os.path.join(work_dir, f"segment_{index:04d}.mp4") for index in range(len(segments))]
+            if segment_store is not None:
+                for segment, segment_path in zip(segments, segment_paths):
+                    segment["restored"] = segment_store.fetch_segment(segment, segment_path)
+            pending = [index for index, segment in enumerate(segments) if not segment["restored"]]
+            if len(pending) < len(segments):
+                print(f"Reusing {len(segments) - len(pending)} encoded segments")
+
+            if pending:
+                workers = min(self.workers, len(pending))
+                print(f"Encoding {len(pending)} segments on {workers} processes")
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(self.start_method)) as pool:
+                    futures = {
+                        index: pool.submit(
+                            _encode_segment,
+                            self.renderer,
+                            segment_clips(clips, segments[index]["start_frame"], segments[index]["end_frame"], fps),
+                            segments[index]["start_frame"],
+                            segments[index]["end_frame"],
+                            segment_paths[index]
+                        )
+                        for index in pending
+                    }
+                    for index, future in futures.items():
+                        segments[index]["seconds"] = round(future.result(), 4)
+                        if segment_store is not None:
+                            try:
+                                segment_store.store_segment(segments[index], segment_paths[index])
+                            except Exception as e:
+                                print(f"Failed to checkpoint segment {index + 1}: {str(e)}")
+
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, "w") as f:
+                f.writelines(_concat_entry(path) for path in segment_paths)
+            command = self.build_concat_command(list_path, output_path, audio_path, duration)
+            print(f"Joining segments: {' '.join(command)}")
+            completed = subprocess.run(command, capture_output=True)
+            if completed.returncode != 0:
+                stderr = completed.stderr.decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"ffmpeg concat exited with code {completed.returncode}: {stderr}")
+        return segments
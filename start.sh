@@ -101,7 +101,7 @@ start_jupyter
 export_env_vars
 
 pip install --upgrade --force-reinstall --ignore-installed blinker
-pip install moviepy boto3 diffusers flask requests transformers accelerate ftfy regex sentencepiece safetensors protobuf
+pip install moviepy boto3 diffusers flask requests transformers accelerate ftfy regex sentencepiece safetensors protobuf bitsandbytes
 
 huggingface_login
 
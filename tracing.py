@@ -0,0 +1,201 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the stage and job duration histograms
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def reset_cuda_peak_memory():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+    except Exception:
+        pass
+
+
+def cuda_peak_memory():
+    """Peak allocated device memory in bytes since the last reset, or None without CUDA"""
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return None
+        return torch.cuda.max_memory_allocated()
+    except Exception:
+        return None
+
+
+class JobTrace:
+    """Timed spans of one job. Spans can be recorded from any thread, clip spans carry the clip index."""
+
+    def __init__(self, job_id, clock=time.perf_counter):
+        self.job_id = job_id
+        self.clock = clock
+        self.started_at = time.time()
+        self._origin = clock()
+        self._lock = threading.Lock()
+        self.spans = []
+        self.gpu_memory_peak_bytes = None
+        # Job settings the metrics are broken down by, such as the quality tier
+        self.labels = {}
+
+    @contextmanager
+    def span(self, stage, clip=None):
+        started = self.clock()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(stage, self.clock() - started, clip=clip, offset=started - self._origin, error=error)
+
+    def record(self, stage, seconds, clip=None, offset=None, error=None):
+        span = {
+            "stage": stage,
+            "clip": clip,
+            "offset": round(offset if offset is not None else self.clock() - self._origin - seconds, 4),
+            "seconds": round(seconds, 4),
+        }
+        if error:
+            span["error"] = error
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def summary(self):
+        """Per-stage totals and per-clip timings, the JSON written next to the video"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["offset"])
+        stages = {}
+        clips = {}
+        for span in spans:
+            entry = stages.setdefault(span["stage"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["total_seconds"] = round(entry["total_seconds"] + span["seconds"], 4)
+            entry["max_seconds"] = max(entry["max_seconds"], span["seconds"])
+            if span["clip"] is not None:
+                clip_entry = clips.setdefault(str(span["clip"]), {})
+                clip_entry[span["stage"]] = round(clip_entry.get(span["stage"], 0.0) + span["seconds"], 4)
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "total_seconds": round(self.clock() - self._origin, 4),
+            "gpu_memory_peak_bytes": self.gpu_memory_peak_bytes,
+            "labels": dict(self.labels),
+            "stages": stages,
+            "clips": clips,
+            "spans": spans,
+        }
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+class WorkerMetrics:
+    """Process-wide counters fed from finished job traces, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_seconds = {}
+        self._job_seconds = _Histogram()
+        self._tier_job_seconds = {}
+        self._tier_diffusion_seconds = {}
+        self._jobs_total = {}
+        self._gpu_memory_peak_bytes = None
+        self._last_job_gpu_memory_peak_bytes = None
+
+    def observe_job(self, trace, status):
+        summary = trace.summary()
+        with self._lock:
+            for span in summary["spans"]:
+                self._stage_seconds.setdefault(span["stage"], _Histogram()).observe(span["seconds"])
+            self._job_seconds.observe(summary["total_seconds"])
+            tier = summary["labels"].get("quality_tier")
+            if tier:
+                diffusion = summary["stages"].get("diffusion_batch", {}).get("total_seconds", 0.0)
+                self._tier_job_seconds.setdefault(tier, _Histogram()).observe(summary["total_seconds"])
+                self._tier_diffusion_seconds.setdefault(tier, _Histogram()).observe(diffusion)
+            self._jobs_total[status] = self._jobs_total.get(status, 0) + 1
+            peak = summary["gpu_memory_peak_bytes"]
+            if peak is not None:
+                self._last_job_gpu_memory_peak_bytes = peak
+                self._gpu_memory_peak_bytes = max(peak, self._gpu_memory_peak_bytes or 0)
+
+    def _histogram_lines(self, name, histogram, labels):
+        lines = []
+        for bound, bucket_count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {bucket_count}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(**labels) if labels else ''} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(**labels) if labels else ''} {histogram.count}")
+        return lines
+
+    def render(self, gauges=None):
+        """Metrics page; gauges is {name: (help, value)} for values read at scrape time"""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP video_worker_stage_seconds Duration of each traced job stage",
+                "# TYPE video_worker_stage_seconds histogram",
+            ]
+            for stage, histogram in sorted(self._stage_seconds.items()):
+                lines += self._histogram_lines("video_worker_stage_seconds", histogram, {"stage": stage})
+
+            lines += [
+                "# HELP video_worker_job_seconds End to end duration of video jobs",
+                "# TYPE video_worker_job_seconds histogram",
+            ]
+            lines += self._histogram_lines("video_worker_job_seconds", self._job_seconds, {})
+
+            lines += [
+                "# HELP video_worker_quality_tier_job_seconds End to end duration of video jobs by quality tier",
+                "# TYPE video_worker_quality_tier_job_seconds histogram",
+            ]
+            for tier, histogram in sorted(self._tier_job_seconds.items()):
+                lines += self._histogram_lines("video_worker_quality_tier_job_seconds", histogram, {"tier": tier})
+
+            lines += [
+                "# HELP video_worker_quality_tier_diffusion_seconds FLUX time per job by quality tier",
+                "# TYPE video_worker_quality_tier_diffusion_seconds histogram",
+            ]
+            for tier, histogram in sorted(self._tier_diffusion_seconds.items()):
+                lines += self._histogram_lines("video_worker_quality_tier_diffusion_seconds", histogram, {"tier": tier})
+
+            lines += [
+                "# HELP video_worker_jobs_total Finished video jobs by status",
+                "# TYPE video_worker_jobs_total counter",
+            ]
+            for status, count in sorted(self._jobs_total.items()):
+                lines.append(f"video_worker_jobs_total{_labels(status=status)} {count}")
+
+            peaks = (
+                ("video_worker_gpu_memory_peak_bytes", "Highest GPU memory allocated by any job",
+                 self._gpu_memory_peak_bytes),
+                ("video_worker_last_job_gpu_memory_peak_bytes", "GPU memory peak of the last finished job",
+                 self._last_job_gpu_memory_peak_bytes),
+            )
+        gauge_values = [(name, help_text, value) for name, help_text, value in peaks if value is not None]
+        gauge_values += [(name, help_text, value) for name, (help_text, value) in (gauges or {}).items()]
+        for name, help_text, value in gauge_values:
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
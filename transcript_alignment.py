@@ -0,0 +1,122 @@
+import re
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_token(word):
+    """Lowercase and drop punctuation so "Door," from Deepseek matches "door" from ElevenLabs"""
+    return _NON_WORD.sub("", word.lower())
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 as soon as it is known to be larger"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _allowed_distance(token):
+    # "a", "is" or "the" are one edit away from too many other words to match them fuzzily
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 4 else 2
+
+
+def _find_token(token, words, cursor, lookahead):
+    """Index of the word matching token in words[cursor:cursor + lookahead], exact matches first"""
+    stop = min(len(words), cursor + lookahead)
+    for index in range(cursor, stop):
+        if words[index] == token:
+            return index
+    max_distance = _allowed_distance(token)
+    if max_distance == 0:
+        return None
+    for index in range(cursor, stop):
+        if bounded_edit_distance(token, words[index], max_distance) <= max_distance:
+            return index
+    return None
+
+
+def align_clip_ranges(clip_texts, word_timestamps, lookahead=4):
+    """
+    Walk every clip in order against the word stream with a single cursor.
+
+    Returns one (first_word, last_word) index pair per clip. Clip tokens that do not match within
+    lookahead words are skipped, so a punctuation, casing or spelling difference no longer loses the whole
+    clip. A clip with no matching word takes the words between the previous clip and the next one found,
+    shared by token count with its unmatched neighbours. When there are none its range is empty
+    (last_word == first_word - 1) and clip_span places it between the surrounding words.
+    """
+    words = [normalize_token(word_data['word']) for word_data in word_timestamps]
+    cursor = 0
+    ranges = []
+    anchors = []
+    token_counts = []
+    for clip_text in clip_texts:
+        tokens = [token for token in (normalize_token(word) for word in clip_text.split()) if token]
+        anchors.append(cursor)
+        token_counts.append(len(tokens))
+        first_index = None
+        last_index = None
+        for token in tokens:
+            index = _find_token(token, words, cursor, lookahead)
+            if index is None:
+                continue
+            if first_index is None:
+                first_index = index
+            last_index = index
+            cursor = index + 1
+
+        ranges.append((first_index, last_index) if first_index is not None else None)
+
+    # Unmatched clips are anchored at the cursor they started from and end at the next clip's first word
+    clip_index = 0
+    while clip_index < len(ranges):
+        if ranges[clip_index] is not None:
+            clip_index += 1
+            continue
+        gap_end = clip_index
+        while gap_end < len(ranges) and ranges[gap_end] is None:
+            gap_end += 1
+        first_word = anchors[clip_index]
+        stop_word = ranges[gap_end][0] if gap_end < len(ranges) else len(words)
+        weights = [max(1, token_counts[index]) for index in range(clip_index, gap_end)]
+        taken = 0
+        for index, weight in zip(range(clip_index, gap_end), weights):
+            taken += weight
+            next_first = anchors[clip_index] + round((stop_word - anchors[clip_index]) * taken / sum(weights))
+            ranges[index] = (first_word, next_first - 1)
+            first_word = next_first
+        clip_index = gap_end
+    return ranges
+
+
+def clip_span(word_range, word_timestamps):
+    """(start, end, clip_word_timestamps) of a word range, an empty range sits between its neighbours' words"""
+    first_index, last_index = word_range
+    if last_index >= first_index:
+        return (word_timestamps[first_index]['start'], word_timestamps[last_index]['end'],
+                word_timestamps[first_index:last_index + 1])
+    start = word_timestamps[first_index - 1]['end'] if first_index > 0 else 0.0
+    end = word_timestamps[first_index]['start'] if first_index < len(word_timestamps) else start
+    return start, end, []
+
+
+def align_clips(clip_texts, word_timestamps, lookahead=4):
+    """One (start, end, clip_word_timestamps) tuple per clip"""
+    return [clip_span(word_range, word_timestamps)
+            for word_range in align_clip_ranges(clip_texts, word_timestamps, lookahead)]
@@ -0,0 +1,200 @@
+import base64
+import gzip
+import io
+import json
+import sys
+from array import array
+from bisect import bisect_left
+
+from transcript_alignment import clip_span
+
+FORMAT_NAME = "compact-transcript"
+FORMAT_VERSION = 2
+GZIP_MAGIC = b"\x1f\x8b"
+CONTENT_TYPE = "application/gzip"
+
+# Clip fields the reader rebuilds from the word columns
+_DERIVED_CLIP_FIELDS = ("start_time", "end_time", "word_timestamps", "duration")
+
+
+def _pack_floats(values):
+    """Little-endian float64 column as base64, exact round trip unlike decimal text"""
+    column = array("d", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode("ascii")
+
+
+def _unpack_floats(encoded):
+    column = array("d")
+    column.frombytes(base64.b64decode(encoded))
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tolist()
+
+
+def _clip_word_range(clip_data, word_starts):
+    """(first, last) word index of a clip, from its word_range or by finding its first word start"""
+    if clip_data.get("word_range") is not None:
+        first, last = clip_data["word_range"]
+        return [first, last]
+    clip_words = clip_data.get("word_timestamps")
+    if not clip_words:
+        return None
+    first = bisect_left(word_starts, clip_words[0]["start"])
+    return [first, first + len(clip_words) - 1]
+
+
+def _encode_spans(spans):
+    return [[span["first_word"], span["last_word"]] for span in spans]
+
+
+def _decode_spans(spans, word_timestamps):
+    return [
+        {
+            "first_word": first,
+            "last_word": last,
+            "start": word_timestamps[first]["start"],
+            "end": word_timestamps[last]["end"],
+            "text": " ".join(word["word"] for word in word_timestamps[first:last + 1]),
+        }
+        for first, last in spans
+    ]
+
+
+def encode_transcript(transcript_data, compresslevel=6):
+    """
+    Versioned, gzip compressed transcript. Word and character times are stored once as float columns,
+    clips, sentences and phrases only keep the index range of their words.
+    """
+    word_timestamps = transcript_data.get("word_timestamps", [])
+    word_starts = [word["start"] for word in word_timestamps]
+
+    clips = []
+    for clip_data in transcript_data.get("image_clips_data", []):
+        clip = {key: value for key, value in clip_data.items() if key not in _DERIVED_CLIP_FIELDS}
+        clip["word_range"] = _clip_word_range(clip_data, word_starts)
+        clips.append(clip)
+
+    compact = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "script": transcript_data.get("script"),
+        "duration": transcript_data.get("duration"),
+        "word_count": transcript_data.get("word_count"),
+        "clip_count": transcript_data.get("clip_count"),
+        "words": {
+            "text": [word["word"] for word in word_timestamps],
+            "start": _pack_floats(word_starts),
+            "end": _pack_floats(word["end"] for word in word_timestamps),
+        },
+        "clips": clips,
+    }
+    if "sentences" in transcript_data:
+        compact["sentences"] = _encode_spans(transcript_data["sentences"])
+    if "phrases" in transcript_data:
+        compact["phrases"] = _encode_spans(transcript_data["phrases"])
+
+    alignment = transcript_data.get("full_alignment")
+    if alignment is not None:
+        characters = alignment["characters"]
+        single_chars = all(len(char) == 1 for char in characters)
+        compact["alignment"] = {
+            # One string instead of a list of one character strings whenever possible
+            "characters": "".join(characters) if single_chars else characters,
+            "start": _pack_floats(alignment["character_start_times_seconds"]),
+            "end": _pack_floats(alignment["character_end_times_seconds"]),
+        }
+
+    body = json.dumps(compact, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return gzip.compress(body, compresslevel=compresslevel)
+
+
+def _expand(compact):
+    """The transcript dict the worker has always consumed, rebuilt from the compact form"""
+    version = compact.get("version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported transcript version: {version}")
+
+    words = compact["words"]
+    word_timestamps = [
+        {"word": word, "start": start, "end": end}
+        for word, start, end in zip(words["text"], _unpack_floats(words["start"]), _unpack_floats(words["end"]))
+    ]
+
+    image_clips_data = []
+    for clip in compact["clips"]:
+        clip_data = dict(clip)
+        word_range = clip.get("word_range")
+        if word_range is None:
+            clip_data.update(start_time=None, end_time=None, word_timestamps=None, duration=0)
+        else:
+            # Clips the aligner could not match have an empty range and sit between their neighbours' words
+            start, end, clip_words = clip_span(word_range, word_timestamps)
+            clip_data.update(start_time=start, end_time=end, word_timestamps=clip_words, duration=end - start)
+        image_clips_data.append(clip_data)
+
+    transcript_data = {
+        "script": compact["script"],
+        "duration": compact["duration"],
+        "word_count": compact["word_count"],
+        "word_timestamps": word_timestamps,
+        "image_clips_data": image_clips_data,
+        "clip_count": compact["clip_count"],
+    }
+    if "sentences" in compact:
+        transcript_data["sentences"] = _decode_spans(compact["sentences"], word_timestamps)
+    if "phrases" in compact:
+        transcript_data["phrases"] = _decode_spans(compact["phrases"], word_timestamps)
+
+    alignment = compact.get("alignment")
+    if alignment is not None:
+        transcript_data["full_alignment"] = {
+            "characters": list(alignment["characters"]),
+            "character_start_times_seconds": _unpack_floats(alignment["start"]),
+            "character_end_times_seconds": _unpack_floats(alignment["end"]),
+        }
+    return transcript_data
+
+
+def _from_parsed(parsed):
+    if isinstance(parsed, dict) and parsed.get("format") == FORMAT_NAME:
+        return _expand(parsed)
+    return parsed
+
+
+def decode_transcript(data):
+    """
+    Read a transcript in any format the Lambda has written: the compact gzip form, or the plain indented
+    JSON of older jobs which is returned unchanged.
+    """
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return _from_parsed(json.loads(data))
+
+
+class _RawStream(io.RawIOBase):
+    """Any object with read(size), such as a botocore StreamingBody, as a raw stream io can buffer"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def load_transcript(stream):
+    """
+    decode_transcript for a file-like object such as an S3 streaming body. A compressed transcript is
+    inflated as its bytes arrive, so the compressed copy is never held in memory; json still parses the
+    inflated text in one piece.
+    """
+    buffered = io.BufferedReader(_RawStream(stream))
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return _from_parsed(json.load(gzip.GzipFile(fileobj=buffered)))
+    return _from_parsed(json.load(buffered))
@@ -0,0 +1,119 @@
+import numpy as np
+
+SENTENCE_END = (".", "!", "?")
+PHRASE_END = (",", ";", ":") + SENTENCE_END
+
+# Code points str.isspace() treats as whitespace
+WHITESPACE_CODE_POINTS = np.array(
+    [ord(char) for char in map(chr, range(0x3001)) if char.isspace()], dtype=np.uint32
+)
+
+
+def _code_points(characters, text):
+    """One uint32 code point per alignment character, decoded in C instead of a Python loop"""
+    if len(text) == len(characters):
+        return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    # Some entries are not a single character, fall back to their first code point
+    return np.array([ord(char[0]) if char else 0 for char in characters], dtype=np.uint32)
+
+
+def _word_indexes(characters, char_start_times, char_end_times):
+    """
+    Words of the alignment with the index of the character each one starts at and of the character
+    whose end time closes it, as lists of ints so the caller picks the times in whatever form it needs.
+    """
+    count = min(len(characters), len(char_start_times), len(char_end_times))
+    if count == 0:
+        return [], [], []
+
+    characters = characters[:count]
+    text = "".join(characters)
+    code_points = _code_points(characters, text)
+
+    is_space = code_points == ord(' ')
+    ends_with_space = bool(is_space[-1])
+    delimiters = np.flatnonzero(is_space)
+    if not ends_with_space:
+        delimiters = np.append(delimiters, count - 1)
+
+    segment_starts = np.concatenate(([0], delimiters[:-1] + 1))
+    segment_stops = delimiters.copy()
+    # The previous loop checked the last word for content before appending the final character
+    check_stops = segment_stops.copy()
+    if not ends_with_space:
+        segment_stops[-1] = count
+
+    has_content = ~np.isin(code_points, WHITESPACE_CODE_POINTS) & (code_points != 0)
+    non_space_counts = np.concatenate(([0], np.cumsum(has_content)))
+    keep = non_space_counts[check_stops] - non_space_counts[segment_starts] > 0
+
+    kept_starts = segment_starts[keep].tolist()
+    kept_stops = segment_stops[keep].tolist()
+    words = [text[first:stop].strip() for first, stop in zip(kept_starts, kept_stops)]
+    return words, kept_starts, delimiters[keep].tolist()
+
+
+def segment_words(characters, char_start_times, char_end_times):
+    """
+    Turn the ElevenLabs character alignment into columnar word spans without a per-character Python loop.
+
+    Words are split on ' '. A word starts at its first character and ends at the end of the space that
+    closes it, the last word ends with the final character, exactly like the loop this replaces.
+    Returns (words, start_times, end_times) with the times as float64 arrays.
+    """
+    words, start_indexes, end_indexes = _word_indexes(characters, char_start_times, char_end_times)
+    starts = np.asarray(char_start_times, dtype=np.float64)
+    ends = np.asarray(char_end_times, dtype=np.float64)
+    return words, starts[start_indexes], ends[end_indexes]
+
+
+def build_word_timestamps(characters, char_start_times, char_end_times):
+    """
+    Word spans as the list of {"word", "start", "end"} dicts the transcript stores. The times are picked
+    straight from the alignment lists, only the characters go through NumPy.
+    """
+    words, start_indexes, end_indexes = _word_indexes(characters, char_start_times, char_end_times)
+    return [
+        {"word": word, "start": char_start_times[first], "end": char_end_times[last]}
+        for word, first, last in zip(words, start_indexes, end_indexes)
+    ]
+
+
+def _spans(word_timestamps, is_end):
+    spans = []
+    last_indexes = np.flatnonzero(is_end)
+    if len(last_indexes) == 0 or last_indexes[-1] != len(word_timestamps) - 1:
+        last_indexes = np.append(last_indexes, len(word_timestamps) - 1)
+    first_index = 0
+    for last_index in last_indexes.tolist():
+        spans.append({
+            "first_word": first_index,
+            "last_word": last_index,
+            "start": word_timestamps[first_index]["start"],
+            "end": word_timestamps[last_index]["end"],
+            "text": " ".join(word["word"] for word in word_timestamps[first_index:last_index + 1]),
+        })
+        first_index = last_index + 1
+    return spans
+
+
+def find_boundaries(word_timestamps, pause_seconds=0.35):
+    """
+    Sentence and phrase spans over the word list, so captions can be grouped.
+    Sentences end on . ! ?, phrases also end on , ; : or on a pause longer than pause_seconds.
+    """
+    if not word_timestamps:
+        return {"sentences": [], "phrases": []}
+
+    last_chars = np.array([word["word"][-1:] for word in word_timestamps], dtype="<U1")
+    starts = np.array([word["start"] for word in word_timestamps], dtype=np.float64)
+    ends = np.array([word["end"] for word in word_timestamps], dtype=np.float64)
+
+    sentence_end = np.isin(last_chars, SENTENCE_END)
+    pauses = np.append(starts[1:] - ends[:-1] > pause_seconds, False)
+    phrase_end = np.isin(last_chars, PHRASE_END) | pauses
+
+    return {
+        "sentences": _spans(word_timestamps, sentence_end),
+        "phrases": _spans(word_timestamps, phrase_end),
+    }